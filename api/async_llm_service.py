@@ -0,0 +1,142 @@
+import asyncio
+
+import aiohttp
+
+from api.food_cache import normalize_food_name
+
+
+class AsyncGroqAPI:
+    """
+    asyncio counterpart of GroqAPI
+
+    Shares the wrapped GroqAPI's keys, base URL, model, prompts, response
+    parsing and attribute cache, but sends requests through one aiohttp
+    session so a single event loop can keep hundreds of LLM calls in flight
+    without a thread per call. The session is bound to the loop that first
+    uses the client, so always await it from the same loop.
+    """
+
+    def __init__(self, sync_api, max_connections=100, keepalive_timeout=30):
+        self.sync_api = sync_api
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+
+        self._session = None
+        self._inflight = {}
+        self._counters = {
+            'requests': 0,
+            'in_flight': 0,
+            'max_in_flight': 0,
+            'attribute_executions': 0,
+            'attribute_coalesced': 0
+        }
+
+    def _get_session(self):
+        """Create the shared aiohttp session on first use"""
+        if self._session is None or self._session.closed:
+            connect_timeout, read_timeout = self.sync_api.default_timeout
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    keepalive_timeout=self.keepalive_timeout
+                ),
+                timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+            )
+        return self._session
+
+    async def _make_request(self, endpoint, payload, api_key_index=0):
+        """Make a request to the Groq API with the same key fallback rules as GroqAPI"""
+        api = self.sync_api
+        session = self._get_session()
+
+        self._counters['requests'] += 1
+        self._counters['in_flight'] += 1
+        self._counters['max_in_flight'] = max(self._counters['max_in_flight'], self._counters['in_flight'])
+        try:
+            async with session.post(
+                f"{api.base_url}/{endpoint}",
+                headers=api._headers(api_key_index),
+                json=payload
+            ) as response:
+                if response.status == 200:
+                    return await response.json(content_type=None)
+                text = await response.text()
+        except asyncio.TimeoutError:
+            print(f"API request timed out after {api.default_timeout} seconds.")
+            if api_key_index < len(api.api_keys) - 1:
+                print(f"Trying next API key...")
+                return await self._make_request(endpoint, payload, api_key_index + 1)
+            return {"error": "API request timed out", "status_code": 408}
+        except aiohttp.ClientError as e:
+            print(f"Error making API request: {str(e)}")
+            if api_key_index < len(api.api_keys) - 1:
+                print(f"Trying next API key...")
+                return await self._make_request(endpoint, payload, api_key_index + 1)
+            return {"error": str(e), "status_code": 500}
+        finally:
+            self._counters['in_flight'] -= 1
+
+        if response.status == 401 and api_key_index < len(api.api_keys) - 1:
+            # Try the next API key
+            print(f"API key {api_key_index+1} failed. Trying next key...")
+            return await self._make_request(endpoint, payload, api_key_index + 1)
+
+        print(f"API request failed: {response.status} - {text}")
+        return {"error": text, "status_code": response.status}
+
+    async def get_food_attributes(self, food_name):
+        """Get food attributes, served from the attribute cache when possible"""
+        return (await self.lookup_food_attributes(food_name))[0]
+
+    async def lookup_food_attributes(self, food_name):
+        """Same as get_food_attributes, returning (attributes, is_default) like GroqAPI.lookup_food_attributes"""
+        api = self.sync_api
+        loop = asyncio.get_running_loop()
+
+        if api.attribute_cache is not None:
+            # The cache may hit SQLite, so keep it off the event loop
+            cached = await loop.run_in_executor(None, api.attribute_cache.get, food_name)
+            if cached is not None:
+                return api._with_food_name(cached, food_name), False
+
+        # Identical lookups already in flight on this loop share one request
+        key = normalize_food_name(food_name)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_cache_food_attributes(food_name))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self._counters['attribute_executions'] += 1
+        else:
+            self._counters['attribute_coalesced'] += 1
+
+        attributes = await asyncio.shield(task)
+        if attributes is None:
+            # Return default values if the API fails; these are never cached
+            return api._get_default_food_attributes(food_name), True
+        return api._with_food_name(dict(attributes), food_name), False
+
+    async def _fetch_and_cache_food_attributes(self, food_name):
+        api = self.sync_api
+        response = await self._make_request("chat/completions", api._food_attributes_payload(food_name))
+        attributes = api._parse_food_attributes(response, food_name)
+        if attributes is not None and api.attribute_cache is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, api.attribute_cache.set, food_name, attributes
+            )
+        return attributes
+
+    async def chat(self, message, conversation_history=None):
+        """General chat functionality"""
+        api = self.sync_api
+        response = await self._make_request("chat/completions", api._chat_payload(message, conversation_history))
+        return api._parse_chat_response(response)
+
+    async def close(self):
+        """Close the shared aiohttp session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def stats(self):
+        """Return request and coalescing counters"""
+        return dict(self._counters)
@@ -0,0 +1,84 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import threading
+
+
+class AsyncRuntime:
+    """
+    Event loop running in a background thread
+
+    Synchronous callers (Flask views, scripts) submit coroutines with run();
+    all of them share the one loop, so long-lived resources such as the
+    AsyncGroqAPI aiohttp session and its connection pool are reused across
+    requests. The caller's contextvars are carried into the coroutine, which
+    keeps Flask's request and session proxies working inside async views.
+
+    run() blocks the calling thread until the coroutine finishes, so an
+    async Flask view still holds its WSGI worker thread for the whole
+    request. What the loop saves is per-call client resources: LLM calls
+    share one connection pool, and a coroutine can await several at once.
+    """
+
+    def __init__(self, name="async-runtime"):
+        self.name = name
+        self.loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the loop thread if it is not running yet"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            self.loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(self.loop)
+                self.loop.call_soon(ready.set)
+                self.loop.run_forever()
+
+            self._thread = threading.Thread(target=run_loop, name=self.name, daemon=True)
+            self._thread.start()
+            ready.wait()
+        return self
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and block until it finishes"""
+        self.start()
+        context = contextvars.copy_context()
+        future = concurrent.futures.Future()
+
+        def on_done(task):
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+
+        def start_task():
+            # Runs inside context.run, so the task copies the caller's context
+            task = asyncio.ensure_future(coro)
+            task.add_done_callback(on_done)
+
+        self.loop.call_soon_threadsafe(context.run, start_task)
+        return future.result(timeout)
+
+    def wrap(self, func):
+        """Turn an async function into a blocking function that runs on this loop"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.run(func(*args, **kwargs))
+        return wrapper
+
+    def stop(self):
+        """Stop the loop and wait for its thread to exit"""
+        with self._lock:
+            if self._thread is None:
+                return
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+            self._thread = None
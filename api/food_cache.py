@@ -0,0 +1,148 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from storage.database import Database
+
+
+def normalize_food_name(food_name):
+    """Normalize a food name into a cache key ("  Green  Apple " -> "green apple")"""
+    return " ".join(str(food_name).lower().split())
+
+
+class FoodAttributeCache:
+    """
+    Two-tier cache for LLM food attributes
+
+    Lookups hit an in-process LRU first and fall back to a SQLite table, so
+    a food looked up once is served without a network call until its TTL
+    expires, even after a restart.
+    """
+
+    def __init__(self, database=None, max_entries=1024, ttl=7 * 24 * 3600):
+        # Shared storage.database.Database; a private pool on food_predictions.db by default
+        self.database = database if database is not None else Database('food_predictions.db')
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._entries = OrderedDict()  # key -> (expires_at, attributes)
+        self._lock = threading.Lock()
+        self._counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+
+        self._init_table()
+
+    def _init_table(self):
+        with self.database.connection() as conn:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS food_attribute_cache (
+                food_key TEXT PRIMARY KEY,
+                attributes TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            ''')
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _remember(self, key, attributes, expires_at):
+        """Store an entry in the in-process LRU, evicting the oldest entries if full"""
+        with self._lock:
+            self._entries[key] = (expires_at, attributes)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def get(self, food_name):
+        """Return a copy of the cached attributes for a food, or None on a miss"""
+        key = normalize_food_name(food_name)
+        now = time.time()
+
+        # Tier 1: in-process LRU
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, attributes = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._counters['memory_hits'] += 1
+                    return dict(attributes)
+                del self._entries[key]
+                self._counters['expirations'] += 1
+
+        # Tier 2: SQLite
+        try:
+            with self.database.connection() as conn:
+                row = conn.execute(
+                    'SELECT attributes, created_at FROM food_attribute_cache WHERE food_key = ?',
+                    (key,)
+                ).fetchone()
+                if row and row[1] + self.ttl <= now:
+                    conn.execute('DELETE FROM food_attribute_cache WHERE food_key = ?', (key,))
+                    self._count('expirations')
+                    row = None
+        except sqlite3.Error as e:
+            print(f"Error reading food attribute cache: {str(e)}")
+            row = None
+
+        if row is None:
+            self._count('misses')
+            return None
+
+        attributes = json.loads(row[0])
+        self._remember(key, attributes, row[1] + self.ttl)
+        self._count('disk_hits')
+        return dict(attributes)
+
+    def set(self, food_name, attributes):
+        """Cache attributes for a food in both tiers"""
+        key = normalize_food_name(food_name)
+        now = time.time()
+        attributes = dict(attributes)
+
+        self._remember(key, attributes, now + self.ttl)
+        try:
+            with self.database.connection() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO food_attribute_cache (food_key, attributes, created_at) VALUES (?, ?, ?)',
+                    (key, json.dumps(attributes), now)
+                )
+        except sqlite3.Error as e:
+            print(f"Error writing food attribute cache: {str(e)}")
+        self._count('sets')
+
+    def invalidate(self, food_name=None):
+        """Drop one food, or every food when no name is given, from both tiers"""
+        with self._lock:
+            if food_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(normalize_food_name(food_name), None)
+
+        with self.database.connection() as conn:
+            if food_name is None:
+                conn.execute('DELETE FROM food_attribute_cache')
+            else:
+                conn.execute(
+                    'DELETE FROM food_attribute_cache WHERE food_key = ?',
+                    (normalize_food_name(food_name),)
+                )
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current in-memory size"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._entries)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
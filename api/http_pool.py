@@ -0,0 +1,122 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class SessionPool:
+    """
+    Thread-safe pool of keep-alive HTTP sessions
+
+    requests.Session is not safe to share between threads, so each thread
+    checks a session out for the duration of one request. Idle sessions are
+    reused most-recently-used first, which keeps their TCP/TLS connections
+    warm instead of paying for a new handshake on every call.
+    """
+
+    def __init__(self, pool_size=10, keep_alive=True, connect_timeout=20, read_timeout=20, pool_timeout=None):
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        # How long a thread waits for a free session; defaults to the connect timeout
+        self.pool_timeout = connect_timeout if pool_timeout is None else pool_timeout
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._counters = {
+            'requests': 0,
+            'sessions_created': 0,
+            'sessions_reused': 0,
+            'pool_waits': 0,
+            'pool_timeouts': 0
+        }
+
+    @property
+    def timeout(self):
+        """(connect_timeout, read_timeout) tuple in the form requests expects"""
+        return (self.connect_timeout, self.read_timeout)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _new_session(self):
+        session = requests.Session()
+        # One connection per session; the pool size bounds total connections
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        self._count('sessions_created')
+        return session
+
+    @contextmanager
+    def session(self):
+        """Check out a session for the current thread and return it to the pool afterwards"""
+        if not self._slots.acquire(blocking=False):
+            self._count('pool_waits')
+            if not self._slots.acquire(timeout=self.pool_timeout):
+                self._count('pool_timeouts')
+                raise requests.exceptions.ConnectTimeout(
+                    f"No HTTP session available within {self.pool_timeout} seconds"
+                )
+
+        try:
+            try:
+                session = self._idle.get_nowait()
+                self._count('sessions_reused')
+            except queue.Empty:
+                session = self._new_session()
+        except Exception:
+            self._slots.release()
+            raise
+
+        healthy = False
+        try:
+            yield session
+            healthy = True
+        finally:
+            if healthy:
+                self._idle.put(session)
+            else:
+                # Drop sessions whose connection may be in a bad state
+                session.close()
+            self._slots.release()
+
+    def post(self, url, **kwargs):
+        """POST through a pooled session, applying the pool's timeouts by default"""
+        kwargs.setdefault("timeout", self.timeout)
+        self._count('requests')
+        with self.session() as session:
+            return session.post(url, **kwargs)
+
+    @contextmanager
+    def stream(self, url, **kwargs):
+        """POST with a streamed body; the session stays checked out until the block exits"""
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs["stream"] = True
+        self._count('requests')
+        with self.session() as session:
+            with session.post(url, **kwargs) as response:
+                yield response
+
+    def close(self):
+        """Close every idle session"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self):
+        """Return pool usage counters"""
+        with self._lock:
+            stats = dict(self._counters)
+        stats['pool_size'] = self.pool_size
+        stats['idle_sessions'] = self._idle.qsize()
+        return stats
@@ -2,9 +2,21 @@ import os
 import requests
 import json
 import time
+import threading
+
+from api.food_cache import normalize_food_name
+from api.http_pool import SessionPool
+from api.singleflight import SingleFlight
+
+class StreamError(Exception):
+    """A streamed request failed; carries the same fields as an error response"""
+    def __init__(self, error, status_code):
+        super().__init__(error)
+        self.error = error
+        self.status_code = status_code
 
 class GroqAPI:
-    def __init__(self):
+    def __init__(self, attribute_cache=None, http_pool=None):
         # Try both API keys, use the first one that works
         self.api_keys = [
             "your api-key-1 here"
@@ -13,17 +25,38 @@ class GroqAPI:
         ]
         self.base_url = "https://api.groq.com/openai/v1"
         self.model = "llama-3.3-70b-versatile"
-        self.default_timeout = (20, 20) # (connect_timeout, read_timeout) in seconds
+        # Pooled keep-alive sessions, so calls and key-fallback retries reuse connections
+        self.http_pool = http_pool if http_pool is not None else SessionPool()
+        self.default_timeout = self.http_pool.timeout # (connect_timeout, read_timeout) in seconds
+        # Optional FoodAttributeCache; avoids repeated LLM lookups for the same food
+        self.attribute_cache = attribute_cache
+        # Concurrent lookups of the same food share one LLM request
+        self.attribute_lookups = SingleFlight()
+        # Time-to-first-token and outcome counters for streamed chat replies
+        self._stream_lock = threading.Lock()
+        self._stream_counters = {
+            'streams': 0,
+            'completed': 0,
+            'errors': 0,
+            'ttft_count': 0,
+            'ttft_total_ms': 0.0,
+            'ttft_max_ms': 0.0,
+            'ttft_last_ms': None
+        }
         
-    def _make_request(self, endpoint, payload, api_key_index=0):
-        """Make a request to the Groq API with retry logic for API keys and timeout"""
-        headers = {
+    def _headers(self, api_key_index):
+        """Request headers for the given API key"""
+        return {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_keys[api_key_index]}"
         }
+    
+    def _make_request(self, endpoint, payload, api_key_index=0):
+        """Make a request to the Groq API with retry logic for API keys and timeout"""
+        headers = self._headers(api_key_index)
         
         try:
-            response = requests.post(
+            response = self.http_pool.post(
                 f"{self.base_url}/{endpoint}",
                 headers=headers,
                 json=payload,
@@ -57,7 +90,66 @@ class GroqAPI:
                 return {"error": str(e), "status_code": 500} # Generic server error for other request exceptions
     
     def get_food_attributes(self, food_name):
-        """Get food attributes from the LLM, including corrected food name"""
+        """Get food attributes, served from the attribute cache when possible"""
+        return self.lookup_food_attributes(food_name)[0]
+    
+    def lookup_food_attributes(self, food_name, check_cache=True):
+        """
+        Same as get_food_attributes, returning (attributes, is_default)
+        
+        is_default is True when the lookup failed and the attributes are the
+        defaults, so callers can keep anything derived from them out of caches.
+        check_cache=False skips the cache read, for callers that already missed
+        it with cached_food_attributes.
+        """
+        if check_cache:
+            cached = self.cached_food_attributes(food_name)
+            if cached is not None:
+                return cached, False
+        
+        # Identical lookups already in flight are joined instead of repeated
+        attributes, _ = self.attribute_lookups.do(
+            normalize_food_name(food_name),
+            lambda: self._fetch_and_cache_food_attributes(food_name)
+        )
+        if attributes is None:
+            # Return default values if the API fails; these are never cached
+            return self._get_default_food_attributes(food_name), True
+        
+        # Every caller gets its own copy, labelled with the name it asked for
+        return self._with_food_name(dict(attributes), food_name), False
+    
+    def cached_food_attributes(self, food_name):
+        """Food attributes from the attribute cache, or None on a miss; never calls the LLM"""
+        if self.attribute_cache is None:
+            return None
+        cached = self.attribute_cache.get(food_name)
+        if cached is None:
+            return None
+        return self._with_food_name(cached, food_name)
+    
+    def _fetch_and_cache_food_attributes(self, food_name):
+        """Fetch attributes from the LLM and store successful lookups in the cache"""
+        attributes = self._fetch_food_attributes(food_name)
+        if attributes is not None and self.attribute_cache is not None:
+            self.attribute_cache.set(food_name, attributes)
+        return attributes
+    
+    def _with_food_name(self, attributes, food_name):
+        """Label cached attributes with the name this caller used"""
+        if attributes.get('is_non_edible', False) == True:
+            attributes["name"] = food_name
+        else:
+            attributes["food_name"] = food_name
+        return attributes
+    
+    def _fetch_food_attributes(self, food_name):
+        """Get food attributes from the LLM, including corrected food name; None if the lookup fails"""
+        response = self._make_request("chat/completions", self._food_attributes_payload(food_name))
+        return self._parse_food_attributes(response, food_name)
+    
+    def _food_attributes_payload(self, food_name):
+        """Build the chat/completions payload for a food attribute lookup"""
         prompt = f"""
         You are a nutritional expert. I need detailed information about {food_name}.
         Please provide the following attributes for this food in JSON format.
@@ -91,13 +183,13 @@ class GroqAPI:
             "temperature": 0.1,
             "max_tokens": 500
         }
-        
-        response = self._make_request("chat/completions", payload)
-        
+        return payload
+    
+    def _parse_food_attributes(self, response, food_name):
+        """Extract the attribute dict from a completion response; None if the lookup failed"""
         if "error" in response:
             print(f"Groq API error for get_food_attributes: {response.get('error')}, status: {response.get('status_code')}")
-            # Return default values if API fails
-            return self._get_default_food_attributes(food_name)
+            return None
         
         try:
             content = response["choices"][0]["message"]["content"]
@@ -131,8 +223,7 @@ class GroqAPI:
         except (KeyError, IndexError, json.JSONDecodeError) as e:
             print(f"Error parsing LLM response for get_food_attributes: {str(e)}")
             print(f"Raw response: {response}")
-            # Return default values if parsing fails
-            return self._get_default_food_attributes(food_name)
+            return None
     
     def _get_default_food_attributes(self, food_name):
         """Return default values if the API fails"""
@@ -150,8 +241,124 @@ class GroqAPI:
             "is_non_edible": False
         }
     
+    def stats(self):
+        """Return request de-duplication, connection pool and streaming counters"""
+        return {
+            'attribute_lookups': self.attribute_lookups.stats(),
+            'http_pool': self.http_pool.stats(),
+            'chat_stream': self.stream_stats()
+        }
+    
+    def stream_stats(self):
+        """Return streamed chat counters, including average time to first token"""
+        with self._stream_lock:
+            stats = dict(self._stream_counters)
+        count = stats.pop('ttft_count')
+        total = stats.pop('ttft_total_ms')
+        stats['ttft_avg_ms'] = total / count if count else None
+        return stats
+    
+    def _count_stream(self, name):
+        with self._stream_lock:
+            self._stream_counters[name] += 1
+    
+    def _record_ttft(self, seconds):
+        ttft_ms = seconds * 1000
+        with self._stream_lock:
+            counters = self._stream_counters
+            counters['ttft_count'] += 1
+            counters['ttft_total_ms'] += ttft_ms
+            counters['ttft_max_ms'] = max(counters['ttft_max_ms'], ttft_ms)
+            counters['ttft_last_ms'] = ttft_ms
+    
     def chat(self, message, conversation_history=None):
         """General chat functionality"""
+        response = self._make_request("chat/completions", self._chat_payload(message, conversation_history))
+        return self._parse_chat_response(response)
+    
+    def chat_stream(self, message, conversation_history=None):
+        """
+        Streaming version of chat; yields pieces of the reply as the API produces them
+        
+        The pooled HTTP session stays checked out until the stream ends or the
+        generator is closed. On failure before the first token, the same
+        fallback message as chat() is yielded instead. A failure after that
+        raises StreamError, since the pieces already yielded are not a
+        complete reply.
+        """
+        payload = self._chat_payload(message, conversation_history)
+        payload["stream"] = True
+        
+        self._count_stream('streams')
+        started = time.perf_counter()
+        received = False
+        try:
+            for piece in self._stream_request("chat/completions", payload):
+                if not received:
+                    received = True
+                    self._record_ttft(time.perf_counter() - started)
+                yield piece
+        except StreamError as e:
+            self._count_stream('errors')
+            if not received:
+                yield self._parse_chat_response({"error": e.error, "status_code": e.status_code})
+                return
+            raise
+        
+        if received:
+            self._count_stream('completed')
+        else:
+            self._count_stream('errors')
+            yield "I'm having trouble generating a response right now. Please try again."
+    
+    def _stream_request(self, endpoint, payload, api_key_index=0):
+        """Make a streaming request and yield content deltas from its server-sent events"""
+        received = False
+        try:
+            with self.http_pool.stream(
+                f"{self.base_url}/{endpoint}",
+                headers=self._headers(api_key_index),
+                json=payload,
+                timeout=self.default_timeout
+            ) as response:
+                if response.status_code != 200:
+                    raise StreamError(response.text, response.status_code)
+                
+                for line in response.iter_lines(decode_unicode=True):
+                    # Events look like "data: {...}"; blank lines separate them
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        delta = json.loads(data)["choices"][0].get("delta", {})
+                    except (ValueError, KeyError, IndexError) as e:
+                        print(f"Error parsing chat stream event: {str(e)}")
+                        continue
+                    content = delta.get("content")
+                    if content:
+                        received = True
+                        yield content
+        except StreamError as e:
+            if e.status_code == 401 and api_key_index < len(self.api_keys) - 1:
+                print(f"API key {api_key_index+1} failed. Trying next key...")
+                yield from self._stream_request(endpoint, payload, api_key_index + 1)
+                return
+            print(f"API request failed: {e.status_code} - {e.error}")
+            raise
+        except requests.exceptions.RequestException as e:
+            print(f"Error streaming API request: {str(e)}")
+            # Keys can only be switched before any part of the reply has been sent
+            if not received and api_key_index < len(self.api_keys) - 1:
+                print(f"Trying next API key...")
+                yield from self._stream_request(endpoint, payload, api_key_index + 1)
+                return
+            status_code = 408 if isinstance(e, requests.exceptions.Timeout) else 500
+            raise StreamError(str(e), status_code)
+    
+    def _chat_payload(self, message, conversation_history=None):
+        """Build the chat/completions payload for a chat message with its history"""
         if conversation_history is None:
             conversation_history = []
             
@@ -167,9 +374,10 @@ class GroqAPI:
             "temperature": 0.7,
             "max_tokens": 800
         }
-        
-        response = self._make_request("chat/completions", payload)
-        
+        return payload
+    
+    def _parse_chat_response(self, response):
+        """Extract the assistant reply from a completion response"""
         if "error" in response:
             print(f"Groq API error for chat: {response.get('error')}, status: {response.get('status_code')}")
             return "I'm having trouble connecting to my knowledge base right now. Please try again later."
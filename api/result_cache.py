@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+
+from api.food_cache import normalize_food_name
+
+
+def result_cache_key(food_name, quantity):
+    """Cache key for a /predict request: normalized food name and quantity"""
+    return (normalize_food_name(food_name), normalize_food_name(quantity))
+
+
+class PredictionResultCache:
+    """
+    LRU cache of serialized /predict responses, bounded by total size in bytes
+
+    Entries are dicts of bytes/str values (at least a 'body' holding the
+    response JSON), so a hit is returned without running the attribute
+    lookup, the model or the JSON encoder. Every entry belongs to a model
+    version; passing a different version to get() or set() drops the whole
+    cache, so results from replaced model artifacts are never served.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, ttl=24 * 3600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._entries = OrderedDict()  # key -> (expires_at, size, entry)
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'version_resets': 0
+        }
+
+    def _check_version(self, version):
+        # Caller holds the lock
+        if version != self._version:
+            if self._version is not None:
+                self._counters['version_resets'] += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, key, version):
+        """Return the cached entry for key under this model version, or None"""
+        now = time.time()
+        with self._lock:
+            self._check_version(version)
+            item = self._entries.get(key)
+            if item is None:
+                self._counters['misses'] += 1
+                return None
+            expires_at, size, entry = item
+            if expires_at <= now:
+                del self._entries[key]
+                self._bytes -= size
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry
+
+    def set(self, key, version, entry):
+        """Cache an entry, evicting least recently used entries to stay within max_bytes"""
+        size = sum(len(value) for value in entry.values() if value is not None)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._check_version(version)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (time.time() + self.ttl, size, entry)
+            self._bytes += size
+            self._counters['sets'] += 1
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._counters['evictions'] += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current size"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+            stats['model_version'] = self._version
+        stats['max_bytes'] = self.max_bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,79 @@
+import threading
+
+
+class _Call:
+    """One in-flight execution that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key into a single execution
+
+    The first caller for a key runs the function; callers arriving while it
+    is still running block until it finishes and receive the same result
+    (or the same exception) instead of repeating the work.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {
+            'executions': 0,
+            'coalesced': 0,
+            'errors': 0,
+            'max_waiters': 0
+        }
+
+    def do(self, key, fn):
+        """
+        Run fn() once per concurrent group of callers using the same key
+
+        Returns:
+            (result, shared) where shared is True for callers that reused
+            another caller's result
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self._counters['executions'] += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self._counters['coalesced'] += 1
+                self._counters['max_waiters'] = max(self._counters['max_waiters'], call.waiters)
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self._counters['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def stats(self):
+        """Return execution/coalescing counters and the number of calls in flight"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['in_flight'] = len(self._calls)
+        return stats
@@ -0,0 +1,208 @@
+"""
+Warm cache of the most requested foods
+
+build_snapshot() looks up the LLM attributes and model predictions for the
+foods that appear most often in the predictions table and writes them to a
+JSON snapshot. The app loads the snapshot at startup, so /predict answers
+those foods without a network call or a model load, even on the first
+request after a deploy.
+
+Build a snapshot from the command line with:
+    python api/warm_cache.py --top 300
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.food_cache import normalize_food_name
+
+DEFAULT_SNAPSHOT_PATH = 'warm_cache.json'
+
+
+def top_food_names(database, limit=300):
+    """Most frequently predicted food names, grouped by their normalized form"""
+    with database.connection() as conn:
+        rows = conn.execute(
+            'SELECT food_name, COUNT(*) FROM predictions WHERE food_name IS NOT NULL GROUP BY food_name'
+        ).fetchall()
+
+    counts = Counter()
+    spellings = {}
+    for food_name, count in rows:
+        key = normalize_food_name(food_name)
+        if not key:
+            continue
+        counts[key] += count
+        # Keep the most common spelling as the name to look up
+        if key not in spellings or count > spellings[key][1]:
+            spellings[key] = (food_name.strip(), count)
+    return [spellings[key][0] for key, _ in counts.most_common(limit)]
+
+
+def build_snapshot(database, llm_api, predictor, path=DEFAULT_SNAPSHOT_PATH, limit=300, workers=8):
+    """
+    Precompute attributes and predictions for the top foods and write the snapshot file
+
+    Foods whose attribute lookup failed are left out and counted as failed
+    lookups; /predict looks them up again instead of serving the defaults.
+    """
+    started = time.perf_counter()
+    food_names = top_food_names(database, limit)
+    print(f"Warming {len(food_names)} foods")
+
+    # Attribute lookups are network-bound, so run them concurrently
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        lookups = list(executor.map(llm_api.lookup_food_attributes, food_names))
+
+    edible = []
+    failed = 0
+    for food_name, (food_data, is_default) in zip(food_names, lookups):
+        if is_default:
+            failed += 1
+            continue
+        if 'alert' in food_data or food_data.get('is_non_edible', False) or food_data.get('category') == 'None':
+            continue
+        edible.append((food_name, food_data))
+
+    # One vectorized model pass for every food
+    predictions = predictor.predict_batch([food_data for _, food_data in edible]) if edible else []
+
+    snapshot = {
+        'model_version': predictor.model_version,
+        'built_at': time.time(),
+        'failed_lookups': failed,
+        'foods': {
+            normalize_food_name(food_name): {
+                'food_data': food_data,
+                'prediction_results': prediction_results
+            }
+            for (food_name, food_data), prediction_results in zip(edible, predictions)
+        }
+    }
+
+    # Write to a temporary file first so readers never see a partial snapshot
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+    if failed:
+        print(f"Left out {failed} foods whose attribute lookup failed")
+    print(f"Wrote warm cache with {len(snapshot['foods'])} foods to {path} in {time.perf_counter() - started:.1f}s")
+    return len(snapshot['foods'])
+
+
+class WarmCache:
+    """
+    In-memory copy of a warm cache snapshot
+
+    A snapshot is only used if it was built by the model version that is
+    currently deployed; otherwise it is ignored until the next rebuild.
+    """
+
+    def __init__(self, path=DEFAULT_SNAPSHOT_PATH):
+        self.path = path
+        self._foods = {}
+        self._model_version = None
+        self._built_at = None
+        self._failed_lookups = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'loads': 0,
+            'rebuilds': 0,
+            'rebuild_errors': 0
+        }
+
+    def load(self, model_version):
+        """Load the snapshot file if it matches model_version; returns the number of foods"""
+        try:
+            with open(self.path, 'r') as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            print(f"Error reading warm cache snapshot: {str(e)}")
+            return 0
+
+        if snapshot.get('model_version') != model_version:
+            print(f"Ignoring warm cache built for model {snapshot.get('model_version')}, current model is {model_version}")
+            foods = {}
+        else:
+            foods = snapshot.get('foods', {})
+
+        with self._lock:
+            self._foods = foods
+            self._model_version = model_version
+            self._built_at = snapshot.get('built_at')
+            self._failed_lookups = snapshot.get('failed_lookups', 0)
+            self._counters['loads'] += 1
+        print(f"Loaded warm cache with {len(foods)} foods")
+        return len(foods)
+
+    def get(self, food_name):
+        """Return (food_data, prediction_results) copies for a food, or None"""
+        entry = self._foods.get(normalize_food_name(food_name))
+        with self._lock:
+            self._counters['hits' if entry is not None else 'misses'] += 1
+        if entry is None:
+            return None
+        return dict(entry['food_data']), dict(entry['prediction_results'])
+
+    def schedule(self, interval, rebuild):
+        """Call rebuild() every interval seconds in a background thread, then reload the snapshot"""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    model_version = rebuild()
+                    self.load(model_version)
+                    with self._lock:
+                        self._counters['rebuilds'] += 1
+                except Exception as e:
+                    print(f"Error rebuilding warm cache: {str(e)}")
+                    with self._lock:
+                        self._counters['rebuild_errors'] += 1
+
+        self._thread = threading.Thread(target=run, name='warm-cache', daemon=True)
+        self._thread.start()
+
+    def stats(self):
+        """Return hit/miss counters and snapshot details"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['foods'] = len(self._foods)
+            stats['model_version'] = self._model_version
+            stats['built_at'] = self._built_at
+            stats['failed_lookups'] = self._failed_lookups
+        return stats
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from api.llm_service import GroqAPI
+    from api.food_cache import FoodAttributeCache
+    from models.predict import Predictor
+    from storage.database import Database
+
+    parser = argparse.ArgumentParser(description="Build the warm cache snapshot of the most requested foods")
+    parser.add_argument('--top', type=int, default=300, help="Number of foods to precompute")
+    parser.add_argument('--output', default=DEFAULT_SNAPSHOT_PATH, help="Snapshot file to write")
+    parser.add_argument('--database', default='food_predictions.db', help="SQLite database with the predictions table")
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent LLM lookups")
+    args = parser.parse_args()
+
+    database = Database(args.database)
+    llm_api = GroqAPI(attribute_cache=FoodAttributeCache(database))
+    build_snapshot(database, llm_api, Predictor(), path=args.output, limit=args.top, workers=args.workers)
@@ -1,7 +1,12 @@
 import os
 import json
 import sqlite3
-from flask import Flask, request, render_template, jsonify, session, redirect, url_for, flash
+import time
+import asyncio
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, request, render_template, jsonify, session, redirect, url_for, flash, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -11,101 +16,323 @@ import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import custom modules
-from api.llm_service import GroqAPI
-from models.predict import Predictor
+from api.llm_service import GroqAPI, StreamError
+from api.async_llm_service import AsyncGroqAPI
+from api.async_runtime import AsyncRuntime
+from api.food_cache import FoodAttributeCache
+from api.result_cache import PredictionResultCache, result_cache_key
+from api.warm_cache import WarmCache, build_snapshot
+from storage.database import Database, encode_cursor, decode_cursor, sql_timestamp
+from storage.write_behind import WriteBehindQueue
+from storage.visitor_counter import VisitorCounter
+from storage.notification_cache import NotificationCache
+from api.http_pool import SessionPool
+from models.predict import Predictor, TARGET_COLUMNS, artifact_version, current_artifact_dir
+
+# Async views share one background event loop instead of each request
+# starting and tearing down its own, so the aiohttp connection pool of
+# AsyncGroqAPI stays warm between requests. The WSGI worker thread still
+# blocks until the view finishes (see benchmarks/load_async_routes.py)
+llm_runtime = AsyncRuntime('llm-event-loop')
+
+class FoodSymptomApp(Flask):
+    def ensure_sync(self, func):
+        if asyncio.iscoroutinefunction(func):
+            return llm_runtime.wrap(func)
+        return func
 
 # Initialize Flask app
-app = Flask(__name__)
+app = FoodSymptomApp(__name__)
 CORS(app)
 app.secret_key = os.urandom(24)
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # Disable caching
 
 # Initialize services
-llm_api = GroqAPI()
+# Shared pool of SQLite connections (WAL mode), used by every route
+db = Database(os.environ.get('DATABASE_PATH', 'food_predictions.db'), pool_size=int(os.environ.get('DB_POOL_SIZE', 8)))
+# History and feedback rows are written in the background in batched commits
+db_writer = WriteBehindQueue(db, max_queue=int(os.environ.get('DB_WRITE_QUEUE_SIZE', 10000)))
+# Longest a read waits for queued rows it should see before going ahead without them
+DB_FLUSH_TIMEOUT = float(os.environ.get('DB_FLUSH_TIMEOUT', 2))
+# Visits are counted in memory and added to visitor_stats periodically
+visitor_counter = VisitorCounter(db, flush_interval=float(os.environ.get('VISITOR_FLUSH_INTERVAL', 5)))
+# Active notification polled by every page; invalidated by /admin/set-notification
+notification_cache = NotificationCache(db, ttl=float(os.environ.get('NOTIFICATION_CACHE_TTL', 10)))
+# Food attributes are cached in memory and in the food_attribute_cache table
+food_attribute_cache = FoodAttributeCache(db, max_entries=2048, ttl=7 * 24 * 3600)
+# Serialized /predict responses, keyed by food, quantity and model version
+prediction_result_cache = PredictionResultCache(
+    max_bytes=int(os.environ.get('RESULT_CACHE_MAX_BYTES', 16 * 1024 * 1024)),
+    ttl=24 * 3600
+)
+# Precomputed attributes and predictions for the most requested foods
+warm_cache = WarmCache(os.environ.get('WARM_CACHE_PATH', 'warm_cache.json'))
+# LLM calls share a pool of keep-alive HTTP sessions
+llm_http_pool = SessionPool(
+    pool_size=int(os.environ.get('LLM_POOL_SIZE', 16)),
+    keep_alive=os.environ.get('LLM_KEEP_ALIVE', '1') != '0',
+    connect_timeout=float(os.environ.get('LLM_CONNECT_TIMEOUT', 20)),
+    read_timeout=float(os.environ.get('LLM_READ_TIMEOUT', 20))
+)
+llm_api = GroqAPI(attribute_cache=food_attribute_cache, http_pool=llm_http_pool)
+# Async client used by the /async/* views; shares keys, prompts and cache with llm_api
+async_llm_api = AsyncGroqAPI(llm_api, max_connections=int(os.environ.get('LLM_ASYNC_MAX_CONNECTIONS', 100)))
+# Attribute lookups of /predict/batch run here concurrently; shared by all requests so LLM calls stay bounded
+batch_lookup_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('BATCH_LOOKUP_WORKERS', 8)), thread_name_prefix='batch-lookup'
+)
 
-# Setup SQLite database
-def init_db():
-    with sqlite3.connect('food_predictions.db') as conn:
-        cursor = conn.cursor()
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS predictions (
+@atexit.register
+def shutdown_services():
+    # Commit rows still waiting in the write-behind queue before exiting
+    db_writer.close()
+    visitor_counter.close()
+    batch_lookup_executor.shutdown(wait=False)
+    db.close()
+    if llm_runtime.loop is not None:
+        llm_runtime.run(async_llm_api.close(), timeout=5)
+        llm_runtime.stop()
+    llm_http_pool.close()
+
+# Schema changes applied on top of the tables created in init_db, in order.
+# Append new entries; never edit one that has shipped (see Database.migrate).
+MIGRATIONS = [
+    # 1: indexes for the per-user and per-session history queries
+    '''
+    CREATE INDEX IF NOT EXISTS idx_predictions_user_timestamp ON predictions (user_id, timestamp, id);
+    CREATE INDEX IF NOT EXISTS idx_chat_history_user_timestamp ON chat_history (user_id, timestamp, id);
+    CREATE INDEX IF NOT EXISTS idx_chat_history_session_timestamp ON chat_history (session_id, timestamp, id);
+    CREATE INDEX IF NOT EXISTS idx_feedbacks_timestamp ON feedbacks (timestamp);
+    CREATE INDEX IF NOT EXISTS idx_notifications_active ON notifications (is_active, created_at)
+    ''',
+    # 2: admin-curated labels, learned by the incremental model updates
+    '''
+    CREATE TABLE IF NOT EXISTS prediction_corrections (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
+        prediction_id INTEGER NULL,
         food_name TEXT,
         food_data TEXT,
-        prediction_results TEXT,
-        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-        user_id INTEGER NULL
-    )
-    ''')
-    
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS chat_history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        session_id TEXT,
-        user_message TEXT,
-        bot_response TEXT,
-        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-        user_id INTEGER NULL
-    )
-    ''')
-    
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        email TEXT UNIQUE NOT NULL,
-        password TEXT NOT NULL,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-    
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS feedbacks (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        feedback_text TEXT NOT NULL,
-        user_id INTEGER NULL,
-        username TEXT NULL,
+        corrected_results TEXT,
         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
     )
-    ''')
+    ''',
+    # 3: predictions made from the default attributes after a failed lookup, kept out of model updates
+    '''
+    ALTER TABLE predictions ADD COLUMN is_default INTEGER NOT NULL DEFAULT 0
+    '''
+]
 
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS notifications (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        message TEXT NOT NULL,
-        is_active BOOLEAN DEFAULT TRUE,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-    
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS visitor_stats (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        visit_count INTEGER DEFAULT 0
-    )
-    ''')
-    
-    # Initialize visitor count if not exists
-    cursor.execute('SELECT * FROM visitor_stats LIMIT 1')
-    if not cursor.fetchone():
-        cursor.execute('INSERT INTO visitor_stats (visit_count) VALUES (0)')
+# Setup SQLite database
+def init_db():
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS predictions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            food_name TEXT,
+            food_data TEXT,
+            prediction_results TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            user_id INTEGER NULL
+        )
+        ''')
+        
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chat_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT,
+            user_message TEXT,
+            bot_response TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            user_id INTEGER NULL
+        )
+        ''')
+        
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS feedbacks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            feedback_text TEXT NOT NULL,
+            user_id INTEGER NULL,
+            username TEXT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message TEXT NOT NULL,
+            is_active BOOLEAN DEFAULT TRUE,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS visitor_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            visit_count INTEGER DEFAULT 0
+        )
+        ''')
+        
+        # Initialize visitor count if not exists
+        cursor.execute('SELECT * FROM visitor_stats LIMIT 1')
+        if not cursor.fetchone():
+            cursor.execute('INSERT INTO visitor_stats (visit_count) VALUES (0)')
+        
+        conn.commit()
     
-    conn.commit()
+    # Bring indexes and later schema changes up to date
+    db.migrate(MIGRATIONS)
 
 # Initialize database on startup
 init_db()
 
-# Load predictor (only when needed to avoid loading models at startup)
+# Load predictor in the background at startup (PRELOAD_MODEL=1, the default)
+# or on the first request that needs it
 predictor = None
+predictor_lock = threading.Lock()
+predictor_status = {'state': 'not_loaded', 'error': None, 'load_seconds': None}
 def get_predictor():
     global predictor
     if predictor is None:
+        # Only one thread loads the artifacts; the others wait for it
+        with predictor_lock:
+            if predictor is None:
+                predictor_status['state'] = 'loading'
+                started = time.perf_counter()
+                try:
+                    predictor = Predictor(mmap=os.environ.get('MODEL_MMAP', '1') != '0')
+                except Exception as e:
+                    print(f"Error loading predictor: {str(e)}")
+                    predictor_status['state'] = 'failed'
+                    predictor_status['error'] = str(e)
+                    return None
+                predictor_status['load_seconds'] = time.perf_counter() - started
+                predictor_status['state'] = 'ready'
+                predictor_status['error'] = None
+                print(f"Prediction model loaded in {predictor_status['load_seconds']:.2f}s")
+    return predictor
+
+if os.environ.get('PRELOAD_MODEL', '1') != '0':
+    threading.Thread(target=get_predictor, name='model-preload', daemon=True).start()
+
+# Load newly published artifacts in the background and swap them in; requests keep
+# the predictor they started with, so in-flight requests finish on the old model
+model_reload_lock = threading.Lock()
+model_reload_status = {'reloads': 0, 'failures': 0, 'last_error': None, 'last_reload_seconds': None}
+def reload_predictor(force=False):
+    global predictor
+    if not model_reload_lock.acquire(blocking=False):
+        return None
+    try:
+        current = predictor
+        if current is None:
+            # The first load has not finished; it will pick up the live version itself
+            return None
+        artifact_dir = current_artifact_dir()
+        if not force and artifact_dir == current.artifact_dir:
+            return None
+        version = artifact_version(artifact_dir)
+        if version == current.model_version:
+            return None
+        
+        print(f"Loading model {version} from {artifact_dir}")
+        started = time.perf_counter()
+        new_predictor = Predictor(artifact_dir=artifact_dir, mmap=os.environ.get('MODEL_MMAP', '1') != '0')
+        if new_predictor.using_fallback:
+            raise RuntimeError(f"Model {version} could not be loaded")
+        # Run one prediction so lazy setup and page faults happen before the swap, not in a request
+        new_predictor.predict_batch([{}])
+        
+        # The warm cache snapshot belongs to the old model, so drop it first
+        warm_cache.load(new_predictor.model_version)
+        predictor = new_predictor
+        model_reload_status['reloads'] += 1
+        model_reload_status['last_reload_seconds'] = time.perf_counter() - started
+        model_reload_status['last_error'] = None
+        print(f"Swapped in model {version} (was {current.model_version}) in {model_reload_status['last_reload_seconds']:.2f}s")
+        return version
+    except Exception as e:
+        print(f"Error reloading model: {str(e)}")
+        model_reload_status['failures'] += 1
+        model_reload_status['last_error'] = str(e)
+        return None
+    finally:
+        model_reload_lock.release()
+
+# Poll the CURRENT pointer so a newly published model is loaded without a restart
+def watch_model_artifacts(interval):
+    while True:
+        time.sleep(interval)
+        reload_predictor()
+
+if float(os.environ.get('MODEL_WATCH_INTERVAL', 10)) > 0:
+    threading.Thread(
+        target=watch_model_artifacts, args=(float(os.environ.get('MODEL_WATCH_INTERVAL', 10)),),
+        name='model-watcher', daemon=True
+    ).start()
+
+# Train the online model on new labeled rows, publish it and swap it in (see models/incremental.py)
+model_update_lock = threading.Lock()
+model_update_status = {'updates': 0, 'rejections': 0, 'failures': 0, 'last_error': None, 'last_version': None, 'last_update_seconds': None}
+def run_incremental_update(include_predictions=False):
+    # Imported here so the app does not load sklearn at startup
+    from models.incremental import UpdateRejected, update_model
+    
+    with model_update_lock:
+        started = time.perf_counter()
         try:
-            predictor = Predictor()
+            # Let queued prediction inserts land so the update sees them
+            wait_for_all_writes()
+            version = update_model(db, include_predictions=include_predictions)
+            if version is not None:
+                reload_predictor()
+                model_update_status['updates'] += 1
+                model_update_status['last_version'] = version
+            model_update_status['last_update_seconds'] = time.perf_counter() - started
+            model_update_status['last_error'] = None
+            return version
+        except UpdateRejected as e:
+            # The live model stays in place
+            print(str(e))
+            model_update_status['rejections'] += 1
+            model_update_status['last_error'] = str(e)
+            return None
         except Exception as e:
-            print(f"Error loading predictor: {str(e)}")
+            print(f"Error updating model: {str(e)}")
+            model_update_status['failures'] += 1
+            model_update_status['last_error'] = str(e)
             return None
-    return predictor
+
+# Version of the model artifacts on disk, without loading the model
+def current_model_version():
+    try:
+        return artifact_version()
+    except OSError:
+        return "fallback"
+
+# Rebuild the warm cache snapshot from the current prediction history
+def rebuild_warm_cache():
+    pred = get_predictor()
+    if pred is None:
+        raise RuntimeError("Prediction model is not available")
+    build_snapshot(db, llm_api, pred, path=warm_cache.path, limit=int(os.environ.get('WARM_CACHE_TOP', 300)))
+    return pred.model_version
+
+warm_cache.load(current_model_version())
+# Rebuild the snapshot periodically when WARM_CACHE_INTERVAL (seconds) is set
+if float(os.environ.get('WARM_CACHE_INTERVAL', 0)) > 0:
+    warm_cache.schedule(float(os.environ['WARM_CACHE_INTERVAL']), rebuild_warm_cache)
 
 # Check if user is logged in
 def is_logged_in():
@@ -130,13 +357,10 @@ def increment_visitor_count():
             print("Session already counted, not incrementing visitor count")
             return
 
-        with sqlite3.connect('food_predictions.db') as conn:
-            cursor = conn.cursor()
-            cursor.execute('UPDATE visitor_stats SET visit_count = visit_count + 1 WHERE id = 1')
-            conn.commit()
-            # Mark this session as counted
-            session['visited_this_session'] = True
-            print("Incremented visitor count for a new session")
+        visitor_counter.increment()
+        # Mark this session as counted
+        session['visited_this_session'] = True
+        print("Incremented visitor count for a new session")
 
     except Exception as e:
         print(f"Error incrementing visitor count: {str(e)}")
@@ -146,15 +370,25 @@ def increment_visitor_count():
 @app.route('/visitor-count')
 def visitor_count():
     try:
-        with sqlite3.connect('food_predictions.db') as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT visit_count FROM visitor_stats WHERE id = 1')
-            count = cursor.fetchone()[0]
+        # Served from memory; includes visits not yet flushed to the database
+        count = visitor_counter.value()
         return jsonify({'success': True, 'count': count})
     except Exception as e:
         print(f"Error getting visitor count: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Readiness probe for load balancers: 200 once the prediction model is loaded, 503 before
+@app.route('/ready')
+def ready():
+    status = dict(predictor_status)
+    if predictor is None:
+        status['ready'] = False
+        return jsonify(status), 503
+    status['ready'] = True
+    status['model_version'] = predictor.model_version
+    status['using_fallback'] = predictor.using_fallback
+    return jsonify(status)
+
 # Authentication routes
 @app.route('/register', methods=['POST'])
 def register():
@@ -171,19 +405,17 @@ def register():
         hashed_password = generate_password_hash(password)
         
         # Save user to database
-        conn = sqlite3.connect('food_predictions.db')
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute(
-                'INSERT INTO users (username, email, password) VALUES (?, ?, ?)',
-                (username, email, hashed_password)
-            )
-            conn.commit()
-            
-            # Get the user_id
-            cursor.execute('SELECT id FROM users WHERE username = ?', (username,))
-            user_id = cursor.fetchone()[0]
+            with db.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'INSERT INTO users (username, email, password) VALUES (?, ?, ?)',
+                    (username, email, hashed_password)
+                )
+                
+                # Get the user_id
+                cursor.execute('SELECT id FROM users WHERE username = ?', (username,))
+                user_id = cursor.fetchone()[0]
             
             # Set session
             session['user_id'] = user_id
@@ -192,9 +424,6 @@ def register():
             return jsonify({'success': True, 'message': 'Registration successful', 'username': username})
         except sqlite3.IntegrityError:
             return jsonify({'error': 'Username or email already exists'}), 400
-        '''
-        finally:
-            conn.close()'''
     
     except Exception as e:
         print(f"Error in registration: {str(e)}")
@@ -220,7 +449,7 @@ def login():
             return jsonify({'success': True, 'message': 'Admin login successful', 'username': 'Garuda', 'is_admin': True})
         
         # Regular user check
-        with sqlite3.connect('food_predictions.db') as conn:
+        with db.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT id, username, password FROM users WHERE username = ?', (username,))
             user = cursor.fetchone()
@@ -254,6 +483,110 @@ def check_auth():
     else:
         return jsonify({'authenticated': False})
 
+# Response returned instead of a prediction when the LLM says the item is not food
+def non_edible_response(food_name, quantity):
+    return {
+        'food_data': {
+            'name': food_name,
+            'quantity': quantity,
+            'category': 'None',
+            'subcategory': 'None',
+            'processing_level': 'None',
+            'calories': 'Unknown',
+            'glycemic_index': 'Unknown',
+            'inflammatory_index': '1/10',
+            'allergens': 'None',
+            'is_non_edible': True
+        },
+        'non_edible_message': f"'{food_name}' is not a food item. Please enter a valid food name."
+    }
+
+# Write-behind key of the rows a logged-in user queued, so their reads wait only for their own rows
+def user_write_key(user_id):
+    return f"user:{user_id}"
+
+# Read-your-writes for one user: wait (bounded) for the history rows they queued, not everyone's
+def wait_for_user_writes(user_id):
+    if user_id and not db_writer.flush_key(user_write_key(user_id), timeout=DB_FLUSH_TIMEOUT):
+        print(f"Queued rows of user {user_id} not committed after {DB_FLUSH_TIMEOUT}s, reading without them")
+
+# Wait (bounded) for every queued row, for admin reads across all users
+def wait_for_all_writes():
+    if not db_writer.flush(timeout=DB_FLUSH_TIMEOUT):
+        print(f"Queued rows not committed after {DB_FLUSH_TIMEOUT}s, reading without them")
+
+# Save a prediction to the history of a logged-in user (committed in the background)
+def save_prediction(food_name, food_data, prediction_results, user_id, is_default=False):
+    save_prediction_json(food_name, json.dumps(food_data), json.dumps(prediction_results), user_id, is_default)
+
+# Same as save_prediction, for food data and results that are already JSON
+def save_prediction_json(food_name, food_data_json, prediction_results_json, user_id, is_default=False):
+    print(f"User ID for this prediction: {user_id}")
+    db_writer.submit(
+        'INSERT INTO predictions (food_name, food_data, prediction_results, user_id, timestamp, is_default) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        (food_name, food_data_json, prediction_results_json, user_id, sql_timestamp(), int(is_default)),
+        key=user_write_key(user_id)
+    )
+    print(f"Queued prediction for database for user {user_id}")
+
+# Answer /predict from the result cache; returns None on a miss
+def cached_prediction_response(cache_key, model_version, food_name, quantity):
+    entry = prediction_result_cache.get(cache_key, model_version)
+    if entry is None:
+        return None
+    
+    body = entry['body']
+    if entry['request'] != json.dumps([food_name, quantity]):
+        # Same food typed differently; echo the caller's spelling like a fresh request would
+        if entry['food_data'] is None:
+            body = jsonify(non_edible_response(food_name, quantity)).get_data()
+        else:
+            food_data = json.loads(entry['food_data'])
+            food_data['food_name'] = food_name
+            food_data['quantity'] = quantity
+            body = jsonify({
+                'food_data': food_data,
+                'prediction_results': json.loads(entry['prediction_results'])
+            }).get_data()
+    
+    # Save prediction to database only if user is logged in
+    user_id = session.get('user_id')
+    if user_id and entry['prediction_results'] is not None:
+        save_prediction_json(food_name, entry['food_data'], entry['prediction_results'], user_id)
+    
+    return app.response_class(body, mimetype='application/json')
+
+# Store a /predict response in the result cache; food_data and prediction_results are None for non-edible items
+def cache_prediction_response(cache_key, model_version, food_name, quantity, response, food_data_json=None, prediction_results_json=None):
+    prediction_result_cache.set(cache_key, model_version, {
+        'body': response.get_data(),
+        'request': json.dumps([food_name, quantity]),
+        'food_data': food_data_json,
+        'prediction_results': prediction_results_json
+    })
+
+# Answer /predict from the warm cache snapshot; returns None if the food is not in it
+def warm_prediction_response(food_name, quantity):
+    warm = warm_cache.get(food_name)
+    if warm is None:
+        return None
+    
+    food_data, prediction_results = warm
+    food_data['food_name'] = food_name
+    food_data['quantity'] = quantity
+    print(f"Serving warm cache prediction for: {food_name}, quantity: {quantity}")
+    
+    # Save prediction to database only if user is logged in
+    user_id = session.get('user_id')
+    if user_id:
+        save_prediction(food_name, food_data, prediction_results, user_id)
+    
+    return jsonify({
+        'food_data': food_data,
+        'prediction_results': prediction_results
+    })
+
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
@@ -267,9 +600,26 @@ def predict():
         if not food_name:
             return jsonify({'error': 'Food name is required'}), 400
         
+        # Popular foods are answered from the warm cache snapshot without loading the model
+        warm = warm_prediction_response(food_name, quantity)
+        if warm is not None:
+            return warm
+        
+        # Load predictor
+        pred = get_predictor()
+        if pred is None:
+            return jsonify({'error': 'Failed to load the prediction model'}), 500
+        
+        # Identical requests against the same model are served from the result cache
+        cache_key = result_cache_key(food_name, quantity)
+        cached = cached_prediction_response(cache_key, pred.model_version, food_name, quantity)
+        if cached is not None:
+            print(f"Serving cached prediction for: {food_name}, quantity: {quantity}")
+            return cached
+        
         # Get food attributes from LLM and check for alerts
         print(f"Getting food attributes for: {food_name}, quantity: {quantity}")
-        food_data = llm_api.get_food_attributes(food_name)
+        food_data, is_default = llm_api.lookup_food_attributes(food_name)
         
         # Check for alert in the response
         if 'alert' in food_data:
@@ -278,48 +628,25 @@ def predict():
         # Check if the item is non-edible
         if food_data.get('is_non_edible', False) or food_data.get('category') == 'None':
             # Return formatted data for non-edible items
-            non_edible_response = {
-                'food_data': {
-                    'name': food_name,
-                    'quantity': quantity,
-                    'category': 'None',
-                    'subcategory': 'None',
-                    'processing_level': 'None',
-                    'calories': 'Unknown',
-                    'glycemic_index': 'Unknown',
-                    'inflammatory_index': '1/10',
-                    'allergens': 'None',
-                    'is_non_edible': True
-                },
-                'non_edible_message': f"'{food_name}' is not a food item. Please enter a valid food name."
-            }
-            return jsonify(non_edible_response)
+            response = jsonify(non_edible_response(food_name, quantity))
+            cache_prediction_response(cache_key, pred.model_version, food_name, quantity, response)
+            return response
         
         food_data['quantity'] = quantity
         print(f"Retrieved food data: {food_data}")
         
-        # Load predictor
-        pred = get_predictor()
-        if pred is None:
-            return jsonify({'error': 'Failed to load the prediction model'}), 500
-        
         # Make prediction
         print(f"Making prediction for food data")
         prediction_results = pred.predict(food_data)
         print(f"Prediction results: {prediction_results}")
         
+        food_data_json = json.dumps(food_data)
+        prediction_results_json = json.dumps(prediction_results)
+        
         # Save prediction to database only if user is logged in
         user_id = session.get('user_id')
         if user_id:
-            with sqlite3.connect('food_predictions.db') as conn:
-                cursor = conn.cursor()
-                print(f"User ID for this prediction: {user_id}")
-                cursor.execute(
-                    'INSERT INTO predictions (food_name, food_data, prediction_results, user_id) VALUES (?, ?, ?, ?)',
-                    (food_name, json.dumps(food_data), json.dumps(prediction_results), user_id)
-                )
-                conn.commit()
-                print(f"Saved prediction to database for user {user_id}")
+            save_prediction_json(food_name, food_data_json, prediction_results_json, user_id, is_default)
         else:
             print("User not logged in, not saving prediction history")
         
@@ -329,12 +656,206 @@ def predict():
             'prediction_results': prediction_results
         }
         print(f"Sending response: {response_data}")
-        return jsonify(response_data)
+        response = jsonify(response_data)
+        # Predictions from the default attributes of a failed lookup are not cached, so the next request retries the LLM
+        if not is_default:
+            cache_prediction_response(cache_key, pred.model_version, food_name, quantity, response,
+                                      food_data_json, prediction_results_json)
+        return response
     
     except Exception as e:
         print(f"Error in prediction: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# Async version of /predict; the LLM lookup runs on the shared event loop
+@app.route('/async/predict', methods=['POST'])
+async def predict_async():
+    try:
+        data = request.json
+        print(f"Received async prediction request with data: {data}")
+        
+        food_name = data.get('food_name')
+        quantity = data.get('quantity', 'Standard serving')
+        
+        if not food_name:
+            return jsonify({'error': 'Food name is required'}), 400
+        
+        warm = warm_prediction_response(food_name, quantity)
+        if warm is not None:
+            return warm
+        
+        # Model loading, prediction and SQLite writes block, so keep them off the event loop
+        loop = asyncio.get_running_loop()
+        pred = await loop.run_in_executor(None, get_predictor)
+        if pred is None:
+            return jsonify({'error': 'Failed to load the prediction model'}), 500
+        
+        # Same result cache as /predict
+        cache_key = result_cache_key(food_name, quantity)
+        cached = cached_prediction_response(cache_key, pred.model_version, food_name, quantity)
+        if cached is not None:
+            print(f"Serving cached prediction for: {food_name}, quantity: {quantity}")
+            return cached
+        
+        food_data, is_default = await async_llm_api.lookup_food_attributes(food_name)
+        
+        if 'alert' in food_data:
+            return jsonify({'alert': food_data['alert']}), 400
+        
+        if food_data.get('is_non_edible', False) or food_data.get('category') == 'None':
+            response = jsonify(non_edible_response(food_name, quantity))
+            cache_prediction_response(cache_key, pred.model_version, food_name, quantity, response)
+            return response
+        
+        food_data['quantity'] = quantity
+        prediction_results = await loop.run_in_executor(None, pred.predict, food_data)
+        
+        food_data_json = json.dumps(food_data)
+        prediction_results_json = json.dumps(prediction_results)
+        user_id = session.get('user_id')
+        if user_id:
+            await loop.run_in_executor(None, save_prediction_json, food_name, food_data_json, prediction_results_json,
+                                       user_id, is_default)
+        
+        response = jsonify({
+            'food_data': food_data,
+            'prediction_results': prediction_results
+        })
+        # Predictions from the default attributes of a failed lookup are not cached, as in /predict
+        if not is_default:
+            cache_prediction_response(cache_key, pred.model_version, food_name, quantity, response,
+                                      food_data_json, prediction_results_json)
+        return response
+    
+    except Exception as e:
+        print(f"Error in async prediction: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# Maximum number of foods accepted by a single batch prediction request
+MAX_BATCH_SIZE = 100
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    try:
+        # Accept either a list of food names or a list of {food_name, quantity} objects
+        data = request.json
+        foods = data.get('foods')
+
+        if not foods or not isinstance(foods, list):
+            return jsonify({'error': 'A non-empty list of foods is required'}), 400
+        if len(foods) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_BATCH_SIZE} foods can be predicted per request'}), 400
+
+        items = []
+        for food in foods:
+            if isinstance(food, str):
+                food = {'food_name': food}
+            if not isinstance(food, dict) or not food.get('food_name'):
+                return jsonify({'error': 'Food name is required for every item'}), 400
+            items.append((food['food_name'], food.get('quantity', 'Standard serving')))
+
+        print(f"Received batch prediction request for {len(items)} foods")
+
+        # Get food attributes for every item: cached foods first, then the rest concurrently from the LLM
+        lookups = [llm_api.cached_food_attributes(food_name) for food_name, _ in items]
+        defaults = set()
+        misses = [i for i, food_data in enumerate(lookups) if food_data is None]
+        if misses:
+            print(f"Looking up attributes of {len(misses)} foods")
+            fetched = batch_lookup_executor.map(
+                lambda food_name: llm_api.lookup_food_attributes(food_name, check_cache=False),
+                [items[i][0] for i in misses]
+            )
+            for i, (food_data, is_default) in zip(misses, fetched):
+                lookups[i] = food_data
+                if is_default:
+                    defaults.add(i)
+
+        responses = [None] * len(items)
+        edible = []
+        for i, ((food_name, quantity), food_data) in enumerate(zip(items, lookups)):
+            if 'alert' in food_data:
+                responses[i] = {'food_name': food_name, 'alert': food_data['alert']}
+            elif food_data.get('is_non_edible', False) or food_data.get('category') == 'None':
+                responses[i] = non_edible_response(food_name, quantity)
+            else:
+                food_data['quantity'] = quantity
+                edible.append((i, food_name, food_data))
+
+        if edible:
+            # Load predictor
+            pred = get_predictor()
+            if pred is None:
+                return jsonify({'error': 'Failed to load the prediction model'}), 500
+
+            # Predict all edible foods in one pass
+            prediction_results = pred.predict_batch([food_data for _, _, food_data in edible])
+            for (i, _, food_data), results in zip(edible, prediction_results):
+                responses[i] = {
+                    'food_data': food_data,
+                    'prediction_results': results
+                }
+
+            # Save predictions to database only if user is logged in
+            user_id = session.get('user_id')
+            if user_id:
+                timestamp = sql_timestamp()
+                db_writer.submit_many(
+                    'INSERT INTO predictions (food_name, food_data, prediction_results, user_id, timestamp, is_default) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [
+                        (food_name, json.dumps(food_data), json.dumps(results), user_id, timestamp, int(i in defaults))
+                        for (i, food_name, food_data), results in zip(edible, prediction_results)
+                    ],
+                    key=user_write_key(user_id)
+                )
+                print(f"Queued {len(edible)} predictions for database for user {user_id}")
+
+        return jsonify({'results': responses})
+
+    except Exception as e:
+        print(f"Error in batch prediction: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# Load recent chat history formatted as LLM conversation context
+def load_conversation_history(user_id, chat_session_id):
+    # The previous exchange may still be in the write-behind queue
+    wait_for_user_writes(user_id)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        # If user is logged in, get their chat history, otherwise use session-based history
+        if user_id:
+            cursor.execute(
+                'SELECT user_message, bot_response FROM chat_history WHERE user_id = ? ORDER BY timestamp ASC LIMIT 10',
+                (user_id,)
+            )
+        else:
+            cursor.execute(
+                'SELECT user_message, bot_response FROM chat_history WHERE session_id = ? ORDER BY timestamp ASC LIMIT 10',
+                (chat_session_id,)
+            )
+        history = cursor.fetchall()
+    
+    print(f"Retrieved {len(history)} chat history messages")
+    
+    # Format history for the API
+    conversation_history = []
+    for user_msg, bot_msg in history:
+        conversation_history.append({"role": "user", "content": user_msg})
+        conversation_history.append({"role": "assistant", "content": bot_msg})
+    
+    print(f"Formatted {len(conversation_history)} messages for context")
+    return conversation_history
+
+# Save a chat exchange to the history of a logged-in user (committed in the background)
+def save_chat_message(chat_session_id, message, response, user_id):
+    db_writer.submit(
+        'INSERT INTO chat_history (session_id, user_message, bot_response, user_id, timestamp) VALUES (?, ?, ?, ?, ?)',
+        (chat_session_id, message, response, user_id, sql_timestamp()),
+        key=user_write_key(user_id)
+    )
+    print(f"Queued chat message for database for user {user_id}")
+
 @app.route('/chat', methods=['POST'])
 def chat():
     try:
@@ -355,44 +876,14 @@ def chat():
             session['chat_session_id'] = os.urandom(16).hex()
         
         # Get chat history from the database
-        with sqlite3.connect('food_predictions.db') as conn:
-            cursor = conn.cursor()
-            # If user is logged in, get their chat history, otherwise use session-based history
-            if user_id:
-                cursor.execute(
-                    'SELECT user_message, bot_response FROM chat_history WHERE user_id = ? ORDER BY timestamp ASC LIMIT 10',
-                    (user_id,)
-                )
-            else:
-                cursor.execute(
-                    'SELECT user_message, bot_response FROM chat_history WHERE session_id = ? ORDER BY timestamp ASC LIMIT 10',
-                    (session['chat_session_id'],)
-                )
-            history = cursor.fetchall()
-        
-        print(f"Retrieved {len(history)} chat history messages")
-        
-        # Format history for the API
-        conversation_history = []
-        for user_msg, bot_msg in history:
-            conversation_history.append({"role": "user", "content": user_msg})
-            conversation_history.append({"role": "assistant", "content": bot_msg})
-        
-        print(f"Formatted {len(conversation_history)} messages for context")
+        conversation_history = load_conversation_history(user_id, session['chat_session_id'])
         
         # Get response from LLM with context
         response = llm_api.chat(message, conversation_history)
         
         # Save to database only if user is logged in
         if user_id:
-            with sqlite3.connect('food_predictions.db') as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    'INSERT INTO chat_history (session_id, user_message, bot_response, user_id) VALUES (?, ?, ?, ?)',
-                    (session['chat_session_id'], message, response, user_id)
-                )
-                conn.commit()
-                print(f"Saved chat message to database for user {user_id}")
+            save_chat_message(session['chat_session_id'], message, response, user_id)
         else:
             print("User not logged in, not saving chat history")
             
@@ -402,6 +893,128 @@ def chat():
         print(f"Error in chat: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# Format one server-sent event
+def sse_event(data):
+    return f"data: {json.dumps(data)}\n\n"
+
+# Streaming version of /chat; sends the reply as server-sent events while the LLM produces it
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    try:
+        data = request.json
+        print(f"Received streaming chat request with data: {data}")
+        
+        message = data.get('message')
+        if not message:
+            return jsonify({'error': 'Message is required'}), 400
+        
+        user_id = session.get('user_id')
+        if 'chat_session_id' not in session:
+            session['chat_session_id'] = os.urandom(16).hex()
+        chat_session_id = session['chat_session_id']
+        
+        conversation_history = load_conversation_history(user_id, chat_session_id)
+    
+    except Exception as e:
+        print(f"Error in streaming chat: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        # Events: {"token": "..."} for each piece of the reply, then {"done": true},
+        # or {"error": "...", "incomplete": true} if the reply broke off
+        pieces = []
+        try:
+            for piece in llm_api.chat_stream(message, conversation_history):
+                pieces.append(piece)
+                yield sse_event({'token': piece})
+            
+            # Save the completed exchange only if user is logged in
+            if user_id:
+                save_chat_message(chat_session_id, message, ''.join(pieces), user_id)
+            yield sse_event({'done': True})
+        except StreamError as e:
+            # The stream failed after part of the reply was sent; a truncated reply is not saved
+            print(f"Chat stream failed after {len(pieces)} pieces: {e.status_code} - {e.error}")
+            yield sse_event({'error': "The reply was interrupted. Please try again.", 'incomplete': True})
+        except Exception as e:
+            print(f"Error in streaming chat: {str(e)}")
+            yield sse_event({'error': str(e)})
+    
+    # Disable proxy buffering so tokens reach the client as they are produced
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Async version of /chat; the LLM call runs on the shared event loop
+@app.route('/async/chat', methods=['POST'])
+async def chat_async():
+    try:
+        data = request.json
+        print(f"Received async chat request with data: {data}")
+        
+        message = data.get('message')
+        if not message:
+            return jsonify({'error': 'Message is required'}), 400
+        
+        user_id = session.get('user_id')
+        if 'chat_session_id' not in session:
+            session['chat_session_id'] = os.urandom(16).hex()
+        chat_session_id = session['chat_session_id']
+        
+        # SQLite calls block, so keep them off the event loop
+        loop = asyncio.get_running_loop()
+        conversation_history = await loop.run_in_executor(
+            None, load_conversation_history, user_id, chat_session_id
+        )
+        
+        response = await async_llm_api.chat(message, conversation_history)
+        
+        if user_id:
+            await loop.run_in_executor(None, save_chat_message, chat_session_id, message, response, user_id)
+        
+        return jsonify({'response': response})
+    
+    except Exception as e:
+        print(f"Error in async chat: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# Largest page size accepted by the history endpoints
+MAX_PAGE_SIZE = 100
+
+# Read the limit and cursor query parameters of a paginated endpoint.
+# Returns (limit, after) where after is None or the (timestamp, id) of the
+# last row of the previous page; raises ValueError for bad parameters.
+def page_params(default_limit):
+    try:
+        limit = int(request.args.get('limit', default_limit))
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    limit = min(limit, MAX_PAGE_SIZE)
+    
+    cursor = request.args.get('cursor')
+    if not cursor:
+        return limit, None
+    timestamp, row_id = decode_cursor(cursor, 2)
+    return limit, (timestamp, int(row_id))
+
+# Keyset condition selecting rows after the cursor in (timestamp DESC, id DESC) order
+def keyset_clause(after):
+    if after is None:
+        return '', ()
+    return ' AND (timestamp, id) < (?, ?)', after
+
+# Split one extra fetched row off a page and turn it into the next cursor
+def split_page(rows, limit):
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last['timestamp'], last['id'])
+
 @app.route('/history', methods=['GET'])
 def history():
     try:
@@ -409,26 +1022,39 @@ def history():
         user_id = session.get('user_id')
         print(f"Fetching history for user_id: {user_id}")
         
-        # Get predictions history
-        with sqlite3.connect('food_predictions.db') as conn:
+        try:
+            limit, after = page_params(10)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        keyset, keyset_args = keyset_clause(after)
+        
+        # Wait for this user's queued inserts so a just-saved prediction shows up
+        wait_for_user_writes(user_id)
+        
+        # Get predictions history, newest first, one page at a time
+        with db.connection() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             if user_id:
                 # Get user-specific history if logged in
                 cursor.execute(
-                    'SELECT food_name, prediction_results, timestamp FROM predictions WHERE user_id = ? ORDER BY timestamp DESC LIMIT 10',
-                    (user_id,)
+                    'SELECT id, food_name, prediction_results, timestamp FROM predictions WHERE user_id = ?' + keyset +
+                    ' ORDER BY timestamp DESC, id DESC LIMIT ?',
+                    (user_id, *keyset_args, limit + 1)
                 )
             else:
                 # Get session-based history if not logged in
                 cursor.execute(
-                    'SELECT food_name, prediction_results, timestamp FROM predictions WHERE user_id IS NULL ORDER BY timestamp DESC LIMIT 10'
+                    'SELECT id, food_name, prediction_results, timestamp FROM predictions WHERE user_id IS NULL' + keyset +
+                    ' ORDER BY timestamp DESC, id DESC LIMIT ?',
+                    (*keyset_args, limit + 1)
                 )
-            predictions = cursor.fetchall()
+            predictions, next_cursor = split_page(cursor.fetchall(), limit)
         print(f"Found {len(predictions)} prediction records")
         
         # Format the results
         prediction_history = []
-        for food_name, results, timestamp in predictions:
+        for _, food_name, results, timestamp in predictions:
             try:
                 parsed_results = json.loads(results)
                 prediction_history.append({
@@ -441,7 +1067,7 @@ def history():
                 continue
         
         print(f"Formatted {len(prediction_history)} history items")
-        return jsonify({'history': prediction_history})
+        return jsonify({'history': prediction_history, 'next_cursor': next_cursor})
     
     except Exception as e:
         print(f"Error retrieving history: {str(e)}")
@@ -454,28 +1080,40 @@ def chat_history():
         user_id = session.get('user_id')
         print(f"Fetching chat history for user_id: {user_id}")
         
-        # Get chat history
-        with sqlite3.connect('food_predictions.db') as conn:
+        try:
+            limit, after = page_params(20)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        keyset, keyset_args = keyset_clause(after)
+        
+        # Wait for this user's queued inserts so a just-saved message shows up
+        wait_for_user_writes(user_id)
+        
+        # Get chat history, newest first, one page at a time
+        with db.connection() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             if user_id:
                 # Get user-specific chat history if logged in
                 cursor.execute(
-                    'SELECT user_message, bot_response, timestamp FROM chat_history WHERE user_id = ? ORDER BY timestamp DESC LIMIT 20',
-                    (user_id,)
+                    'SELECT id, user_message, bot_response, timestamp FROM chat_history WHERE user_id = ?' + keyset +
+                    ' ORDER BY timestamp DESC, id DESC LIMIT ?',
+                    (user_id, *keyset_args, limit + 1)
                 )
             else:
                 # Get session-based chat history if not logged in
                 cursor.execute(
-                    'SELECT user_message, bot_response, timestamp FROM chat_history WHERE session_id = ? ORDER BY timestamp DESC LIMIT 20',
-                    (session.get('chat_session_id', ''),)
+                    'SELECT id, user_message, bot_response, timestamp FROM chat_history WHERE session_id = ?' + keyset +
+                    ' ORDER BY timestamp DESC, id DESC LIMIT ?',
+                    (session.get('chat_session_id', ''), *keyset_args, limit + 1)
                 )
-            history = cursor.fetchall()
+            history, next_cursor = split_page(cursor.fetchall(), limit)
         
         print(f"Found {len(history)} chat history records")
         
         # Format the results
         chat_history = []
-        for user_msg, bot_msg, timestamp in history:
+        for _, user_msg, bot_msg, timestamp in history:
             chat_history.append({
                 'user_message': user_msg,
                 'bot_response': bot_msg,
@@ -483,7 +1121,7 @@ def chat_history():
             })
         
         print(f"Formatted {len(chat_history)} chat history items")
-        return jsonify({'history': chat_history})
+        return jsonify({'history': chat_history, 'next_cursor': next_cursor})
     
     except Exception as e:
         print(f"Error retrieving chat history: {str(e)}")
@@ -495,8 +1133,11 @@ def clear_predictions():
         # Get user ID if logged in
         user_id = session.get('user_id')
         
+        # Let this user's queued inserts land first so they are cleared too
+        wait_for_user_writes(user_id)
+        
         # Connect to database
-        with sqlite3.connect('food_predictions.db') as conn:
+        with db.connection() as conn:
             cursor = conn.cursor()
             if user_id:
                 # Clear user-specific predictions if logged in
@@ -520,8 +1161,11 @@ def clear_chats():
         # Get user ID if logged in
         user_id = session.get('user_id')
         
+        # Let this user's queued inserts land first so they are cleared too
+        wait_for_user_writes(user_id)
+        
         # Connect to database
-        with sqlite3.connect('food_predictions.db') as conn:
+        with db.connection() as conn:
             cursor = conn.cursor()
             if user_id:
                 # Clear user-specific chat history if logged in
@@ -555,6 +1199,136 @@ def manifest():
     response.headers['Content-Type'] = 'application/manifest+json'
     return response
 
+EXPLANATION_SYSTEM_PROMPT = "You are a nutritionist specializing in women's health and menstrual cycles. Provide scientifically accurate, concise explanations."
+
+# Build the prompt asking the AI to explain a prediction
+def build_explanation_prompt(food_name, impacts, food_data):
+    prompt = f"Explain why {food_name} would have the following impacts on menstrual symptoms:\n"
+    for symptom, impact in impacts.items():
+        prompt += f"- {symptom.capitalize()}: {impact}\n"
+    
+    # Add additional food data for better context
+    prompt += "\nFood details:\n"
+    if food_data:
+        for key, value in food_data.items():
+            if value and value != "Unknown":
+                prompt += f"- {key.replace('_', ' ').capitalize()}: {value}\n"
+    
+    prompt += "\nProvide 4-5 specific points that explain these impacts focusing on:\n"
+    prompt += "1. Specific nutrients or compounds in this food that affect hormones or inflammation\n"
+    prompt += "2. How the glycemic index or processing level might influence symptoms\n"
+    prompt += "3. Scientific explanation of the biological mechanisms involved\n"
+    prompt += "4. Why certain symptoms are more affected than others\n"
+    prompt += "Make each point concise and focused on one specific aspect."
+    return prompt
+
+# Split an AI explanation into separate points
+def parse_explanation(explanation_text):
+    explanation_text = explanation_text.strip()
+    explanation_points = [p.strip() for p in explanation_text.split('\n') if p.strip() and not p.strip().startswith('-')]
+    
+    # Fallback to use bullet points if parsing fails
+    if not explanation_points:
+        explanation_points = explanation_text.split('\n')
+    return explanation_points
+
+# Simulated AI explanation used when OpenAI is not available
+def simulated_explanation(food_name, impacts, food_data):
+    nutrients = {
+        "fruits": ["vitamin C", "antioxidants", "natural sugars", "fiber"],
+        "vegetables": ["fiber", "vitamins", "minerals", "phytonutrients"],
+        "grains": ["complex carbohydrates", "fiber", "B vitamins"],
+        "dairy": ["calcium", "protein", "fat", "vitamin D"],
+        "meat": ["protein", "iron", "B12", "zinc"],
+        "seafood": ["omega-3 fatty acids", "protein", "iodine"],
+        "nuts": ["healthy fats", "protein", "vitamin E", "magnesium"],
+        "legumes": ["protein", "fiber", "folate", "iron"],
+        "processed": ["sodium", "trans fats", "preservatives", "refined sugars"],
+        "sweets": ["refined sugars", "saturated fats", "artificial flavors"],
+        "fats_oils": ["fatty acids", "omega-3", "omega-6", "vitamin E"],
+        "spices": ["antioxidants", "anti-inflammatory compounds", "essential oils"]
+    }
+    
+    beneficial_count = sum(1 for impact in impacts.values() if impact == "Beneficial")
+    harmful_count = sum(1 for impact in impacts.values() if impact == "Harmful")
+    
+    # Determine food category (using provided data if available)
+    food_category = "fruits"  # default
+    if food_data and food_data.get('category') and food_data.get('category') != "Unknown":
+        category_lower = food_data.get('category').lower()
+        for category in nutrients.keys():
+            if category.lower() in category_lower:
+                food_category = category
+                break
+    else:
+        # Fallback to food name matching
+        for category in nutrients.keys():
+            if category.lower() in food_name.lower():
+                food_category = category
+                break
+    
+    # Get processing level and glycemic data
+    processing = "minimally processed"
+    if food_data and food_data.get('processing') and food_data.get('processing') != "Unknown":
+        processing = food_data.get('processing').lower()
+    
+    glycemic = "medium"
+    if food_data and food_data.get('glycemic_index') and food_data.get('glycemic_index') != "Unknown":
+        gi_text = food_data.get('glycemic_index').lower()
+        if "high" in gi_text:
+            glycemic = "high"
+        elif "low" in gi_text:
+            glycemic = "low"
+    
+    # Generate explanation points
+    explanation = []
+    
+    # Point 1: General impact based on nutrients
+    if beneficial_count > harmful_count:
+        explanation.append(f"{food_name.capitalize()} contains nutrients that generally support hormonal balance during menstruation, including {nutrients[food_category][0]} and {nutrients[food_category][1]}.")
+    else:
+        explanation.append(f"{food_name.capitalize()} contains compounds that may trigger or worsen menstrual symptoms in some individuals, particularly due to its {nutrients[food_category][0]} and {nutrients[food_category][2]} content.")
+    
+    # Point 2: Processing level impact
+    if "highly" in processing or "ultra" in processing:
+        explanation.append(f"As a {processing} food, {food_name} may contain additives or altered nutrient profiles that can affect hormone balance and potentially trigger inflammation in sensitive individuals.")
+    else:
+        explanation.append(f"Being {processing}, {food_name} retains more of its natural nutrients that can help support the body during menstruation.")
+    
+    # Point 3: Glycemic impact explanation
+    if glycemic == "high":
+        explanation.append(f"The high glycemic index of {food_name} can cause rapid blood sugar fluctuations, which may worsen mood swings and fatigue during your cycle.")
+    elif glycemic == "low":
+        explanation.append(f"With a low glycemic index, {food_name} provides steady energy release that helps stabilize blood sugar and reduce mood swings commonly experienced during menstruation.")
+    
+    # Point 4: Specific symptom impact
+    most_impacted = None
+    for symptom, impact in impacts.items():
+        if impact == "Beneficial" or impact == "Harmful":
+            most_impacted = (symptom, impact)
+            break
+            
+    if most_impacted:
+        symptom, impact = most_impacted
+        if impact == "Beneficial":
+            explanation.append(f"The nutrients in {food_name} specifically target {symptom} by affecting prostaglandin production, which regulates pain and inflammation during menstruation.")
+        else:
+            explanation.append(f"{food_name.capitalize()} may worsen {symptom} due to compounds that can increase inflammation or fluid retention in susceptible individuals.")
+    
+    # Point 5: Individual variation
+    explanation.append(f"Individual responses to {food_name} may vary based on personal sensitivities, overall diet composition, and the specific phase of your menstrual cycle when consumed.")
+    
+    return explanation
+
+# Generic explanation used when building an explanation fails
+def fallback_explanation(food_name):
+    return [
+        f"Based on our analysis, {food_name} appears to affect menstrual symptoms through several biological mechanisms.",
+        "Nutrient content and glycemic impact may influence hormone regulation and inflammation responses.",
+        "The level of processing and presence of certain compounds can directly affect symptoms like bloating and cramps.",
+        "Everyone responds differently to foods based on individual sensitivities and hormonal profiles."
+    ]
+
 # Add new route for AI explanations
 @app.route('/explain-prediction', methods=['POST'])
 def explain_prediction():
@@ -565,23 +1339,7 @@ def explain_prediction():
         food_data = data.get('food_data', {})
         
         # Create a comprehensive prompt for the AI
-        prompt = f"Explain why {food_name} would have the following impacts on menstrual symptoms:\n"
-        for symptom, impact in impacts.items():
-            prompt += f"- {symptom.capitalize()}: {impact}\n"
-        
-        # Add additional food data for better context
-        prompt += "\nFood details:\n"
-        if food_data:
-            for key, value in food_data.items():
-                if value and value != "Unknown":
-                    prompt += f"- {key.replace('_', ' ').capitalize()}: {value}\n"
-        
-        prompt += "\nProvide 4-5 specific points that explain these impacts focusing on:\n"
-        prompt += "1. Specific nutrients or compounds in this food that affect hormones or inflammation\n"
-        prompt += "2. How the glycemic index or processing level might influence symptoms\n"
-        prompt += "3. Scientific explanation of the biological mechanisms involved\n"
-        prompt += "4. Why certain symptoms are more affected than others\n"
-        prompt += "Make each point concise and focused on one specific aspect."
+        prompt = build_explanation_prompt(food_name, impacts, food_data)
         
         # If you have OpenAI integration:
         try:
@@ -594,7 +1352,7 @@ def explain_prediction():
                 response = openai.ChatCompletion.create(
                     model="gpt-3.5-turbo",
                     messages=[
-                        {"role": "system", "content": "You are a nutritionist specializing in women's health and menstrual cycles. Provide scientifically accurate, concise explanations."},
+                        {"role": "system", "content": EXPLANATION_SYSTEM_PROMPT},
                         {"role": "user", "content": prompt}
                     ],
                     max_tokens=500,
@@ -602,113 +1360,54 @@ def explain_prediction():
                 )
                 
                 # Extract explanation points from the response
-                explanation_text = response.choices[0].message['content'].strip()
-                explanation_points = [p.strip() for p in explanation_text.split('\n') if p.strip() and not p.strip().startswith('-')]
-                
-                # Fallback to use bullet points if parsing fails
-                if not explanation_points:
-                    explanation_points = explanation_text.split('\n')
-                
-                return jsonify({"explanation": explanation_points})
+                return jsonify({"explanation": parse_explanation(response.choices[0].message['content'])})
         except Exception as e:
             print(f"OpenAI API error: {e}")
             # Fall back to simulated response
         
         # Simulated AI response if OpenAI is not available
-        nutrients = {
-            "fruits": ["vitamin C", "antioxidants", "natural sugars", "fiber"],
-            "vegetables": ["fiber", "vitamins", "minerals", "phytonutrients"],
-            "grains": ["complex carbohydrates", "fiber", "B vitamins"],
-            "dairy": ["calcium", "protein", "fat", "vitamin D"],
-            "meat": ["protein", "iron", "B12", "zinc"],
-            "seafood": ["omega-3 fatty acids", "protein", "iodine"],
-            "nuts": ["healthy fats", "protein", "vitamin E", "magnesium"],
-            "legumes": ["protein", "fiber", "folate", "iron"],
-            "processed": ["sodium", "trans fats", "preservatives", "refined sugars"],
-            "sweets": ["refined sugars", "saturated fats", "artificial flavors"],
-            "fats_oils": ["fatty acids", "omega-3", "omega-6", "vitamin E"],
-            "spices": ["antioxidants", "anti-inflammatory compounds", "essential oils"]
-        }
+        return jsonify({"explanation": simulated_explanation(food_name, impacts, food_data)})
         
-        beneficial_count = sum(1 for impact in impacts.values() if impact == "Beneficial")
-        harmful_count = sum(1 for impact in impacts.values() if impact == "Harmful")
-        
-        # Determine food category (using provided data if available)
-        food_category = "fruits"  # default
-        if food_data and food_data.get('category') and food_data.get('category') != "Unknown":
-            category_lower = food_data.get('category').lower()
-            for category in nutrients.keys():
-                if category.lower() in category_lower:
-                    food_category = category
-                    break
-        else:
-            # Fallback to food name matching
-            for category in nutrients.keys():
-                if category.lower() in food_name.lower():
-                    food_category = category
-                    break
-        
-        # Get processing level and glycemic data
-        processing = "minimally processed"
-        if food_data and food_data.get('processing') and food_data.get('processing') != "Unknown":
-            processing = food_data.get('processing').lower()
-        
-        glycemic = "medium"
-        if food_data and food_data.get('glycemic_index') and food_data.get('glycemic_index') != "Unknown":
-            gi_text = food_data.get('glycemic_index').lower()
-            if "high" in gi_text:
-                glycemic = "high"
-            elif "low" in gi_text:
-                glycemic = "low"
-        
-        # Generate explanation points
-        explanation = []
-        
-        # Point 1: General impact based on nutrients
-        if beneficial_count > harmful_count:
-            explanation.append(f"{food_name.capitalize()} contains nutrients that generally support hormonal balance during menstruation, including {nutrients[food_category][0]} and {nutrients[food_category][1]}.")
-        else:
-            explanation.append(f"{food_name.capitalize()} contains compounds that may trigger or worsen menstrual symptoms in some individuals, particularly due to its {nutrients[food_category][0]} and {nutrients[food_category][2]} content.")
+    except Exception as e:
+        print(f"Error in explain_prediction: {e}")
+        return jsonify({"explanation": fallback_explanation(food_name)})
+
+# Async version of /explain-prediction using the non-blocking OpenAI call
+@app.route('/async/explain-prediction', methods=['POST'])
+async def explain_prediction_async():
+    try:
+        data = request.json
+        food_name = data.get('food_name', '')
+        impacts = data.get('impacts', {})
+        food_data = data.get('food_data', {})
         
-        # Point 2: Processing level impact
-        if "highly" in processing or "ultra" in processing:
-            explanation.append(f"As a {processing} food, {food_name} may contain additives or altered nutrient profiles that can affect hormone balance and potentially trigger inflammation in sensitive individuals.")
-        else:
-            explanation.append(f"Being {processing}, {food_name} retains more of its natural nutrients that can help support the body during menstruation.")
-        
-        # Point 3: Glycemic impact explanation
-        if glycemic == "high":
-            explanation.append(f"The high glycemic index of {food_name} can cause rapid blood sugar fluctuations, which may worsen mood swings and fatigue during your cycle.")
-        elif glycemic == "low":
-            explanation.append(f"With a low glycemic index, {food_name} provides steady energy release that helps stabilize blood sugar and reduce mood swings commonly experienced during menstruation.")
-        
-        # Point 4: Specific symptom impact
-        most_impacted = None
-        for symptom, impact in impacts.items():
-            if impact == "Beneficial" or impact == "Harmful":
-                most_impacted = (symptom, impact)
-                break
-                
-        if most_impacted:
-            symptom, impact = most_impacted
-            if impact == "Beneficial":
-                explanation.append(f"The nutrients in {food_name} specifically target {symptom} by affecting prostaglandin production, which regulates pain and inflammation during menstruation.")
-            else:
-                explanation.append(f"{food_name.capitalize()} may worsen {symptom} due to compounds that can increase inflammation or fluid retention in susceptible individuals.")
+        prompt = build_explanation_prompt(food_name, impacts, food_data)
         
-        # Point 5: Individual variation
-        explanation.append(f"Individual responses to {food_name} may vary based on personal sensitivities, overall diet composition, and the specific phase of your menstrual cycle when consumed.")
+        try:
+            import openai
+            
+            if os.environ.get('OPENAI_API_KEY'):
+                openai.api_key = os.environ.get('OPENAI_API_KEY')
+                
+                response = await openai.ChatCompletion.acreate(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": EXPLANATION_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=500,
+                    temperature=0.7
+                )
+                
+                return jsonify({"explanation": parse_explanation(response.choices[0].message['content'])})
+        except Exception as e:
+            print(f"OpenAI API error: {e}")
         
-        return jsonify({"explanation": explanation})
+        return jsonify({"explanation": simulated_explanation(food_name, impacts, food_data)})
         
     except Exception as e:
-        print(f"Error in explain_prediction: {e}")
-        return jsonify({"explanation": [
-            f"Based on our analysis, {food_name} appears to affect menstrual symptoms through several biological mechanisms.",
-            "Nutrient content and glycemic impact may influence hormone regulation and inflammation responses.",
-            "The level of processing and presence of certain compounds can directly affect symptoms like bloating and cramps.",
-            "Everyone responds differently to foods based on individual sensitivities and hormonal profiles."
-        ]})
+        print(f"Error in async explain_prediction: {e}")
+        return jsonify({"explanation": fallback_explanation(food_name)})
 
 # Feedback route
 @app.route('/submit-feedback', methods=['POST'])
@@ -724,19 +1423,17 @@ def submit_feedback():
         user_id = session.get('user_id')
         username = session.get('username')
         
-        # Save feedback to database
-        with sqlite3.connect('food_predictions.db') as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                'INSERT INTO feedbacks (feedback_text, user_id, username) VALUES (?, ?, ?)',
-                (feedback_text, user_id, username)
-            )
-            conn.commit()
-            # Also append to feedbacks.txt file
-            with open('feedbacks.txt', 'a') as f:
-                f.write(f"User: {username or 'Anonymous'}, Time: {cursor.execute('SELECT datetime()').fetchone()[0]}\n")
-                f.write(f"Feedback: {feedback_text}\n")
-                f.write("-" * 50 + "\n")
+        # Save feedback to database (committed in the background)
+        timestamp = sql_timestamp()
+        db_writer.submit(
+            'INSERT INTO feedbacks (feedback_text, user_id, username, timestamp) VALUES (?, ?, ?, ?)',
+            (feedback_text, user_id, username, timestamp)
+        )
+        # Also append to feedbacks.txt file
+        with open('feedbacks.txt', 'a') as f:
+            f.write(f"User: {username or 'Anonymous'}, Time: {timestamp}\n")
+            f.write(f"Feedback: {feedback_text}\n")
+            f.write("-" * 50 + "\n")
         return jsonify({'success': True, 'message': 'Feedback submitted successfully'})
     
     except Exception as e:
@@ -750,9 +1447,11 @@ def admin_feedbacks():
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        with sqlite3.connect('food_predictions.db') as conn:
-            conn.row_factory = sqlite3.Row
+        # Include feedback still waiting in the write-behind queue
+        wait_for_all_writes()
+        with db.connection() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             cursor.execute('SELECT * FROM feedbacks ORDER BY timestamp DESC')
             feedbacks = [dict(row) for row in cursor.fetchall()]
         return jsonify({'success': True, 'feedbacks': feedbacks})
@@ -774,7 +1473,7 @@ def admin_set_notification():
         if message is None:
             return jsonify({'error': 'Message is required'}), 400
         
-        with sqlite3.connect('food_predictions.db') as conn:
+        with db.connection() as conn:
             cursor = conn.cursor()
             # Deactivate all previous notifications
             cursor.execute('UPDATE notifications SET is_active = FALSE')
@@ -785,6 +1484,7 @@ def admin_set_notification():
                     (message, is_active)
                 )
             conn.commit()
+        notification_cache.invalidate()
         return jsonify({'success': True, 'message': 'Notification updated successfully'})
     
     except Exception as e:
@@ -794,19 +1494,126 @@ def admin_set_notification():
 @app.route('/get-active-notification', methods=['GET'])
 def get_active_notification():
     try:
-        with sqlite3.connect('food_predictions.db') as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM notifications WHERE is_active = TRUE ORDER BY created_at DESC LIMIT 1')
-            notification = cursor.fetchone()
-        if notification:
-            return jsonify({'success': True, 'notification': dict(notification)})
+        notification, etag = notification_cache.get()
+        
+        # Pollers that already have this notification get an empty 304
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
         else:
-            return jsonify({'success': True, 'notification': None})
+            response = jsonify({'success': True, 'notification': notification})
+        response.set_etag(etag)
+        # Clients may keep the response but must revalidate it on every poll
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     
     except Exception as e:
         print(f"Error fetching notification: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/admin/reload-model', methods=['POST'])
+def admin_reload_model():
+    if not is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    if model_reload_lock.locked():
+        return jsonify({'error': 'A model reload is already running'}), 409
+    
+    # Load in the background; the current model keeps serving until the swap
+    threading.Thread(target=reload_predictor, kwargs={'force': True}, name='model-reload', daemon=True).start()
+    return jsonify({'success': True, 'message': 'Model reload started'}), 202
+
+@app.route('/admin/corrections', methods=['POST'])
+def admin_add_correction():
+    if not is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        corrections = data.get('corrections')
+        if not isinstance(corrections, dict) or not corrections:
+            return jsonify({'error': 'corrections must map target columns to labels'}), 400
+        
+        unknown = [col for col in corrections if col not in TARGET_COLUMNS]
+        if unknown:
+            return jsonify({'error': f"Unknown target columns: {', '.join(unknown)}"}), 400
+        
+        prediction_id = data.get('prediction_id')
+        if prediction_id is not None:
+            # Correct a logged prediction: its food data, with the admin's labels over the served ones
+            wait_for_all_writes()
+            with db.connection() as conn:
+                row = conn.execute(
+                    'SELECT food_name, food_data, prediction_results FROM predictions WHERE id = ?',
+                    (prediction_id,)
+                ).fetchone()
+            if row is None:
+                return jsonify({'error': 'Prediction not found'}), 404
+            food_name = row[0]
+            food_data = json.loads(row[1])
+            results = json.loads(row[2]) if row[2] else {}
+        else:
+            food_data = data.get('food_data')
+            if not isinstance(food_data, dict):
+                return jsonify({'error': 'prediction_id or food_data is required'}), 400
+            food_name = data.get('food_name', food_data.get('food_name'))
+            results = {}
+        
+        results = {col: results[col] for col in TARGET_COLUMNS if col in results}
+        results.update(corrections)
+        missing = [col for col in TARGET_COLUMNS if col not in results]
+        if missing:
+            return jsonify({'error': f"Missing labels for: {', '.join(missing)}"}), 400
+        
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'INSERT INTO prediction_corrections (prediction_id, food_name, food_data, corrected_results, timestamp) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (prediction_id, food_name, json.dumps(food_data), json.dumps(results), sql_timestamp())
+            )
+            correction_id = cursor.lastrowid
+            conn.commit()
+        print(f"Saved correction {correction_id} for {food_name}")
+        return jsonify({'success': True, 'correction_id': correction_id, 'corrected_results': results}), 201
+    
+    except Exception as e:
+        print(f"Error saving correction: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/update-model', methods=['POST'])
+def admin_update_model():
+    if not is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    if model_update_lock.locked():
+        return jsonify({'error': 'A model update is already running'}), 409
+    
+    data = request.get_json(silent=True) or {}
+    threading.Thread(
+        target=run_incremental_update, kwargs={'include_predictions': bool(data.get('include_predictions'))},
+        name='model-update', daemon=True
+    ).start()
+    return jsonify({'success': True, 'message': 'Incremental model update started'}), 202
+
+@app.route('/admin/metrics', methods=['GET'])
+def admin_metrics():
+    if not is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    return jsonify({
+        'success': True,
+        'food_attribute_cache': food_attribute_cache.stats(),
+        'prediction_result_cache': prediction_result_cache.stats(),
+        'warm_cache': warm_cache.stats(),
+        'model': dict(model_reload_status, model_version=predictor.model_version if predictor else None),
+        'model_updates': model_update_status,
+        'database': db.stats(),
+        'write_behind': db_writer.stats(),
+        'visitor_counter': visitor_counter.stats(),
+        'notification_cache': notification_cache.stats(),
+        'llm': llm_api.stats(),
+        'async_llm': async_llm_api.stats()
+    })
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, threaded=True)
@@ -0,0 +1,97 @@
+"""
+Benchmark: pooled keep-alive sessions vs one-off requests.post
+
+Sends the same chat/completions request to a local mock LLM server through
+the old module-level requests.post, a SessionPool with keep-alive, and a
+SessionPool with keep-alive disabled, and reports per-call latency.
+
+The mock server speaks plain HTTP, so the savings shown are TCP handshake
+and connection setup only; against the real HTTPS endpoint the pooled
+session also skips the TLS handshake, which is usually the larger cost.
+
+Usage:
+    python benchmarks/bench_http_pool.py --requests 500 --threads 4
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.http_pool import SessionPool
+from benchmarks.mock_llm_server import MockLLMServer
+
+PAYLOAD = {
+    "model": "mock",
+    "messages": [{"role": "user", "content": "Is ginger good for cramps?"}],
+    "max_tokens": 50
+}
+
+
+def run(post, url, n_requests, threads):
+    """Send n_requests through post() and return per-call latencies in seconds"""
+    def one_call(_):
+        start = time.perf_counter()
+        response = post(url, json=PAYLOAD, timeout=(5, 5))
+        response.raise_for_status()
+        response.json()
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(one_call, range(n_requests)))
+
+
+def summarize(name, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    return {
+        "name": name,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": p95 * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled HTTP sessions for GroqAPI")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per variant")
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent client threads")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock server latency in seconds")
+    args = parser.parse_args()
+
+    with MockLLMServer(latency=args.latency) as server:
+        url = f"{server.base_url}/chat/completions"
+
+        keep_alive = SessionPool(pool_size=args.threads, connect_timeout=5, read_timeout=5)
+        no_keep_alive = SessionPool(pool_size=args.threads, keep_alive=False, connect_timeout=5, read_timeout=5)
+
+        # Warm up the server and the pooled connections
+        run(keep_alive.post, url, args.threads * 2, args.threads)
+
+        results = [
+            summarize("requests.post (new connection)", run(requests.post, url, args.requests, args.threads)),
+            summarize("SessionPool, keep-alive off", run(no_keep_alive.post, url, args.requests, args.threads)),
+            summarize("SessionPool, keep-alive on", run(keep_alive.post, url, args.requests, args.threads))
+        ]
+
+        keep_alive.close()
+        no_keep_alive.close()
+
+    print(f"{args.requests} requests, {args.threads} threads, mock latency {args.latency * 1000:.0f}ms")
+    print(f"{'variant':<34}{'mean':>10}{'p50':>10}{'p95':>10}")
+    for result in results:
+        print(f"{result['name']:<34}{result['mean_ms']:>8.2f}ms{result['p50_ms']:>8.2f}ms{result['p95_ms']:>8.2f}ms")
+
+    saved = results[0]["mean_ms"] - results[2]["mean_ms"]
+    print(f"\nLatency saved per call with pooled keep-alive sessions: {saved:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark: per-worker memory of pickled vs memory-mapped model artifacts
+
+Starts several worker processes that each load a Predictor, the way
+separately started gunicorn workers do, and reports how much memory the
+load added to each worker. Pickled artifacts are copied into every worker's
+private memory; the memory-mapped engine (see export_mmap_engine) is backed
+by the same files, so its pages are shared and PSS (RSS with shared pages
+split between the processes using them) drops as workers are added.
+
+The linear models trained by default are tiny, so --random-forest builds a
+throwaway artifact set with a random forest of the given size on random data,
+reusing the encoders of the real artifacts, to show the difference on a
+large model.
+
+Reads /proc/self/smaps_rollup, so it only runs on Linux.
+
+Usage:
+    python benchmarks/bench_model_memory.py --workers 4 --random-forest 300
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.predict import ARTIFACT_FILES, Predictor, current_artifact_dir, export_mmap_engine
+
+SAMPLE_FOOD = {
+    "food_name": "Banana",
+    "food_category": "Fruits",
+    "food_subcategory": "Tropical",
+    "processing_level": "Raw",
+    "caffeine_content_mg": 0,
+    "flavor_profile": "Sweet",
+    "common_allergens": "None",
+    "glycemic_index": 51,
+    "inflammatory_index": -1,
+    "calories_kcal": 105
+}
+
+
+def memory_kb():
+    """Rss, Pss and private (unshared) memory of this process in kB"""
+    values = {}
+    with open("/proc/self/smaps_rollup", "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                values[parts[0][:-1]] = int(parts[1])
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "private": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)
+    }
+
+
+def worker(artifact_dir, mmap, barrier, results):
+    # Imports are done before the baseline so only the artifacts are measured
+    import numpy  # noqa: F401
+    import sklearn.ensemble  # noqa: F401
+
+    before = memory_kb()
+    predictor = Predictor(artifact_dir=artifact_dir, mmap=mmap)
+    predictor.predict_batch([SAMPLE_FOOD] * 64)
+
+    # Measure while every worker holds its model, so shared pages are split between them
+    barrier.wait()
+    after = memory_kb()
+    barrier.wait()
+    results.put({name: after[name] - before[name] for name in after})
+
+
+def run(artifact_dir, mmap, n_workers):
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(n_workers)
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=worker, args=(artifact_dir, mmap, barrier, results))
+        for _ in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+    deltas = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return deltas
+
+
+def build_random_forest_artifacts(source_dir, n_trees):
+    """Copy the real artifacts into a temporary directory with a random forest as the model"""
+    import joblib
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.multioutput import MultiOutputClassifier
+
+    artifact_dir = tempfile.mkdtemp(prefix="bench_model_memory_")
+    for name in ARTIFACT_FILES:
+        shutil.copy(os.path.join(source_dir, name), artifact_dir)
+
+    with open(os.path.join(source_dir, "feature_columns.txt"), "r") as f:
+        n_features = len(f.read().split(","))
+    target_encoders = joblib.load(os.path.join(source_dir, "target_encoders.pkl"))
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(5000, n_features))
+    y = np.column_stack([
+        rng.integers(0, len(encoder.classes_), size=X.shape[0])
+        for encoder in target_encoders.values()
+    ])
+    model = MultiOutputClassifier(RandomForestClassifier(n_estimators=n_trees, random_state=0, n_jobs=-1))
+    model.fit(X, y)
+    joblib.dump(model, os.path.join(artifact_dir, "best_model.pkl"))
+    return artifact_dir
+
+
+def summarize(name, deltas):
+    n = len(deltas)
+    return (
+        f"{name:<8} rss {sum(d['rss'] for d in deltas) / n / 1024:8.1f} MB"
+        f"   pss {sum(d['pss'] for d in deltas) / n / 1024:8.1f} MB"
+        f"   private {sum(d['private'] for d in deltas) / n / 1024:8.1f} MB"
+        f"   total pss {sum(d['pss'] for d in deltas) / 1024:8.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--artifact-dir", default=current_artifact_dir())
+    parser.add_argument("--random-forest", type=int, default=0, metavar="TREES",
+                        help="Benchmark a random forest with this many trees per target instead of the trained model")
+    args = parser.parse_args()
+
+    artifact_dir = args.artifact_dir
+    if args.random_forest:
+        artifact_dir = build_random_forest_artifacts(args.artifact_dir, args.random_forest)
+    try:
+        export_mmap_engine(artifact_dir)
+        print(f"\nMemory added per worker by loading the model ({args.workers} workers):")
+        print(summarize("pickle", run(artifact_dir, False, args.workers)))
+        print(summarize("mmap", run(artifact_dir, True, args.workers)))
+    finally:
+        if args.random_forest:
+            shutil.rmtree(artifact_dir, ignore_errors=True)
@@ -0,0 +1,452 @@
+"""
+Benchmark suite for the prediction path
+
+Trains one artifact set per model type train_models.py can produce (the
+candidates, the distilled students and the online model) into temporary
+directories, generates synthetic food dicts that match feature_columns.txt,
+and runs every registered benchmark against each artifact set:
+
+- single: Predictor.predict latency percentiles, compiled engine and sklearn path
+- encode: Predictor._encode_food_data and _encode_batch latency
+- decode: Predictor._decode_predictions latency
+- batch: Predictor.predict_batch throughput at several batch sizes
+- cold_start: import and load time and peak memory in a fresh interpreter,
+  from the pickles and from the memory-mapped engine (Linux only: reads
+  /proc/self/status)
+
+Results are written as JSON. Pass an earlier run with --compare to print the
+change of every metric and exit with status 1 when one regressed by more
+than --threshold, e.g. to compare two commits:
+
+    git checkout main && python benchmarks/bench_predict.py --output main.json
+    git checkout my-branch && python benchmarks/bench_predict.py --compare main.json
+
+Requirements: the models are trained from the training CSV (--csv, default
+menstruation_food_recommendations_noisy.csv) when it exists. Otherwise the
+rows are random but encoded like the live artifacts in models/trained_models,
+which `python models/train_models.py` produces. A fresh checkout has neither,
+so the suite falls back to random rows over SYNTHETIC_FEATURES, a copy of the
+training feature set, and says so. The labels are random in both fallbacks,
+so the timings are meaningful and the trained models' accuracy is not.
+
+New benchmarks are functions decorated with @benchmark("name") that take a
+BenchContext and return a dict of metrics.
+Metric names ending in _ms, _seconds or _mb are lower-is-better, names
+ending in _per_second higher-is-better.
+
+Usage:
+    python benchmarks/bench_predict.py --models "Random Forest,SVM" --bench single,batch
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+
+# Add the project root to the path for imports
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from models.predict import Predictor, current_artifact_dir, export_mmap_engine
+
+DEFAULT_CSV = "menstruation_food_recommendations_noisy.csv"
+
+# Benchmarks by name, in the order they run; add one with @benchmark("name")
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def model_types():
+    """Builders for every model type train_models.py can produce, by name"""
+    from models.distill import build_students
+    from models.incremental import build_online_model
+    from models.train_models import MODEL_NAMES, build_model
+
+    types = {name: (lambda name=name: build_model(name)) for name in MODEL_NAMES}
+    for name in build_students():
+        types[f"Distilled {name}"] = lambda name=name: build_students()[name]
+    types["Online SGD"] = build_online_model
+    return types
+
+
+# Feature set of train_models.py, for benchmarking without its CSV or artifacts:
+# categorical columns with their categories, numeric ones with (mean, std)
+SYNTHETIC_FEATURES = [
+    ("name", [f"User{i}" for i in range(1, 1001)]),
+    ("preference", ["Balanced", "High Protein", "Low Carb"]),
+    ("age", (32.0, 8.0)),
+    ("food_id", (18.0, 10.0)),
+    ("food_name", [f"Food {i}" for i in range(35)]),
+    ("food_category", ["Beverages", "Confectionery", "Dairy", "Fruits", "Grains", "Herbs & Spices", "Legumes",
+                       "Nuts & Seeds", "Oils & Fats", "Proteins", "Vegetables"]),
+    ("food_subcategory", [f"Subcategory {i}" for i in range(28)]),
+    ("processing_level", ["Highly Processed", "Minimally Processed", "Natural"]),
+    ("caffeine_content_mg", (10.0, 25.0)),
+    ("flavor_profile", ["Bitter", "Neutral", "Salty", "Sour", "Spicy", "Sweet"]),
+    ("common_allergens", ["Dairy", "Eggs", "Gluten", "Nuts", "None", "Soy"]),
+    ("glycemic_index", (35.0, 20.0)),
+    ("inflammatory_index", (0.0, 1.5)),
+    ("calories_kcal", (180.0, 150.0))
+]
+SYNTHETIC_TARGET_CLASSES = ["Beneficial", "Harmful", "Neutral"]
+
+
+def synthetic_schema():
+    """(feature_columns, label_encoders, target_encoders, mean, scale) built from SYNTHETIC_FEATURES"""
+    from sklearn.preprocessing import LabelEncoder
+    from models.train_models import target_columns
+
+    feature_columns = [col for col, _ in SYNTHETIC_FEATURES]
+    label_encoders = {col: LabelEncoder().fit(spec) for col, spec in SYNTHETIC_FEATURES if isinstance(spec, list)}
+    target_encoders = {col: LabelEncoder().fit(SYNTHETIC_TARGET_CLASSES) for col in target_columns}
+    mean = np.array([spec[0] if isinstance(spec, tuple) else 0.0 for _, spec in SYNTHETIC_FEATURES])
+    scale = np.array([spec[1] if isinstance(spec, tuple) else 1.0 for _, spec in SYNTHETIC_FEATURES])
+    return feature_columns, label_encoders, target_encoders, mean, scale
+
+
+def load_training_data(csv_path, train_rows, seed):
+    """
+    (X, y, feature_columns, label_encoders, target_encoders) for training the benchmarked models
+
+    From the CSV when it exists; otherwise random rows encoded like the live
+    artifacts, or like SYNTHETIC_FEATURES when there are none either.
+    """
+    from models.train_models import target_columns
+
+    if os.path.exists(csv_path):
+        from models.data_cache import load_encoded_dataset
+
+        dataset = load_encoded_dataset(csv_path, target_columns)
+        order = np.random.default_rng(seed).permutation(len(dataset.X))[:train_rows]
+        return (np.asarray(dataset.X)[order], np.asarray(dataset.y)[order], dataset.feature_columns,
+                dataset.label_encoders, dataset.target_encoders)
+
+    artifact_dir = current_artifact_dir()
+    if os.path.exists(os.path.join(artifact_dir, "label_encoders.pkl")):
+        # No CSV: random rows in the live artifacts' encoding, with random labels
+        print(f"{csv_path} not found, training on random rows encoded like {artifact_dir}")
+        label_encoders = joblib.load(os.path.join(artifact_dir, "label_encoders.pkl"))
+        target_encoders = joblib.load(os.path.join(artifact_dir, "target_encoders.pkl"))
+        scaler = joblib.load(os.path.join(artifact_dir, "scaler.pkl"))
+        with open(os.path.join(artifact_dir, "feature_columns.txt"), "r") as f:
+            feature_columns = f.read().split(",")
+        mean, scale = scaler.mean_, scaler.scale_
+    else:
+        # Fresh checkout: neither ships with the repo
+        print(f"{csv_path} not found and no trained artifacts in {artifact_dir}; training on random rows with "
+              f"the SYNTHETIC_FEATURES schema. For the real encoders run python models/train_models.py first.")
+        feature_columns, label_encoders, target_encoders, mean, scale = synthetic_schema()
+
+    rng = np.random.default_rng(seed)
+    X = mean + scale * rng.normal(size=(train_rows, len(feature_columns)))
+    for j, col in enumerate(feature_columns):
+        if col in label_encoders:
+            X[:, j] = rng.integers(0, len(label_encoders[col].classes_), size=train_rows)
+    y = np.column_stack([
+        rng.integers(0, len(target_encoders[col].classes_), size=train_rows) for col in target_columns
+    ])
+    return X, y, feature_columns, label_encoders, target_encoders
+
+
+def build_artifacts(name, builder, data):
+    """Train one model type and save a complete artifact set in a temporary directory"""
+    from sklearn.preprocessing import StandardScaler
+
+    X, y, feature_columns, label_encoders, target_encoders = data
+    scaler = StandardScaler().fit(X)
+    model = builder()
+    started = time.perf_counter()
+    model.fit(scaler.transform(X), y)
+    print(f"Trained {name} on {len(X)} rows in {time.perf_counter() - started:.1f}s")
+
+    artifact_dir = tempfile.mkdtemp(prefix="bench_predict_")
+    joblib.dump(model, os.path.join(artifact_dir, "best_model.pkl"))
+    joblib.dump(scaler, os.path.join(artifact_dir, "scaler.pkl"))
+    joblib.dump(label_encoders, os.path.join(artifact_dir, "label_encoders.pkl"))
+    joblib.dump(target_encoders, os.path.join(artifact_dir, "target_encoders.pkl"))
+    with open(os.path.join(artifact_dir, "feature_columns.txt"), "w") as f:
+        f.write(",".join(feature_columns))
+    return artifact_dir
+
+
+def synthetic_foods(artifact_dir, n_items, seed):
+    """Food dicts with every column in feature_columns.txt: known categories and numbers around the training mean"""
+    label_encoders = joblib.load(os.path.join(artifact_dir, "label_encoders.pkl"))
+    scaler = joblib.load(os.path.join(artifact_dir, "scaler.pkl"))
+    with open(os.path.join(artifact_dir, "feature_columns.txt"), "r") as f:
+        feature_columns = f.read().split(",")
+
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for j, col in enumerate(feature_columns):
+        if col in label_encoders:
+            categories = [c for c in label_encoders[col].classes_ if not (isinstance(c, float) and np.isnan(c))]
+            columns[col] = [categories[i] for i in rng.integers(0, len(categories), size=n_items)]
+        else:
+            columns[col] = (scaler.mean_[j] + scaler.scale_[j] * rng.normal(size=n_items)).round(2).tolist()
+    return [{col: values[i] for col, values in columns.items()} for i in range(n_items)]
+
+
+class BenchContext:
+    """One artifact set and its synthetic inputs, with predictors loaded on first use"""
+
+    def __init__(self, artifact_dir, items, args):
+        self.artifact_dir = artifact_dir
+        self.items = items
+        self.args = args
+        self._predictors = {}
+
+    def predictor(self, compiled=True):
+        if compiled not in self._predictors:
+            self._predictors[compiled] = Predictor(compiled=compiled, artifact_dir=self.artifact_dir, mmap=False)
+        return self._predictors[compiled]
+
+
+def percentiles(timings, prefix):
+    """p50/p90/p99/mean of per-call timings (seconds) as {prefix}_p50_ms, ..."""
+    ms = np.asarray(timings) * 1000
+    return {
+        f"{prefix}_p50_ms": float(np.percentile(ms, 50)),
+        f"{prefix}_p90_ms": float(np.percentile(ms, 90)),
+        f"{prefix}_p99_ms": float(np.percentile(ms, 99)),
+        f"{prefix}_mean_ms": float(ms.mean())
+    }
+
+
+def time_calls(func, items, warmup=10):
+    for item in items[:warmup]:
+        func(item)
+    timings = []
+    for item in items:
+        started = time.perf_counter()
+        func(item)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+@benchmark("single")
+def bench_single(ctx):
+    items = ctx.items[:ctx.args.iterations]
+    results = percentiles(time_calls(ctx.predictor(compiled=True).predict, items), "compiled")
+    # The pandas + sklearn path is slower, so it gets fewer calls
+    results.update(percentiles(time_calls(ctx.predictor(compiled=False).predict, items[:ctx.args.iterations // 4]), "sklearn"))
+    return results
+
+
+@benchmark("encode")
+def bench_encode(ctx):
+    predictor = ctx.predictor(compiled=False)
+    items = ctx.items[:ctx.args.iterations // 4]
+    results = percentiles(time_calls(predictor._encode_food_data, items), "encode_food_data")
+    results.update(percentiles(time_calls(lambda item: predictor._encode_batch([item]), items), "encode_batch_one"))
+    return results
+
+
+@benchmark("decode")
+def bench_decode(ctx):
+    predictor = ctx.predictor(compiled=False)
+    rng = np.random.default_rng(ctx.args.seed)
+    predictions = [
+        np.array([[rng.integers(0, len(predictor.target_encoders[col].classes_)) for col in predictor.target_columns]])
+        for _ in range(ctx.args.iterations // 4)
+    ]
+    results = percentiles(time_calls(predictor._decode_predictions, predictions), "decode_predictions")
+    results.update(percentiles(time_calls(predictor._decode_batch, predictions), "decode_batch_one"))
+    return results
+
+
+@benchmark("batch")
+def bench_batch(ctx):
+    results = {}
+    for compiled, label in ((True, "compiled"), (False, "sklearn")):
+        predictor = ctx.predictor(compiled=compiled)
+        for batch_size in ctx.args.batch_sizes:
+            batch = ctx.items[:batch_size]
+            predictor.predict_batch(batch)
+            # Up to batch_rows rows, stopping early on slow paths after batch_seconds
+            rows = 0
+            started = time.perf_counter()
+            while rows < ctx.args.batch_rows and (not rows or time.perf_counter() - started < ctx.args.batch_seconds):
+                predictor.predict_batch(batch)
+                rows += len(batch)
+            results[f"{label}_batch{batch_size}_rows_per_second"] = rows / (time.perf_counter() - started)
+    return results
+
+
+# Run by cold_start in a fresh interpreter: argv is root, artifact dir, mmap flag, items JSON path
+COLD_START_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.append(sys.argv[1])
+from models.predict import Predictor
+imported = time.perf_counter()
+predictor = Predictor(artifact_dir=sys.argv[2], mmap=sys.argv[3] == "1")
+loaded = time.perf_counter()
+with open(sys.argv[4], "r") as f:
+    items = json.load(f)
+predictor.predict(items[0])
+first = time.perf_counter()
+predictor.predict_batch(items)
+# VmHWM is the peak resident size of this process; ru_maxrss would include the parent's before exec
+with open("/proc/self/status", "r") as f:
+    peak_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+print(json.dumps({
+    "import_seconds": imported - started,
+    "load_seconds": loaded - imported,
+    "first_predict_seconds": first - loaded,
+    "peak_rss_mb": peak_kb / 1024,
+    "kinds": list(predictor.engine.kinds) if predictor.engine is not None else None
+}))
+"""
+
+
+@benchmark("cold_start")
+def bench_cold_start(ctx):
+    results = {}
+    items_path = os.path.join(ctx.artifact_dir, "bench_items.json")
+    with open(items_path, "w") as f:
+        json.dump(ctx.items[:ctx.args.batch_sizes[-1]], f)
+    try:
+        export_mmap_engine(ctx.artifact_dir)
+    except Exception as e:
+        print(f"Could not export memory-mapped model: {str(e)}")
+    for mmap, label in ((False, "pickle"), (True, "mmap")):
+        if mmap and not os.path.exists(os.path.join(ctx.artifact_dir, "mmap")):
+            continue
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_START_SCRIPT, ROOT, ctx.artifact_dir, "1" if mmap else "0", items_path],
+            capture_output=True, text=True, check=True
+        ).stdout
+        # Predictor prints progress; the measurements are the last line
+        measured = json.loads(output.strip().splitlines()[-1])
+        results[f"{label}_engine"] = ", ".join(measured.pop("kinds") or ["sklearn"])
+        results.update({f"{label}_{key}": value for key, value in measured.items()})
+    return results
+
+
+def is_lower_better(metric):
+    return metric.endswith(("_ms", "_seconds", "_mb"))
+
+
+def compare(baseline, current, threshold):
+    """Print every metric's change against the baseline and return the regressions"""
+    regressions = []
+    print(f"\nChange against {baseline['meta'].get('commit') or 'baseline'} (regression threshold {threshold:.0%}):")
+    for model, benches in current["results"].items():
+        for bench, metrics in benches.items():
+            old_metrics = baseline["results"].get(model, {}).get(bench, {})
+            for metric, value in metrics.items():
+                old = old_metrics.get(metric)
+                if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                    continue
+                change = (value - old) / old
+                if is_lower_better(metric):
+                    worse = change > threshold
+                else:
+                    worse = metric.endswith("_per_second") and change < -threshold
+                flag = "  REGRESSION" if worse else ""
+                if worse:
+                    regressions.append((model, bench, metric, change))
+                print(f"  {model:<36} {bench}.{metric:<44} {old:12.4f} -> {value:12.4f} ({change:+.1%}){flag}")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", default=None, help="Comma-separated model types (default: all)")
+    parser.add_argument("--bench", default=None, help=f"Comma-separated benchmarks (default: {','.join(BENCHMARKS)})")
+    parser.add_argument("--csv", default=DEFAULT_CSV)
+    parser.add_argument("--train-rows", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=2000, help="Calls timed by the latency benchmarks")
+    parser.add_argument("--batch-sizes", default="1,64,1024")
+    parser.add_argument("--batch-rows", type=int, default=20000, help="Rows predicted per batch size")
+    parser.add_argument("--batch-seconds", type=float, default=2.0, help="Time limit per batch size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_predict.json")
+    parser.add_argument("--compare", default=None, metavar="BASELINE_JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression")
+    args = parser.parse_args()
+    args.batch_sizes = sorted(int(size) for size in args.batch_sizes.split(","))
+
+    types = model_types()
+    names = list(types) if args.models is None else [name.strip() for name in args.models.split(",")]
+    benches = list(BENCHMARKS) if args.bench is None else [name.strip() for name in args.bench.split(",")]
+    unknown = [name for name in names if name not in types] + [name for name in benches if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown model types or benchmarks: {', '.join(unknown)}. "
+                     f"Models: {', '.join(types)}. Benchmarks: {', '.join(BENCHMARKS)}")
+
+    data = load_training_data(args.csv, args.train_rows, args.seed)
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "sklearn": __import__("sklearn").__version__,
+            "platform": platform.platform(),
+            "train_rows": len(data[0]),
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+        },
+        "results": {}
+    }
+
+    for name in names:
+        artifact_dir = build_artifacts(name, types[name], data)
+        try:
+            n_items = max(args.iterations, args.batch_sizes[-1])
+            ctx = BenchContext(artifact_dir, synthetic_foods(artifact_dir, n_items, args.seed), args)
+            report["results"][name] = {}
+            for bench in benches:
+                started = time.perf_counter()
+                report["results"][name][bench] = BENCHMARKS[bench](ctx)
+                print(f"  {name} / {bench} done in {time.perf_counter() - started:.1f}s")
+        finally:
+            shutil.rmtree(artifact_dir, ignore_errors=True)
+
+    print("\nResults:")
+    for name, benches_run in report["results"].items():
+        print(f"{name}")
+        for bench, metrics in benches_run.items():
+            for metric, value in metrics.items():
+                print(f"  {bench}.{metric:<44} {value:.4f}" if isinstance(value, float) else f"  {bench}.{metric:<44} {value}")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
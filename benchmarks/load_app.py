@@ -0,0 +1,303 @@
+"""
+Load test: the whole Flask app over HTTP, with the LLM replaced by a mock
+
+Starts MockLLMServer (configurable latency and error rate) in one process
+and app.py in another. The app has GroqAPI.base_url pointed at the mock
+and uses a throwaway database, so neither the Groq API nor
+food_predictions.db is touched. Registered users and an admin session
+then drive the routes from --concurrency threads for --duration seconds,
+picking each request from the --mix weights. Per route, the harness
+reports throughput, p50/p95/p99 latency and the error rate. A response
+with status 400 or above, or a failed connection, counts as an error. The
+app answers most LLM failures with a fallback, so the mock's own call and
+error counts are reported too.
+
+Routes:
+    predict          POST /predict with one of --foods food names
+    chat             POST /chat
+    history          GET /history
+    admin_metrics    GET /admin/metrics
+    admin_feedbacks  GET /admin/feedbacks
+
+The warm cache snapshot is not loaded unless --warm-cache is given, so
+/predict goes through the LLM and the model.
+
+Usage:
+    python benchmarks/load_app.py --concurrency 32 --duration 30 --latency 0.3 --error-rate 0.02
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+# Add the project root to the path for imports
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.mock_llm_server import MockLLMServer
+
+ADMIN_LOGIN = {"username": "Garuda", "password": "garuda1432"}
+CHAT_MESSAGES = [
+    "Is ginger good for cramps?",
+    "What should I eat when I feel bloated?",
+    "Does coffee make period headaches worse?",
+    "Which snacks help with fatigue?"
+]
+DEFAULT_MIX = "predict=5,chat=3,history=2,admin_metrics=1,admin_feedbacks=1"
+
+
+def serve_mock(latency, error_rate, seed, conn):
+    server = MockLLMServer(latency=latency, error_rate=error_rate, seed=seed).start()
+    conn.send(server.base_url)
+    # Any message asks for the request and error counts
+    while conn.recv() is not None:
+        conn.send(server.stats())
+
+
+def serve_app(llm_base_url, database_path, warm_cache_path, app_log, conn):
+    from werkzeug.serving import make_server
+
+    # The app prints a line or more per request; keep it out of the results
+    sys.stdout = sys.stderr = open(app_log, "a", buffering=1)
+    os.environ["DATABASE_PATH"] = database_path
+    os.environ["WARM_CACHE_PATH"] = warm_cache_path
+    os.chdir(ROOT)
+
+    import app as flask_app
+
+    flask_app.llm_api.base_url = llm_base_url
+    server = make_server("127.0.0.1", 0, flask_app.app, threaded=True)
+    conn.send(f"http://127.0.0.1:{server.server_port}")
+    server.serve_forever()
+
+
+# Each route: (method, path, JSON body or None), chosen per request
+def route_predict(rng, args):
+    return "POST", "/predict", {"food_name": f"Food {rng.randrange(args.foods)}", "quantity": "Standard serving"}
+
+
+def route_chat(rng, args):
+    return "POST", "/chat", {"message": rng.choice(CHAT_MESSAGES)}
+
+
+def route_history(rng, args):
+    return "GET", "/history", None
+
+
+def route_admin_metrics(rng, args):
+    return "GET", "/admin/metrics", None
+
+
+def route_admin_feedbacks(rng, args):
+    return "GET", "/admin/feedbacks", None
+
+
+ROUTES = {
+    "predict": route_predict,
+    "chat": route_chat,
+    "history": route_history,
+    "admin_metrics": route_admin_metrics,
+    "admin_feedbacks": route_admin_feedbacks
+}
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise ValueError(f"Unknown route {name}; choose from {', '.join(ROUTES)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+class RouteStats:
+    """Latencies, status codes and connection errors per route, shared by the worker threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+
+    def record(self, route, seconds, status):
+        with self._lock:
+            self.latencies.setdefault(route, []).append(seconds)
+            counts = self.statuses.setdefault(route, {})
+            counts[status] = counts.get(status, 0) + 1
+            if status is None or status >= 400:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    def summary(self, elapsed):
+        results = {}
+        for route, latencies in self.latencies.items():
+            ms = np.asarray(latencies) * 1000
+            results[route] = {
+                "requests": len(latencies),
+                "requests_per_second": len(latencies) / elapsed,
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "p99_ms": float(np.percentile(ms, 99)),
+                "error_rate": self.errors.get(route, 0) / len(latencies),
+                "statuses": {str(status): count for status, count in sorted(self.statuses[route].items(), key=lambda item: str(item[0]))}
+            }
+        return results
+
+
+def login_sessions(app_url, n_users):
+    """One logged-in requests.Session per test user, plus one for the admin"""
+    users = []
+    run_id = os.urandom(4).hex()
+    for i in range(n_users):
+        session = requests.Session()
+        response = session.post(f"{app_url}/register", json={
+            "username": f"load-{run_id}-{i}",
+            "email": f"load-{run_id}-{i}@example.com",
+            "password": "load-test"
+        })
+        response.raise_for_status()
+        users.append(session)
+    admin = requests.Session()
+    admin.post(f"{app_url}/login", json=ADMIN_LOGIN).raise_for_status()
+    return users, admin
+
+
+def wait_ready(app_url, timeout):
+    """Wait until /ready reports the model loaded"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{app_url}/ready", timeout=5).status_code == 200:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"App at {app_url} was not ready after {timeout}s")
+
+
+def run_load(app_url, users, admin, weights, args):
+    stats = RouteStats()
+    names = list(weights)
+    route_weights = [weights[name] for name in names]
+    warmup_end = time.monotonic() + args.warmup
+    end = warmup_end + args.duration
+
+    def worker(index):
+        rng = random.Random(args.seed + index)
+        session = users[index % len(users)]
+        while True:
+            now = time.monotonic()
+            if now >= end:
+                return
+            route = rng.choices(names, route_weights)[0]
+            method, path, body = ROUTES[route](rng, args)
+            client = admin if route.startswith("admin_") else session
+            started = time.perf_counter()
+            try:
+                status = client.request(method, f"{app_url}{path}", json=body, timeout=args.timeout).status_code
+            except requests.RequestException:
+                status = None
+            # Requests started during the warmup are not recorded
+            if now >= warmup_end:
+                stats.record(route, time.perf_counter() - started, status)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(worker, range(args.concurrency)))
+    return stats.summary(args.duration)
+
+
+def print_summary(results, elapsed):
+    print(f"\n{'route':<18}{'requests':>10}{'req/s':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'errors':>9}")
+    for route, result in sorted(results.items()):
+        print(f"{route:<18}{result['requests']:>10}{result['requests_per_second']:>9.1f}"
+              f"{result['p50_ms']:>8.1f}ms{result['p95_ms']:>8.1f}ms{result['p99_ms']:>8.1f}ms"
+              f"{result['error_rate']:>8.1%}")
+    total = sum(result["requests"] for result in results.values())
+    print(f"{'total':<18}{total:>10}{total / elapsed:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent client threads")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of unmeasured load first")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Route weights, e.g. predict=5,chat=3")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock LLM latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock LLM calls answered with HTTP 500")
+    parser.add_argument("--users", type=int, default=8, help="Registered test users the threads share")
+    parser.add_argument("--foods", type=int, default=200, help="Distinct food names sent to /predict")
+    parser.add_argument("--warm-cache", action="store_true", help="Load the warm cache snapshot (warm_cache.json)")
+    parser.add_argument("--timeout", type=float, default=60, help="Client timeout per request in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    parser.add_argument("--app-log", default=None, help="File for the app's output (default: a temporary file)")
+    args = parser.parse_args()
+
+    try:
+        weights = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    work_dir = tempfile.mkdtemp(prefix="load_app_")
+    app_log = args.app_log or os.path.join(work_dir, "app.log")
+    warm_cache_path = os.path.join(ROOT, "warm_cache.json") if args.warm_cache else os.path.join(work_dir, "warm_cache.json")
+
+    mock_conn, mock_child = multiprocessing.Pipe()
+    mock = multiprocessing.Process(
+        target=serve_mock, args=(args.latency, args.error_rate, args.seed, mock_child), daemon=True
+    )
+    mock.start()
+    llm_base_url = mock_conn.recv()
+
+    app_conn, app_child = multiprocessing.Pipe()
+    app_process = multiprocessing.Process(
+        target=serve_app,
+        args=(llm_base_url, os.path.join(work_dir, "load_test.db"), warm_cache_path, app_log, app_child),
+        daemon=True
+    )
+    app_process.start()
+    try:
+        app_url = app_conn.recv()
+        wait_ready(app_url, timeout=120)
+        users, admin = login_sessions(app_url, args.users)
+        print(f"App at {app_url}, mock LLM at {llm_base_url} "
+              f"(latency {args.latency * 1000:.0f}ms, error rate {args.error_rate:.1%}), app log {app_log}")
+        print(f"{args.concurrency} threads for {args.duration:.0f}s after {args.warmup:.0f}s warmup, mix {args.mix}")
+
+        mock_conn.send("stats")
+        llm_before = mock_conn.recv()
+        results = run_load(app_url, users, admin, weights, args)
+        mock_conn.send("stats")
+        llm_after = mock_conn.recv()
+    finally:
+        app_process.terminate()
+        mock.terminate()
+
+    print_summary(results, args.duration)
+    # Includes the warmup
+    llm = {key: llm_after[key] - llm_before[key] for key in llm_after}
+    print(f"Mock LLM: {llm['requests']} calls, {llm['errors']} answered with HTTP 500")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "args": vars(args),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "routes": results,
+                "llm": llm
+            }, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
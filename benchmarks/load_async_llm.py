@@ -0,0 +1,166 @@
+"""
+Load test: AsyncGroqAPI on one event loop vs GroqAPI on a thread pool
+
+Fires N concurrent chat requests at a local mock LLM server with a fixed
+latency, once through the blocking GroqAPI (one thread per in-flight call,
+as the threaded Flask server does) and once through AsyncGroqAPI running on
+the shared AsyncRuntime loop (as the /async/* views do). Reports wall time,
+peak thread count, peak number of requests in flight, and how many calls
+succeeded. A call fails when its response is an error (timeout, connection
+error or HTTP error status), which is checked on the raw response: chat()
+turns errors into a friendly fallback reply. The mock's --error-rate makes
+it answer that share of calls with HTTP 500, and its own count of those is
+printed alongside.
+
+This compares the clients only. The /async/* views still hold a server
+thread per request; load_async_routes.py measures that through the app.
+
+Usage:
+    python benchmarks/load_async_llm.py --concurrency 200 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.async_llm_service import AsyncGroqAPI
+from api.async_runtime import AsyncRuntime
+from api.http_pool import SessionPool
+from api.llm_service import GroqAPI
+from benchmarks.mock_llm_server import MockLLMServer
+
+MESSAGE = "Is ginger good for cramps?"
+
+
+class ThreadSampler:
+    """Record the highest thread count seen while a load test runs"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, threading.active_count())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def serve_mock(latency, error_rate, conn):
+    # Runs in a child process so the server's threads are not counted
+    server = MockLLMServer(latency=latency, error_rate=error_rate).start()
+    conn.send(server.base_url)
+    # Any message asks for the request and error counts
+    while conn.recv() is not None:
+        conn.send(server.stats())
+
+
+def make_api(base_url, pool_size):
+    api = GroqAPI(http_pool=SessionPool(pool_size=pool_size, connect_timeout=30, read_timeout=30))
+    api.base_url = base_url
+    return api
+
+
+def count_ok(responses):
+    """Calls that got a completion; the same responses chat() would parse into a reply"""
+    return sum(1 for response in responses if "error" not in response)
+
+
+def run_threaded(base_url, concurrency):
+    api = make_api(base_url, concurrency)
+    payload = api._chat_payload(MESSAGE)
+    with ThreadSampler() as sampler:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            responses = list(executor.map(lambda _: api._make_request("chat/completions", payload), range(concurrency)))
+        elapsed = time.perf_counter() - start
+    api.http_pool.close()
+    return {
+        "name": "GroqAPI + threads",
+        "wall_s": elapsed,
+        "peak_threads": sampler.peak,
+        "max_in_flight": concurrency,
+        "ok": count_ok(responses)
+    }
+
+
+def run_async(base_url, concurrency):
+    api = make_api(base_url, 1)
+    async_api = AsyncGroqAPI(api, max_connections=concurrency)
+    runtime = AsyncRuntime()
+
+    payload = api._chat_payload(MESSAGE)
+
+    async def fire():
+        return await asyncio.gather(*(async_api._make_request("chat/completions", payload) for _ in range(concurrency)))
+
+    # Start the loop before sampling so its thread is counted like any other
+    runtime.start()
+    with ThreadSampler() as sampler:
+        start = time.perf_counter()
+        responses = runtime.run(fire())
+        elapsed = time.perf_counter() - start
+    runtime.run(async_api.close())
+    runtime.stop()
+    return {
+        "name": "AsyncGroqAPI + event loop",
+        "wall_s": elapsed,
+        "peak_threads": sampler.peak,
+        "max_in_flight": async_api.stats()["max_in_flight"],
+        "ok": count_ok(responses)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the async LLM client against threaded calls")
+    parser.add_argument("--concurrency", type=int, default=200, help="Concurrent chat requests")
+    parser.add_argument("--latency", type=float, default=0.5, help="Mock server latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock calls answered with HTTP 500")
+    args = parser.parse_args()
+
+    parent_conn, child_conn = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve_mock, args=(args.latency, args.error_rate, child_conn), daemon=True)
+    server.start()
+    base_url = parent_conn.recv()
+    results = []
+    try:
+        for run in (run_threaded, run_async):
+            parent_conn.send("stats")
+            before = parent_conn.recv()
+            result = run(base_url, args.concurrency)
+            parent_conn.send("stats")
+            after = parent_conn.recv()
+            # Should equal the failed calls unless some timed out or lost their connection
+            result["mock_errors"] = after["errors"] - before["errors"]
+            results.append(result)
+    finally:
+        server.terminate()
+
+    print(f"{args.concurrency} concurrent requests, mock latency {args.latency * 1000:.0f}ms, "
+          f"error rate {args.error_rate:.1%}")
+    print(f"{'variant':<28}{'wall':>10}{'threads':>10}{'in flight':>11}{'ok':>6}{'failed':>8}{'mock 500s':>11}")
+    for result in results:
+        print(f"{result['name']:<28}{result['wall_s']:>9.2f}s{result['peak_threads']:>10}"
+              f"{result['max_in_flight']:>11}{result['ok']:>6}{args.concurrency - result['ok']:>8}"
+              f"{result['mock_errors']:>11}")
+
+
+if __name__ == "__main__":
+    main()
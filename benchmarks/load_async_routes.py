@@ -0,0 +1,137 @@
+"""
+Load test: /chat vs /async/chat through the whole Flask app
+
+Runs app.py on the threaded Werkzeug server with GroqAPI pointed at
+MockLLMServer (see load_app.py), fires --concurrency simultaneous requests
+at one route, then at the other, and samples the app process's thread count
+from /proc while they are in flight.
+
+Flask's async views are run by FoodSymptomApp.ensure_sync: the coroutine
+goes to the shared AsyncRuntime loop and the worker thread that took the
+request blocks until it finishes. So both routes hold one server thread per
+in-flight request, and the peak thread count of the two is about the same.
+What /async/chat changes is the client side: its LLM calls share one
+aiohttp connection pool on the loop (LLM_ASYNC_MAX_CONNECTIONS, default
+100) instead of checking out one of the LLM_POOL_SIZE (default 16) pooled
+requests sessions, so more of them are in flight at once. Serving the
+routes without a thread each would take an ASGI server.
+
+Usage:
+    python benchmarks/load_async_routes.py --concurrency 100 --latency 0.5
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.load_app import serve_app, serve_mock
+
+MESSAGE = "Is ginger good for cramps?"
+
+
+def process_threads(pid):
+    """Current thread count of a process, from /proc"""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("Threads:"):
+                return int(line.split()[1])
+    return 0
+
+
+class ProcessThreadSampler:
+    """Record the highest thread count of another process while a load test runs"""
+
+    def __init__(self, pid, interval=0.01):
+        self.pid = pid
+        self.interval = interval
+        self.peak = process_threads(pid)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, process_threads(self.pid))
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_route(app_url, pid, path, concurrency):
+    def call(_):
+        started = time.perf_counter()
+        response = requests.post(f"{app_url}{path}", json={"message": MESSAGE}, timeout=120)
+        return time.perf_counter() - started, response.status_code
+
+    idle_threads = process_threads(pid)
+    with ProcessThreadSampler(pid) as sampler:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(call, range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies = np.array([seconds for seconds, _ in results]) * 1000
+    return {
+        "route": path,
+        "wall_s": elapsed,
+        "idle_threads": idle_threads,
+        "peak_threads": sampler.peak,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "ok": sum(1 for _, status in results if status == 200)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=100, help="Simultaneous requests per route")
+    parser.add_argument("--latency", type=float, default=0.5, help="Mock LLM latency in seconds")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="load_async_routes_")
+    mock_conn, mock_child = multiprocessing.Pipe()
+    mock = multiprocessing.Process(target=serve_mock, args=(args.latency, 0.0, 0, mock_child), daemon=True)
+    mock.start()
+    llm_base_url = mock_conn.recv()
+
+    app_conn, app_child = multiprocessing.Pipe()
+    app_process = multiprocessing.Process(
+        target=serve_app,
+        args=(llm_base_url, os.path.join(work_dir, "load_test.db"), os.path.join(work_dir, "warm_cache.json"),
+              os.path.join(work_dir, "app.log"), app_child),
+        daemon=True
+    )
+    app_process.start()
+    try:
+        app_url = app_conn.recv()
+        # One request per route first, so the event loop and both HTTP pools exist before measuring
+        for path in ("/chat", "/async/chat"):
+            requests.post(f"{app_url}{path}", json={"message": MESSAGE}, timeout=120).raise_for_status()
+        results = [run_route(app_url, app_process.pid, path, args.concurrency) for path in ("/chat", "/async/chat")]
+    finally:
+        app_process.terminate()
+        mock.terminate()
+
+    print(f"{args.concurrency} simultaneous requests per route, mock latency {args.latency * 1000:.0f}ms")
+    print(f"{'route':<14}{'wall':>9}{'p50':>10}{'threads idle':>14}{'threads peak':>14}{'ok':>6}")
+    for result in results:
+        print(f"{result['route']:<14}{result['wall_s']:>8.2f}s{result['p50_ms']:>8.0f}ms"
+              f"{result['idle_threads']:>14}{result['peak_threads']:>14}{result['ok']:>6}")
+
+
+if __name__ == "__main__":
+    main()
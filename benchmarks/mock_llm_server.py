@@ -0,0 +1,216 @@
+"""
+Local stand-in for the Groq chat/completions endpoint
+
+Used by the benchmarks and load tests so they never touch the real API.
+Point GroqAPI.base_url at MockLLMServer.base_url to use it.
+"""
+
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FOOD_ATTRIBUTES = {
+    "is_non_edible": False,
+    "food_name": "Banana",
+    "food_category": "Fruits",
+    "food_subcategory": "Tropical",
+    "processing_level": "Natural",
+    "caffeine_content_mg": 0,
+    "flavor_profile": "Sweet",
+    "common_allergens": "None",
+    "glycemic_index": 51,
+    "inflammatory_index": 2,
+    "calories_kcal": 89
+}
+
+CHAT_REPLY = (
+    "Bananas are a good source of potassium and vitamin B6, which can help "
+    "with bloating and mood swings during your period."
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately; avoid Nagle + delayed ACK stalls on reused connections
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if self.headers.get("Connection", "").lower() == "close":
+            # Tell the client, like a real server would, that this connection is done
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_stream(self, model, content):
+        # Server-sent events in the OpenAI streaming format, one word per event
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        if self.headers.get("Connection", "").lower() == "close":
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        try:
+            words = content.split(" ")
+            for i, word in enumerate(words):
+                if i == self.server.stream_fail_after:
+                    # Drop the connection without ending the chunked body, like an upstream crash
+                    self.close_connection = True
+                    return
+                event = {
+                    "id": "mock-completion",
+                    "object": "chat.completion.chunk",
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"content": word if i == 0 else " " + word},
+                        "finish_reason": None
+                    }]
+                }
+                self._send_chunk(f"data: {json.dumps(event)}\n\n".encode())
+                if self.server.token_latency:
+                    time.sleep(self.server.token_latency)
+            self._send_chunk(b"data: [DONE]\n\n")
+            self._send_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading mid-stream
+            self.close_connection = True
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            payload = {}
+
+        server.record_request()
+        if server.latency:
+            time.sleep(server.latency)
+
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        if server.should_fail():
+            self._send_json(500, {"error": {"message": "Mock upstream error"}})
+            return
+
+        messages = payload.get("messages", [])
+        system_prompt = messages[0].get("content", "") if messages else ""
+        if "nutritional database" in system_prompt:
+            content = json.dumps(FOOD_ATTRIBUTES)
+        else:
+            content = CHAT_REPLY
+
+        if payload.get("stream"):
+            self._send_stream(payload.get("model", "mock"), content)
+            return
+
+        self._send_json(200, {
+            "id": "mock-completion",
+            "object": "chat.completion",
+            "model": payload.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }]
+        })
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Load tests open hundreds of connections at once; the default backlog of 5 drops them
+    request_queue_size = 1024
+
+    def __init__(self, address, latency, error_rate, seed, token_latency=0.0, stream_fail_after=None):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.token_latency = token_latency
+        self.stream_fail_after = stream_fail_after
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def should_fail(self):
+        with self._lock:
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return failed
+
+
+class MockLLMServer:
+    """Threaded HTTP server answering OpenAI-style chat/completions requests"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, seed=None, token_latency=0.0,
+                 stream_fail_after=None):
+        # latency is the wait before the first byte; token_latency the gap between streamed words;
+        # stream_fail_after drops streamed replies after that many words
+        self._server = _Server((host, port), latency, error_rate, seed, token_latency, stream_fail_after)
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/openai/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self):
+        return {"requests": self._server.requests, "errors": self._server.errors}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a mock Groq chat/completions server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds between streamed words")
+    args = parser.parse_args()
+
+    server = MockLLMServer(port=args.port, latency=args.latency, error_rate=args.error_rate,
+                           token_latency=args.token_latency)
+    print(f"Mock LLM server listening at {server.base_url}")
+    server._server.serve_forever()
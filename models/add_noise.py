@@ -1,52 +1,159 @@
+import argparse
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
 
-def add_noise_to_dataset(input_file, output_file, noise_level=0.6):
+# Rows per chunk in streaming mode
+DEFAULT_CHUNKSIZE = 100_000
+
+class ColumnStats:
+    """
+    Per-column statistics gathered in a first pass over the data
+
+    Numerical columns keep count, mean and sum of squared deviations (merged
+    chunk by chunk, so the std matches one computed over the whole column),
+    min and max. Categorical columns keep their categories in order of first
+    appearance and the column's first value.
+    """
+
+    def __init__(self):
+        self.numeric = {}      # col -> [count, mean, m2, min, max]
+        self.categories = {}   # col -> {category: None}, insertion ordered
+        self.first_value = {}  # col -> first value in the column
+        self.kinds = {}        # col -> "numeric", "categorical" or None (left unchanged)
+
+    def update(self, chunk):
+        """Add one chunk (a DataFrame) to the statistics"""
+        for col in chunk.columns:
+            dtype = chunk[col].dtype
+            if dtype in ['int64', 'float64']:
+                kind = "numeric"
+            elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+                kind = "categorical"
+            else:
+                kind = None
+            # A column whose kind differs between chunks is left unchanged
+            if self.kinds.setdefault(col, kind) != kind:
+                self.kinds[col] = None
+
+            if kind == "numeric":
+                self._update_numeric(col, chunk[col].to_numpy(dtype=np.float64))
+            elif kind == "categorical":
+                if col not in self.first_value and len(chunk):
+                    self.first_value[col] = chunk[col].iloc[0]
+                seen = self.categories.setdefault(col, {})
+                for value in pd.unique(chunk[col]):
+                    seen.setdefault(None if pd.isna(value) else value, None)
+
+    def _update_numeric(self, col, values):
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        count, mean = len(values), values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        stats = self.numeric.get(col)
+        if stats is None:
+            self.numeric[col] = [count, mean, m2, values.min(), values.max()]
+            return
+        # Chan et al. parallel combination of two (count, mean, m2) summaries
+        total = stats[0] + count
+        delta = mean - stats[1]
+        stats[1] += delta * count / total
+        stats[2] += m2 + delta * delta * stats[0] * count / total
+        stats[0] = total
+        stats[3] = min(stats[3], values.min())
+        stats[4] = max(stats[4], values.max())
+
+    def noise_plan(self):
+        """Per-column noise parameters: ("numeric", std, min, max) or ("categorical", replacements)"""
+        plan = {}
+        for col, kind in self.kinds.items():
+            if kind == "numeric" and col in self.numeric:
+                count, mean, m2, low, high = self.numeric[col]
+                plan[col] = ("numeric", np.sqrt(m2 / count), low, high)
+            elif kind == "categorical" and len(self.categories.get(col, ())) > 1:
+                # Replacements are every category except the column's first value
+                first = self.first_value[col]
+                first = None if pd.isna(first) else first
+                replacements = [np.nan if c is None else c for c in self.categories[col] if c != first]
+                plan[col] = ("categorical", np.array(replacements, dtype=object))
+        return plan
+
+def noise_chunk(chunk, plan, noise_level, rng):
+    """Add noise to one chunk in place, one vectorized operation per column"""
+    n_rows = len(chunk)
+    for col, params in plan.items():
+        if col not in chunk.columns:
+            continue
+        if params[0] == "numeric":
+            _, col_std, low, high = params
+            noise = rng.normal(0, noise_level * col_std, size=n_rows)
+            chunk[col] = np.clip(chunk[col].to_numpy(dtype=np.float64) + noise, low, high)
+        else:
+            replacements = params[1]
+            # Randomly flip a percentage of values to other categories
+            mask = rng.random(size=n_rows) < noise_level
+            if mask.any():
+                values = chunk[col].to_numpy(dtype=object, copy=True)
+                values[mask] = rng.choice(replacements, size=int(mask.sum()))
+                chunk[col] = values
+    return chunk
+
+def add_noise_to_dataset(input_file, output_file, noise_level=0.6, chunksize=None, rng=None):
     """
     Add noise to both numerical and categorical features in a dataset.
-    
+
     Parameters:
         input_file (str): Path to the input CSV file
         output_file (str): Path to save the noisy dataset
         noise_level (float): Intensity of noise to add (default: 0.6)
+        chunksize (int): Stream the file in chunks of this many rows, so memory
+            stays bounded for datasets larger than RAM (default: load it whole)
+        rng (numpy.random.Generator): Random source, e.g. np.random.default_rng(seed)
+            for reproducible output (default: the global NumPy random state)
     """
-    # Load the dataset
-    df = pd.read_csv(input_file)
-    
-    # Add noise to all features
-    for col in df.columns:
-        # For numerical columns
-        if df[col].dtype in ['int64', 'float64']:
-            original_values = df[col].values
-            col_std = original_values.std()
-            noise = np.random.normal(0, noise_level * col_std, size=len(original_values))
-            noisy_values = original_values + noise
-            df[col] = np.clip(noisy_values, original_values.min(), original_values.max())
-        
-        # For categorical columns
-        elif df[col].dtype == 'object':
-            # Get unique categories
-            categories = df[col].unique()
-            if len(categories) > 1:
-                # Randomly flip a percentage of values to other categories
-                mask = np.random.random(size=len(df)) < noise_level
-                if mask.any():
-                    # For each value to flip, choose a random different category
-                    new_values = np.random.choice(
-                        [c for c in categories if c != df[col].iloc[0]], 
-                        size=mask.sum()
-                    )
-                    df.loc[mask, col] = new_values
-    
-    # Save the noisy dataset
-    df.to_csv(output_file, index=False)
-    print(f"Noisy dataset saved to {output_file}")
+    if rng is None:
+        rng = np.random
+
+    if chunksize is None:
+        # Load the dataset
+        df = pd.read_csv(input_file)
+        stats = ColumnStats()
+        stats.update(df)
+        noise_chunk(df, stats.noise_plan(), noise_level, rng)
+
+        # Save the noisy dataset
+        df.to_csv(output_file, index=False)
+        print(f"Noisy dataset saved to {output_file}")
+        return
+
+    # First pass: std, min, max and category sets for every column
+    stats = ColumnStats()
+    rows = 0
+    for chunk in pd.read_csv(input_file, chunksize=chunksize):
+        stats.update(chunk)
+        rows += len(chunk)
+    plan = stats.noise_plan()
+
+    # Second pass: add noise and append each chunk to the output as it is done
+    with open(output_file, "w", newline="") as f:
+        for i, chunk in enumerate(pd.read_csv(input_file, chunksize=chunksize)):
+            noise_chunk(chunk, plan, noise_level, rng)
+            chunk.to_csv(f, index=False, header=(i == 0))
+    print(f"Noisy dataset with {rows} rows saved to {output_file}")
+
+def main(default_noise_level=0.4):
+    parser = argparse.ArgumentParser(description="Add noise to a food recommendations dataset")
+    parser.add_argument("--input", default="menstruation_food_recommendations_working.csv")
+    parser.add_argument("--output", default="menstruation_food_recommendations_noisy.csv")
+    # Standard deviation of the noise as a fraction of each feature's standard deviation
+    parser.add_argument("--noise-level", type=float, default=default_noise_level)
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help=f"Stream the input in chunks of this many rows (e.g. {DEFAULT_CHUNKSIZE})")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible noise")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed) if args.seed is not None else None
+    add_noise_to_dataset(args.input, args.output, noise_level=args.noise_level, chunksize=args.chunksize, rng=rng)
 
 if __name__ == "__main__":
-    # Input and output file paths
-    input_file = "menstruation_food_recommendations_working.csv"
-    output_file = "menstruation_food_recommendations_noisy.csv"
-    
-    # Add noise with a standard deviation of 60% of each feature's standard deviation
-    add_noise_to_dataset(input_file, output_file, noise_level=0.4)
+    main()
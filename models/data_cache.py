@@ -0,0 +1,173 @@
+"""
+Cache of the encoded training data, keyed by the CSV's content hash
+
+Parsing the CSV, inferring dtypes and fitting the LabelEncoders is the same
+work on every training run while the data is unchanged. The first run
+writes the encoded feature matrix and targets as .npy files, plus the
+fitted encoders, to models/data_cache/<key>/. Later runs load them in
+milliseconds. The key is a hash of the CSV contents and the target
+columns, so an edited dataset is encoded again.
+
+Build or inspect the cache with:
+    python -m models.data_cache menstruation_food_recommendations_noisy.csv
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+
+DEFAULT_CACHE_DIR = "models/data_cache"
+# Bump when the encoding below changes, so old caches are not reused
+CACHE_FORMAT = 1
+
+
+class EncodedDataset:
+    """Encoded features and targets with the encoders fitted on them"""
+
+    def __init__(self, X, y, feature_columns, target_columns, label_encoders, target_encoders, key=None):
+        self.X = X
+        self.y = y
+        self.feature_columns = feature_columns
+        self.target_columns = target_columns
+        self.label_encoders = label_encoders
+        self.target_encoders = target_encoders
+        self.key = key
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(csv_path, target_columns):
+    digest = hashlib.sha256()
+    digest.update(file_sha256(csv_path).encode())
+    digest.update(json.dumps([CACHE_FORMAT, list(target_columns)]).encode())
+    return digest.hexdigest()[:16]
+
+
+def encode_csv(csv_path, target_columns):
+    """Parse the CSV and label-encode it the way train_models.py always has"""
+    import pandas as pd
+    from sklearn.preprocessing import LabelEncoder
+
+    df = pd.read_csv(csv_path)
+
+    # Encode categorical features
+    categorical_cols = df.select_dtypes(include=['object']).columns
+    label_encoders = {}
+    for col in categorical_cols:
+        if col not in target_columns:
+            le = LabelEncoder()
+            df[col] = le.fit_transform(df[col])
+            label_encoders[col] = le
+
+    # Encode target variables
+    target_encoders = {}
+    for col in target_columns:
+        le = LabelEncoder()
+        df[col] = le.fit_transform(df[col])
+        target_encoders[col] = le
+
+    # Define features
+    feature_columns = [col for col in df.columns if col not in target_columns and col not in ['user_id', 'name']]
+
+    return EncodedDataset(
+        df[feature_columns].to_numpy(dtype=np.float64),
+        df[list(target_columns)].to_numpy(dtype=np.int64),
+        feature_columns,
+        list(target_columns),
+        label_encoders,
+        target_encoders
+    )
+
+
+def save_dataset(dataset, path):
+    """Write a dataset to path atomically: into a temporary directory, then renamed into place"""
+    tmp_dir = f"{path}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, "X.npy"), dataset.X)
+    np.save(os.path.join(tmp_dir, "y.npy"), dataset.y)
+    joblib.dump(
+        {'label_encoders': dataset.label_encoders, 'target_encoders': dataset.target_encoders},
+        os.path.join(tmp_dir, "encoders.pkl")
+    )
+    with open(os.path.join(tmp_dir, "columns.json"), "w") as f:
+        json.dump({'feature_columns': dataset.feature_columns, 'target_columns': dataset.target_columns}, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_dir, path)
+
+
+def load_saved_dataset(path, key=None, mmap_mode=None):
+    with open(os.path.join(path, "columns.json"), "r") as f:
+        columns = json.load(f)
+    encoders = joblib.load(os.path.join(path, "encoders.pkl"))
+    return EncodedDataset(
+        np.load(os.path.join(path, "X.npy"), mmap_mode=mmap_mode),
+        np.load(os.path.join(path, "y.npy"), mmap_mode=mmap_mode),
+        columns['feature_columns'],
+        columns['target_columns'],
+        encoders['label_encoders'],
+        encoders['target_encoders'],
+        key=key
+    )
+
+
+def load_encoded_dataset(csv_path, target_columns, cache_dir=DEFAULT_CACHE_DIR, use_cache=True, mmap_mode=None):
+    """
+    Encoded dataset for csv_path, from the cache when the CSV is unchanged
+
+    Args:
+        mmap_mode: passed to np.load, e.g. "r" to memory-map the matrices instead of reading them
+
+    Returns:
+        EncodedDataset
+    """
+    started = time.perf_counter()
+    if not use_cache:
+        return encode_csv(csv_path, target_columns)
+
+    key = cache_key(csv_path, target_columns)
+    path = os.path.join(cache_dir, key)
+    if os.path.exists(path):
+        try:
+            dataset = load_saved_dataset(path, key=key, mmap_mode=mmap_mode)
+            print(f"Loaded encoded dataset {key} from cache in {(time.perf_counter() - started) * 1000:.0f}ms")
+            return dataset
+        except Exception as e:
+            print(f"Error reading data cache {path}, encoding again: {str(e)}")
+
+    dataset = encode_csv(csv_path, target_columns)
+    dataset.key = key
+    try:
+        save_dataset(dataset, path)
+        print(f"Encoded dataset and cached it as {key} in {time.perf_counter() - started:.1f}s")
+    except OSError as e:
+        print(f"Could not write data cache {path}: {str(e)}")
+        return dataset
+    # Return the cached copy, so encoders pickle to the same bytes (and model version) on every run
+    return load_saved_dataset(path, key=key, mmap_mode=mmap_mode)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from models.train_models import target_columns
+
+    parser = argparse.ArgumentParser(description="Build the encoded training data cache for a CSV")
+    parser.add_argument("csv", nargs="?", default="menstruation_food_recommendations_noisy.csv")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    dataset = load_encoded_dataset(args.csv, target_columns, cache_dir=args.cache_dir)
+    print(f"{dataset.X.shape[0]} rows, {len(dataset.feature_columns)} features, "
+          f"{len(dataset.target_columns)} targets in {os.path.join(args.cache_dir, dataset.key)}")
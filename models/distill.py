@@ -0,0 +1,111 @@
+"""
+Distil the selected model into a compact serving model
+
+A slow or large teacher, such as an SVC with probability=True or a big
+forest, is imitated by small students trained on the teacher's own
+predictions. The training set is extended with jittered copies so the
+students also see how the teacher behaves between training rows. A
+student replaces the teacher for serving only if it is faster and loses at
+most max_accuracy_drop of test accuracy against the true labels.
+
+The chosen student is saved as compact_model.pkl next to best_model.pkl;
+Predictor loads it by default.
+"""
+
+import pickle
+import time
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.multioutput import MultiOutputClassifier
+
+from models.model_search import measure_latency
+from models.train_models import evaluate_model
+
+# Jittered copies of the training set added to the distillation data, and their noise level
+AUGMENT_COPIES = 2
+AUGMENT_NOISE = 0.1
+
+
+def build_students():
+    """Compact model families the compiled engine runs fastest"""
+    return {
+        "Linear": MultiOutputClassifier(LogisticRegression(max_iter=1000)),
+        "Small Gradient Boosting": MultiOutputClassifier(
+            GradientBoostingClassifier(n_estimators=30, max_depth=2, random_state=42)
+        )
+    }
+
+
+def is_compact(model):
+    """A teacher that is already linear has nothing to gain from distillation"""
+    return all(isinstance(estimator, LogisticRegression) for estimator in model.estimators_)
+
+
+def distill(teacher, data, max_accuracy_drop=0.01, seed=42):
+    """
+    Train students on the teacher's predictions and pick the one to serve
+
+    Args:
+        data: (X_train_scaled, X_test_scaled, y_train, y_test, feature_columns, encoders)
+            as returned by train_models.prepare_data
+
+    Returns:
+        (chosen student or None to serve the teacher, report rows for every model)
+    """
+    X_train_scaled, X_test_scaled, y_train, y_test = data[:4]
+
+    teacher_result = evaluate_model(teacher, X_test_scaled, y_test)
+    report = [{
+        "name": "Teacher",
+        "accuracy": teacher_result["accuracy"],
+        "latency_ms": measure_latency(teacher, data),
+        "size_bytes": len(pickle.dumps(teacher, protocol=pickle.HIGHEST_PROTOCOL)),
+        "model": teacher
+    }]
+
+    if is_compact(teacher):
+        print("Selected model is already linear, skipping distillation")
+        return None, report
+
+    # Label the training rows and jittered copies of them with the teacher's predictions
+    rng = np.random.default_rng(seed)
+    X_distill = np.vstack([X_train_scaled] + [
+        X_train_scaled + rng.normal(scale=AUGMENT_NOISE, size=X_train_scaled.shape)
+        for _ in range(AUGMENT_COPIES)
+    ])
+    y_distill = teacher.predict(X_distill)
+
+    for name, student in build_students().items():
+        started = time.perf_counter()
+        student.fit(X_distill, y_distill)
+        fit_seconds = time.perf_counter() - started
+        report.append({
+            "name": name,
+            "accuracy": evaluate_model(student, X_test_scaled, y_test)["accuracy"],
+            "latency_ms": measure_latency(student, data),
+            "size_bytes": len(pickle.dumps(student, protocol=pickle.HIGHEST_PROTOCOL)),
+            "fit_seconds": fit_seconds,
+            "model": student
+        })
+
+    teacher_row = report[0]
+    print("\nDistillation (accuracy against the true test labels):")
+    for row in report:
+        print(f"  {row['name']:<24} accuracy {row['accuracy']:.4f} ({row['accuracy'] - teacher_row['accuracy']:+.4f})"
+              f"   {row['latency_ms']:.3f} ms/row ({teacher_row['latency_ms'] / row['latency_ms']:.1f}x)"
+              f"   {row['size_bytes'] / 1024:.0f} KB")
+
+    eligible = [
+        row for row in report[1:]
+        if teacher_row["accuracy"] - row["accuracy"] <= max_accuracy_drop
+        and row["latency_ms"] < teacher_row["latency_ms"]
+    ]
+    if not eligible:
+        print(f"No student is faster within {max_accuracy_drop:.3f} accuracy of the teacher, serving the teacher")
+        return None, report
+
+    best = max(eligible, key=lambda row: row["accuracy"])
+    print(f"Serving {best['name']} student")
+    return best["model"], report
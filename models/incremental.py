@@ -0,0 +1,355 @@
+"""
+Incremental model updates from admin corrections and logged predictions
+
+A full retrain in train_models.py takes minutes. This module keeps an
+online model instead: one SGDClassifier (logistic loss) per target, which
+learns from new labeled rows with partial_fit in mini-batches. Each update
+reads only rows added since the previous one, so it takes seconds.
+
+Labeled rows come from:
+- prediction_corrections: the food's attributes and the labels an admin
+  says are right (see POST /admin/corrections)
+- predictions, with include_predictions: logged predictions labeled with
+  what was served, to carry foods users ask about that are not in the CSV.
+  Predictions made from the default attributes of a failed lookup
+  (is_default) are left out, as are ones an admin has corrected: the
+  correction is learned instead
+
+The first update bootstraps the online model from the training CSV (through
+the encoded data cache) re-encoded with the live model's encoders. Later
+updates continue from the online model of the live version. The scaler and
+encoders are kept unchanged, so Predictor and the compiled engine load the
+result like any other compact model. Every update is published as a new
+version, and a running app picks it up through its artifact watcher.
+
+Before publishing, the updated model and the live model are scored on
+held-out rows: a fixed split of the training CSV that the online model
+never trains on, and a share of the new rows. An update that scores worse
+than the live model is not published (UpdateRejected) and its rows are
+read again by the next update.
+
+Run an update with:
+    python -m models.incremental --database food_predictions.db
+"""
+
+import copy
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.multioutput import MultiOutputClassifier
+
+from models.compiled_model import build_category_maps, encode_rows
+from models.predict import (
+    ARTIFACT_DIR, ARTIFACT_FILES, COMPACT_MODEL_FILE, ONLINE_STATE_FILE,
+    artifact_version, current_artifact_dir, publish_artifacts
+)
+
+DEFAULT_CSV = "menstruation_food_recommendations_noisy.csv"
+# Passes over the training CSV when bootstrapping the online model
+BOOTSTRAP_EPOCHS = 5
+# Share of the training CSV and of the new rows held out to compare the updated model with the live one
+HOLDOUT_FRACTION = 0.2
+# Largest drop in held-out accuracy an update may cause and still be published
+MAX_ACCURACY_DROP = 0.0
+
+
+class UpdateRejected(Exception):
+    """The updated model scored worse than the live model on the held-out rows"""
+
+    def __init__(self, live_accuracy, candidate_accuracy):
+        super().__init__(
+            f"Updated model scored {candidate_accuracy:.4f} on held-out rows, "
+            f"worse than the live model's {live_accuracy:.4f}; not published"
+        )
+        self.live_accuracy = live_accuracy
+        self.candidate_accuracy = candidate_accuracy
+
+
+def build_online_model(seed=42):
+    return MultiOutputClassifier(SGDClassifier(loss="log_loss", alpha=1e-4, random_state=seed))
+
+
+class ArtifactEncoders:
+    """Scaler, encoders and feature columns of one published version"""
+
+    def __init__(self, artifact_dir):
+        self.scaler = joblib.load(os.path.join(artifact_dir, "scaler.pkl"))
+        self.label_encoders = joblib.load(os.path.join(artifact_dir, "label_encoders.pkl"))
+        self.target_encoders = joblib.load(os.path.join(artifact_dir, "target_encoders.pkl"))
+        with open(os.path.join(artifact_dir, "feature_columns.txt"), "r") as f:
+            self.feature_columns = f.read().split(",")
+        self.target_columns = list(self.target_encoders)
+        self.category_maps = build_category_maps(self.label_encoders)
+        self.label_maps = [
+            {str(label): code for code, label in enumerate(self.target_encoders[col].classes_)}
+            for col in self.target_columns
+        ]
+
+    def classes(self):
+        """Class codes of every target, as partial_fit needs them on the first call"""
+        return [np.arange(len(self.target_encoders[col].classes_)) for col in self.target_columns]
+
+    def scale(self, X):
+        # Same as scaler.transform, without the feature-name check on a plain array
+        return (X - self.scaler.mean_) / self.scaler.scale_
+
+    def encode(self, food_items, labels):
+        """
+        Encode food dicts and their {target: label} dicts into training matrices
+
+        Rows with unparseable features or a missing or unknown label are skipped.
+        """
+        X, valid = encode_rows(food_items, self.feature_columns, self.category_maps)
+        y = np.zeros((len(food_items), len(self.target_columns)), dtype=np.int64)
+        for i, row_labels in enumerate(labels):
+            for j, col in enumerate(self.target_columns):
+                code = self.label_maps[j].get(str(row_labels.get(col)))
+                if code is None:
+                    valid[i] = False
+                    break
+                y[i, j] = code
+        skipped = int((~valid).sum())
+        if skipped:
+            print(f"Skipping {skipped} rows with invalid features or unknown labels")
+        return self.scale(X[valid]), y[valid]
+
+    def encode_dataset(self, dataset):
+        """Re-encode a data_cache dataset, whose encoders were fitted separately, with these encoders"""
+        if dataset.feature_columns != self.feature_columns:
+            raise ValueError("Training CSV columns do not match the live model")
+        X = np.array(dataset.X, dtype=np.float64)
+        for j, col in enumerate(self.feature_columns):
+            encoder = dataset.label_encoders.get(col)
+            if encoder is not None:
+                codes = build_category_maps({col: encoder})[col]
+                remap = np.zeros(len(encoder.classes_))
+                for value, code in codes.items():
+                    remap[code] = self.category_maps.get(col, {}).get(value, 0)
+                X[:, j] = remap[X[:, j].astype(np.intp)]
+        y = np.empty(dataset.y.shape, dtype=np.int64)
+        for j, col in enumerate(self.target_columns):
+            remap = np.array([self.label_maps[j][str(label)] for label in dataset.target_encoders[col].classes_])
+            y[:, j] = remap[dataset.y[:, j]]
+        return self.scale(X), y
+
+
+# Logged predictions worth learning from: not made from default attributes, and not corrected since
+PREDICTION_FILTER = (
+    'is_default = 0 AND id NOT IN '
+    '(SELECT prediction_id FROM prediction_corrections WHERE prediction_id IS NOT NULL)'
+)
+
+
+def fetch_labeled_rows(database, table, label_column, after_id, where=None):
+    """(last id, food dicts, label dicts) for rows of table with id > after_id, and matching where if given"""
+    with database.connection() as conn:
+        rows = conn.execute(
+            f'SELECT id, food_data, {label_column} FROM {table} '
+            f'WHERE id > ? AND food_data IS NOT NULL AND {label_column} IS NOT NULL '
+            f'{"AND " + where if where else ""} ORDER BY id',
+            (after_id,)
+        ).fetchall()
+    food_items, labels = [], []
+    for row in rows:
+        try:
+            food_items.append(json.loads(row[1]))
+            labels.append(json.loads(row[2]))
+        except (TypeError, ValueError):
+            continue
+    last_id = rows[-1][0] if rows else after_id
+    return last_id, food_items, labels
+
+
+def holdout_split(n_rows, fraction, seed=42):
+    """(train, held-out) row indices; the same n_rows and seed always give the same split"""
+    order = np.random.default_rng(seed).permutation(n_rows)
+    n_holdout = int(round(n_rows * fraction))
+    if n_rows > 1:
+        # Keep at least one row on each side
+        n_holdout = min(max(n_holdout, 1), n_rows - 1)
+    else:
+        n_holdout = 0
+    return order[n_holdout:], order[:n_holdout]
+
+
+def load_training_data(encoders, csv_path, seed=42):
+    """(X_train, y_train, X_holdout, y_holdout) from the training CSV, or None if it is not available"""
+    from models.data_cache import load_encoded_dataset
+
+    if not os.path.exists(csv_path):
+        return None
+    X, y = encoders.encode_dataset(load_encoded_dataset(csv_path, encoders.target_columns))
+    train, holdout = holdout_split(len(X), HOLDOUT_FRACTION, seed)
+    return X[train], y[train], X[holdout], y[holdout]
+
+
+def accuracy(model, X, y):
+    """Share of correct labels over every target"""
+    return float((model.predict(X) == y).mean())
+
+
+def serving_model(artifact_dir):
+    """The model Predictor serves for a version: the compact model if there is one"""
+    path = os.path.join(artifact_dir, COMPACT_MODEL_FILE)
+    if not os.path.exists(path):
+        path = os.path.join(artifact_dir, "best_model.pkl")
+    return joblib.load(path)
+
+
+def partial_fit_batches(model, X, y, classes, batch_size=256, epochs=1, seed=42):
+    """Shuffled mini-batch partial_fit passes over (X, y)"""
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        order = rng.permutation(len(X))
+        for start in range(0, len(X), batch_size):
+            batch = order[start:start + batch_size]
+            model.partial_fit(X[batch], y[batch], classes=classes)
+
+
+def bootstrap(encoders, training, csv_path, batch_size, seed):
+    """New online model trained on the training split of the CSV, or untrained if the CSV is not available"""
+    model = build_online_model(seed)
+    if training is None:
+        print(f"Training data {csv_path} not found, starting the online model from the new rows only")
+        return model, 0
+    X, y = training[0], training[1]
+    partial_fit_batches(model, X, y, encoders.classes(), batch_size, BOOTSTRAP_EPOCHS, seed)
+    print(f"Bootstrapped online model on {len(X)} rows of {csv_path}")
+    return model, len(X)
+
+
+def update_model(database, root=ARTIFACT_DIR, csv_path=DEFAULT_CSV, include_predictions=False,
+                 batch_size=256, epochs=1, seed=42, max_accuracy_drop=MAX_ACCURACY_DROP):
+    """
+    Train the online model on labeled rows added since the last update and publish it
+
+    Args:
+        database: storage.database.Database holding the predictions and corrections
+
+    Returns:
+        The published version, or None if there were no new rows
+
+    Raises:
+        UpdateRejected: the updated model scored worse than the live model on the held-out rows
+    """
+    started = time.perf_counter()
+    artifact_dir = current_artifact_dir(root)
+    encoders = ArtifactEncoders(artifact_dir)
+
+    state_path = os.path.join(artifact_dir, ONLINE_STATE_FILE)
+    online = os.path.exists(state_path)
+    if online:
+        with open(state_path, "r") as f:
+            state = json.load(f)
+    else:
+        state = {
+            "base_version": artifact_version(artifact_dir),
+            "last_correction_id": 0,
+            "last_prediction_id": 0,
+            "rows_seen": 0,
+            "updates": 0
+        }
+
+    food_items, labels = [], []
+    state["last_correction_id"], items, item_labels = fetch_labeled_rows(
+        database, "prediction_corrections", "corrected_results", state["last_correction_id"]
+    )
+    food_items += items
+    labels += item_labels
+    print(f"{len(items)} new corrections")
+    if include_predictions:
+        state["last_prediction_id"], items, item_labels = fetch_labeled_rows(
+            database, "predictions", "prediction_results", state["last_prediction_id"], where=PREDICTION_FILTER
+        )
+        food_items += items
+        labels += item_labels
+        print(f"{len(items)} new logged predictions")
+
+    X, y = encoders.encode(food_items, labels)
+    if not len(X):
+        print("No new labeled rows, nothing to publish")
+        return None
+
+    live_model = serving_model(artifact_dir)
+    training = load_training_data(encoders, csv_path, seed)
+    if online:
+        # The live model is the online model; train a copy so it can still be scored
+        model = copy.deepcopy(live_model)
+    else:
+        model, state["rows_seen"] = bootstrap(encoders, training, csv_path, batch_size, seed)
+
+    # Score on held-out new rows and the held-out split of the CSV
+    train, holdout = holdout_split(len(X), HOLDOUT_FRACTION, seed)
+    X_holdout, y_holdout = X[holdout], y[holdout]
+    if training is not None:
+        X_holdout = np.vstack([X_holdout, training[2]])
+        y_holdout = np.vstack([y_holdout, training[3]])
+
+    before = accuracy(model, X[train], y[train]) if state["rows_seen"] else None
+    partial_fit_batches(model, X[train], y[train], encoders.classes(), batch_size, epochs, seed)
+    after = accuracy(model, X[train], y[train])
+    print(f"Trained on {len(train)} new rows: accuracy on them "
+          f"{'n/a' if before is None else f'{before:.4f}'} -> {after:.4f}")
+
+    if len(X_holdout):
+        live_accuracy = accuracy(live_model, X_holdout, y_holdout)
+        candidate_accuracy = accuracy(model, X_holdout, y_holdout)
+        print(f"Held-out accuracy on {len(X_holdout)} rows: live model {live_accuracy:.4f}, "
+              f"updated model {candidate_accuracy:.4f}")
+        if candidate_accuracy < live_accuracy - max_accuracy_drop:
+            raise UpdateRejected(live_accuracy, candidate_accuracy)
+    else:
+        print("No held-out rows to score the update on")
+    # The held-out new rows are learned too once the update has passed
+    if len(holdout):
+        partial_fit_batches(model, X[holdout], y[holdout], encoders.classes(), batch_size, epochs, seed)
+    state["rows_seen"] += len(X)
+    state["updates"] += 1
+
+    # Same scaler and encoders, new serving model and state; publish copies them into a new version
+    staging = tempfile.mkdtemp(prefix="online-", dir=root)
+    try:
+        for name in ARTIFACT_FILES:
+            shutil.copy2(os.path.join(artifact_dir, name), staging)
+        joblib.dump(model, os.path.join(staging, COMPACT_MODEL_FILE))
+        with open(os.path.join(staging, ONLINE_STATE_FILE), "w") as f:
+            json.dump(state, f, indent=2)
+        version = publish_artifacts(staging, root)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    print(f"Incremental update {state['updates']} took {time.perf_counter() - started:.2f}s")
+    return version
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from storage.database import Database
+
+    parser = argparse.ArgumentParser(description="Update the online model from new labeled rows and publish it")
+    parser.add_argument("--database", default="food_predictions.db")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="Training data used to bootstrap the online model")
+    parser.add_argument("--include-predictions", action="store_true",
+                        help="Also learn from logged predictions, labeled with the served results")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--epochs", type=int, default=1, help="Passes over the new rows")
+    parser.add_argument("--max-accuracy-drop", type=float, default=MAX_ACCURACY_DROP,
+                        help="Largest drop in held-out accuracy, compared with the live model, that is still published")
+    args = parser.parse_args()
+
+    database = Database(args.database, pool_size=1)
+    try:
+        update_model(database, csv_path=args.csv, include_predictions=args.include_predictions,
+                     batch_size=args.batch_size, epochs=args.epochs, max_accuracy_drop=args.max_accuracy_drop)
+    except UpdateRejected as e:
+        print(str(e))
+        raise SystemExit(1)
+    finally:
+        database.close()
@@ -0,0 +1,221 @@
+"""
+Hyperparameter search over the MultiOutputClassifier candidates
+
+Every hyperparameter combination of every candidate model starts in the
+first round, cross-validated on a small sample of the training set. Each
+round keeps the best 1/eta of the configurations and gives the survivors
+eta times more samples (successive halving), so most of the compute goes
+to the promising configurations. Rounds run in a process pool.
+
+Besides accuracy, each configuration's inference latency is measured
+through the same compiled engine Predictor uses. With a latency budget,
+configurations over it are ranked below every configuration within it and
+are dropped first. The finalists are refit on the full training set and
+evaluated on the test set. Their latency per row and pickled size are
+measured, and the most accurate finalist that meets the budgets is
+selected.
+
+Used by `python models/train_models.py --search`.
+"""
+
+import itertools
+import math
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.model_selection import KFold
+
+from models.compiled_model import CompiledModel
+from models.train_models import build_model, evaluate_model, target_columns
+
+# Hyperparameter grids; build_model fills in everything not listed here
+SEARCH_SPACE = {
+    "Logistic Regression": {
+        "C": [0.1, 1.0, 10.0]
+    },
+    "Random Forest": {
+        "n_estimators": [50, 100, 200],
+        "max_depth": [None, 8, 16]
+    },
+    "Gradient Boosting": {
+        "n_estimators": [50, 100],
+        "learning_rate": [0.05, 0.1],
+        "max_depth": [2, 3]
+    },
+    "SVM": {
+        "C": [0.5, 1.0, 4.0],
+        "gamma": ["scale", 0.05]
+    }
+}
+
+# Rows timed one at a time when measuring latency
+LATENCY_ROWS = 200
+
+
+def candidate_configs(names):
+    """Every (model name, params) combination in the search space"""
+    configs = []
+    for name in names:
+        grid = SEARCH_SPACE.get(name, {})
+        keys = list(grid)
+        for values in itertools.product(*(grid[key] for key in keys)):
+            configs.append((name, dict(zip(keys, values))))
+    return configs
+
+
+def config_label(name, params):
+    if not params:
+        return name
+    return f"{name} ({', '.join(f'{key}={value}' for key, value in params.items())})"
+
+
+# Training matrices and encoders, set once per worker process by init_worker
+_data = None
+
+
+def init_worker(data):
+    global _data
+    _data = data
+
+
+def measure_latency(model, data):
+    """Median milliseconds for one Predictor.predict-sized call through the compiled engine"""
+    X_train_scaled, X_test_scaled, y_train, y_test, feature_columns, encoders = data
+    engine = CompiledModel.from_artifacts(
+        model, encoders['scaler'], encoders['label_encoders'], encoders['target_encoders'],
+        feature_columns, target_columns
+    )
+    # The engine works on raw feature values, so undo the scaling
+    rows = encoders['scaler'].inverse_transform(X_test_scaled[:LATENCY_ROWS])
+    timings = []
+    for row in rows:
+        started = time.perf_counter()
+        engine.predict_encoded(row[None, :])
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings)) * 1000
+
+
+def evaluate_config(task):
+    """Cross-validate one configuration on the first n_samples of the shuffled training set"""
+    name, params, n_samples, cv, seed = task
+    X_train_scaled, X_test_scaled, y_train, y_test = _data[:4]
+
+    order = np.random.default_rng(seed).permutation(len(X_train_scaled))[:n_samples]
+    X, y = X_train_scaled[order], y_train[order]
+
+    # Predictions do not depend on SVC's probability calibration, which costs an internal 5-fold CV
+    fold_params = dict(params, probability=False) if name == "SVM" else params
+    scores = []
+    model = None
+    for train_idx, val_idx in KFold(n_splits=cv, shuffle=True, random_state=seed).split(X):
+        model = build_model(name, fold_params)
+        model.fit(X[train_idx], y[train_idx])
+        scores.append((model.predict(X[val_idx]) == y[val_idx]).mean())
+
+    return float(np.mean(scores)), measure_latency(model, _data)
+
+
+def finalize(task):
+    """Refit a finalist on the full training set and measure accuracy, latency and size"""
+    name, params = task
+    X_train_scaled, X_test_scaled, y_train, y_test = _data[:4]
+    model = build_model(name, params)
+
+    started = time.perf_counter()
+    model.fit(X_train_scaled, y_train)
+    fit_seconds = time.perf_counter() - started
+
+    result = evaluate_model(model, X_test_scaled, y_test)
+    result['fit_seconds'] = fit_seconds
+    result['latency_ms'] = measure_latency(model, _data)
+    result['size_bytes'] = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    result['params'] = params
+    result['total_seconds'] = time.perf_counter() - started
+    return result
+
+
+def within_budget(latency_ms, size_bytes, latency_budget_ms, max_size_mb):
+    if latency_budget_ms is not None and latency_ms > latency_budget_ms:
+        return False
+    if max_size_mb is not None and size_bytes is not None and size_bytes > max_size_mb * 1024 * 1024:
+        return False
+    return True
+
+
+def successive_halving(executor, configs, n_train, cv, eta, min_samples, latency_budget_ms, finalists, seed):
+    """Run halving rounds until at most `finalists` configurations remain or the data runs out"""
+    survivors = configs
+    n_samples = max(min_samples, cv * 10)
+    round_number = 0
+    while True:
+        n_samples = min(n_samples, n_train)
+        started = time.perf_counter()
+        tasks = [(name, params, n_samples, cv, seed) for name, params in survivors]
+        scored = list(zip(survivors, executor.map(evaluate_config, tasks)))
+
+        # Over-budget configurations rank below every configuration within budget
+        scored.sort(key=lambda item: (
+            not within_budget(item[1][1], None, latency_budget_ms, None),
+            -item[1][0]
+        ))
+        print(f"Round {round_number}: {len(survivors)} configurations on {n_samples} samples "
+              f"in {time.perf_counter() - started:.1f}s")
+        for (name, params), (accuracy, latency_ms) in scored[:5]:
+            print(f"  {config_label(name, params)}: CV accuracy {accuracy:.4f}, {latency_ms:.3f} ms/row")
+
+        if len(scored) <= finalists or n_samples >= n_train:
+            return [config for config, _ in scored[:finalists]]
+
+        keep = max(finalists, math.ceil(len(scored) / eta))
+        survivors = [config for config, _ in scored[:keep]]
+        n_samples *= eta
+        round_number += 1
+
+
+def search_models(names, data, jobs=None, cv=3, eta=3, min_samples=200, finalists=3,
+                  latency_budget_ms=None, max_size_mb=None, seed=42):
+    """
+    Search hyperparameters for the named candidates and pick the model to deploy
+
+    Args:
+        data: (X_train_scaled, X_test_scaled, y_train, y_test, feature_columns, encoders)
+            as returned by train_models.prepare_data
+
+    Returns:
+        (results keyed by configuration label, label of the selected model)
+    """
+    configs = candidate_configs(names)
+    n_train = len(data[0])
+    print(f"Searching {len(configs)} configurations with {cv}-fold CV "
+          f"(eta={eta}, latency budget {latency_budget_ms if latency_budget_ms is not None else 'none'} ms)")
+
+    # The matrices are sent to each worker once, not with every task
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(data,)) as executor:
+        survivors = successive_halving(
+            executor, configs, n_train, cv, eta, min_samples, latency_budget_ms, finalists, seed
+        )
+        print(f"Refitting {len(survivors)} finalists on the full training set...")
+        final = list(executor.map(finalize, survivors))
+
+    results = {}
+    for (name, params), result in zip(survivors, final):
+        label = config_label(name, params)
+        results[label] = result
+        print(f"{label} - Accuracy: {result['accuracy']:.4f}, F1: {result['f1']:.4f}, "
+              f"{result['latency_ms']:.3f} ms/row, {result['size_bytes'] / 1024:.0f} KB, "
+              f"fit {result['fit_seconds']:.1f}s")
+
+    eligible = [
+        label for label, result in results.items()
+        if within_budget(result['latency_ms'], result['size_bytes'], latency_budget_ms, max_size_mb)
+    ]
+    if eligible:
+        best = max(eligible, key=lambda label: results[label]['accuracy'])
+    else:
+        # Nothing meets the budgets, so deploy the fastest finalist
+        best = min(results, key=lambda label: results[label]['latency_ms'])
+        print("Warning: no finalist meets the latency/size budget, selecting the fastest one")
+    print(f"Selected: {best}")
+    return results, best
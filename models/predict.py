@@ -1,39 +1,259 @@
-import pandas as pd
 import joblib
+import json
 import os
+import shutil
+import hashlib
 import numpy as np
 import random
+import threading
+
+from models.compiled_model import CompiledModel, build_category_maps, encode_rows
+
+# Files written by training; together they define one model version
+ARTIFACT_DIR = "models/trained_models"
+ARTIFACT_FILES = ["best_model.pkl", "scaler.pkl", "label_encoders.pkl", "target_encoders.pkl", "feature_columns.txt"]
+# Distilled serving model (see models/distill.py); loaded instead of best_model.pkl when present
+COMPACT_MODEL_FILE = "compact_model.pkl"
+# Progress of incremental updates (see models/incremental.py), published with the online model
+ONLINE_STATE_FILE = "online_state.json"
+# Part of a version when present
+OPTIONAL_ARTIFACT_FILES = [COMPACT_MODEL_FILE, ONLINE_STATE_FILE]
+# Written into each published version: the version of every Predictor mode, so loading needs no hashing
+VERSION_MANIFEST_FILE = "version.json"
+# Compiled engine saved as .npy arrays, memory-mapped so worker processes share it
+MMAP_DIR = "mmap"
+# Published models live in ARTIFACT_DIR/versions/<version>; CURRENT names the live one
+VERSIONS_DIR = "versions"
+CURRENT_FILE = "CURRENT"
+# Labels predicted for every food
+TARGET_COLUMNS = [
+    "impact_on_cramps",
+    "impact_on_bloating",
+    "impact_on_headache",
+    "impact_on_mood_swings",
+    "impact_on_fatigue",
+    "impact_on_acne"
+]
+
+def current_artifact_dir(root=ARTIFACT_DIR):
+    """Directory of the live model: the version named in CURRENT, or root itself before any publish"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), "r") as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return root
+    return os.path.join(root, VERSIONS_DIR, version)
+
+def publish_artifacts(source_dir=ARTIFACT_DIR, root=ARTIFACT_DIR):
+    """
+    Copy freshly trained artifacts into their own version directory and make it the live model
+    
+    Versions are never modified once published and CURRENT is replaced in one
+    rename, so a running app always sees either the old or the new model.
+    """
+    names = [
+        name for name in ARTIFACT_FILES + OPTIONAL_ARTIFACT_FILES
+        if name not in OPTIONAL_ARTIFACT_FILES or os.path.exists(os.path.join(source_dir, name))
+    ]
+    version = hash_artifacts(source_dir, names)
+    version_dir = os.path.join(root, VERSIONS_DIR, version)
+    if not os.path.exists(version_dir):
+        tmp_dir = f"{version_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for name in names:
+            shutil.copy2(os.path.join(source_dir, name), tmp_dir)
+        manifest = {
+            "version": version,
+            "modes": {
+                "compact": hash_artifacts(tmp_dir, model_files(tmp_dir, compact=True)),
+                "full": hash_artifacts(tmp_dir, model_files(tmp_dir, compact=False))
+            }
+        }
+        with open(os.path.join(tmp_dir, VERSION_MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+        try:
+            export_mmap_engine(tmp_dir)
+        except Exception as e:
+            print(f"Could not export memory-mapped model, Predictor will load the pickles: {str(e)}")
+        os.replace(tmp_dir, version_dir)
+    
+    tmp_current = os.path.join(root, f"{CURRENT_FILE}.tmp")
+    with open(tmp_current, "w") as f:
+        f.write(version)
+    os.replace(tmp_current, os.path.join(root, CURRENT_FILE))
+    print(f"Published model {version} to {version_dir}")
+    return version
+
+def model_files(artifact_dir, compact=True):
+    """The artifact files a Predictor loads from artifact_dir with this compact setting"""
+    if compact and os.path.exists(os.path.join(artifact_dir, COMPACT_MODEL_FILE)):
+        model_file = COMPACT_MODEL_FILE
+    else:
+        model_file = "best_model.pkl"
+    return [model_file] + [name for name in ARTIFACT_FILES if name != "best_model.pkl"]
+
+def hash_artifacts(artifact_dir, names):
+    """Short content hash of the named files"""
+    digest = hashlib.sha256()
+    for name in names:
+        digest.update(name.encode())
+        with open(os.path.join(artifact_dir, name), "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+def artifact_version(artifact_dir=None, compact=True):
+    """
+    Version of the model a Predictor loads from artifact_dir with this compact setting
+    
+    Published versions read it from their version.json; other directories (e.g.
+    the trained_models root before the first publish) hash the files that mode
+    loads. When a compact model exists, compact and full Predictors of the same
+    directory get different versions.
+    """
+    if artifact_dir is None:
+        artifact_dir = current_artifact_dir()
+    try:
+        with open(os.path.join(artifact_dir, VERSION_MANIFEST_FILE), "r") as f:
+            return json.load(f)["modes"]["compact" if compact else "full"]
+    except FileNotFoundError:
+        return hash_artifacts(artifact_dir, model_files(artifact_dir, compact))
+
+def export_mmap_engine(artifact_dir=None):
+    """Compile the pickled artifacts and save the engine in the memory-mappable format"""
+    if artifact_dir is None:
+        artifact_dir = current_artifact_dir()
+    predictor = Predictor(artifact_dir=artifact_dir, mmap=False)
+    if predictor.engine is None:
+        raise RuntimeError("Model artifacts could not be compiled")
+    path = os.path.join(artifact_dir, MMAP_DIR)
+    predictor.engine.save(path, version=predictor.model_version)
+    print(f"Saved memory-mapped model {predictor.model_version} to {path}")
+    return path
 
 class Predictor:
-    def __init__(self):
+    def __init__(self, compiled=True, artifact_dir=None, mmap=True, compact=True):
+        # Target columns
+        self.target_columns = list(TARGET_COLUMNS)
+        
+        # Compiled NumPy engine, used instead of pandas + sklearn when available
+        self.engine = None
+        # Identifies the loaded artifacts, e.g. for caching prediction results
+        self.model_version = "fallback"
+        # Defaults to the live published version
+        self.artifact_dir = current_artifact_dir() if artifact_dir is None else artifact_dir
+        artifact_dir = self.artifact_dir
+        self.compact = compact
+        # Guards the lazy load of the pickled model next to a memory-mapped engine
+        self._sklearn_lock = threading.Lock()
+        self._sklearn_failed = False
+        
+        # The memory-mapped engine needs no pickles, so skip loading them when it is available
+        # (it is exported from the compact model, so it does not apply with compact=False)
+        if compiled and mmap and compact and self._load_mmap_engine(artifact_dir):
+            return
+        
         try:
-            self.model = joblib.load("models/trained_models/best_model.pkl")
-            self.scaler = joblib.load("models/trained_models/scaler.pkl")
-            self.label_encoders = joblib.load("models/trained_models/label_encoders.pkl")
-            self.target_encoders = joblib.load("models/trained_models/target_encoders.pkl")
+            self.model = joblib.load(os.path.join(artifact_dir, self._model_file()))
+            self.scaler = joblib.load(os.path.join(artifact_dir, "scaler.pkl"))
+            self.label_encoders = joblib.load(os.path.join(artifact_dir, "label_encoders.pkl"))
+            self.target_encoders = joblib.load(os.path.join(artifact_dir, "target_encoders.pkl"))
             
             # Load feature columns
-            with open("models/trained_models/feature_columns.txt", "r") as f:
+            with open(os.path.join(artifact_dir, "feature_columns.txt"), "r") as f:
                 self.feature_columns = f.read().split(",")
             
+            self._build_lookup_tables()
+            self.model_version = artifact_version(artifact_dir, compact=self.compact)
             self.using_fallback = False
         except Exception as e:
             print(f"Error loading trained model: {str(e)}")
             print("Using fallback prediction behavior")
             self.using_fallback = True
         
-        # Target columns
-        self.target_columns = [
-            "impact_on_cramps",
-            "impact_on_bloating",
-            "impact_on_headache",
-            "impact_on_mood_swings",
-            "impact_on_fatigue",
-            "impact_on_acne"
-        ]
+        if compiled and not self.using_fallback:
+            self.compile()
+    
+    def _model_file(self):
+        # The distilled model is faster and nearly as accurate, so serve it when training produced one
+        return model_files(self.artifact_dir, self.compact)[0]
+    
+    def _load_sklearn_model(self):
+        """
+        Load the pickled model behind a memory-mapped engine, for batches sklearn predicts faster
+        
+        Returns:
+            True if self.model, self.scaler and the label arrays are available
+        """
+        if hasattr(self, "model"):
+            return True
+        with self._sklearn_lock:
+            if hasattr(self, "model") or self._sklearn_failed:
+                return hasattr(self, "model")
+            try:
+                model = joblib.load(os.path.join(self.artifact_dir, self._model_file()))
+                self.scaler = joblib.load(os.path.join(self.artifact_dir, "scaler.pkl"))
+                self.target_encoders = joblib.load(os.path.join(self.artifact_dir, "target_encoders.pkl"))
+            except Exception as e:
+                print(f"Error loading pickled model, batches stay on the compiled engine: {str(e)}")
+                self._sklearn_failed = True
+                return False
+            self.target_classes = {
+                col: np.asarray(encoder.classes_)
+                for col, encoder in self.target_encoders.items()
+            }
+            # Set last: other threads check for it without the lock
+            self.model = model
+        return True
+    
+    def _load_mmap_engine(self, artifact_dir):
+        """Load the engine saved by export_mmap_engine if it matches the pickled artifacts"""
+        path = os.path.join(artifact_dir, MMAP_DIR)
+        if not os.path.exists(path):
+            return False
+        try:
+            engine, version = CompiledModel.load(path, mmap_mode="r")
+            current_version = artifact_version(artifact_dir)
+            if version != current_version:
+                print(f"Ignoring memory-mapped model {version}, artifacts are {current_version}")
+                return False
+        except Exception as e:
+            print(f"Error loading memory-mapped model: {str(e)}")
+            return False
+        
+        self.engine = engine
+        self.feature_columns = engine.feature_columns
+        self.category_maps = engine.category_maps
+        self.model_version = version
+        self.using_fallback = False
+        print(f"Loaded memory-mapped prediction engine: {', '.join(engine.kinds)}")
+        return True
+    
+    def compile(self):
+        """Compile the loaded artifacts into the pandas-free inference engine"""
+        try:
+            self.engine = CompiledModel.from_artifacts(
+                self.model, self.scaler, self.label_encoders, self.target_encoders,
+                self.feature_columns, self.target_columns
+            )
+            print(f"Compiled prediction engine: {', '.join(self.engine.kinds)}")
+        except Exception as e:
+            print(f"Error compiling model, using sklearn prediction: {str(e)}")
+            self.engine = None
+    
+    def _build_lookup_tables(self):
+        """Precompute category -> code maps and target label arrays for batch prediction"""
+        self.category_maps = build_category_maps(self.label_encoders)
+        self.target_classes = {
+            col: np.asarray(encoder.classes_)
+            for col, encoder in self.target_encoders.items()
+        }
     
     def _encode_food_data(self, food_data):
         """Encode food data using trained label encoders"""
+        import pandas as pd
+        
         # Create a DataFrame with all features
         input_df = pd.DataFrame([food_data])
         
@@ -69,6 +289,23 @@ class Predictor:
         
         return results
     
+    def _encode_batch(self, food_items):
+        """
+        Encode a list of food dicts into a single feature matrix
+        
+        Returns:
+            (matrix, valid) where valid marks rows whose numeric features could be parsed
+        """
+        return encode_rows(food_items, self.feature_columns, self.category_maps)
+    
+    def _decode_batch(self, predictions):
+        """Decode a (n_items, n_targets) prediction matrix into a list of result dicts"""
+        decoded_columns = [
+            self.target_classes[col][predictions[:, i].astype(np.intp)].tolist()
+            for i, col in enumerate(self.target_columns)
+        ]
+        return [dict(zip(self.target_columns, row)) for row in zip(*decoded_columns)]
+    
     def _get_fallback_predictions(self, food_data):
         """Generate fallback predictions based on food category"""
         print(f"Generating fallback predictions for: {food_data}")
@@ -125,6 +362,14 @@ class Predictor:
         try:
             if self.using_fallback:
                 return self._get_fallback_predictions(food_data)
+            
+            if self.engine is not None:
+                results = self.engine.predict_one(food_data)
+                if results is None:
+                    # Same outcome as the sklearn path failing on bad numeric input
+                    print("Error in prediction: invalid numeric attributes")
+                    return self._get_fallback_predictions(food_data)
+                return results
                 
             # Encode input data
             encoded_data = self._encode_food_data(food_data)
@@ -142,4 +387,58 @@ class Predictor:
         except Exception as e:
             print(f"Error in prediction: {str(e)}")
             # Fallback to random predictions
-            return self._get_fallback_predictions(food_data) 
+            return self._get_fallback_predictions(food_data)
+    
+    def predict_batch(self, food_items):
+        """
+        Make predictions for many foods in one vectorized pass
+        
+        Args:
+            food_items: List of dictionaries containing food attributes
+        
+        Returns:
+            List of dictionaries with predicted impact values, in input order
+        """
+        if not food_items:
+            return []
+        
+        if self.using_fallback:
+            return [self._get_fallback_predictions(food_data) for food_data in food_items]
+        
+        try:
+            # Encode all items into one matrix
+            encoded_data, valid = self._encode_batch(food_items)
+            results = [None] * len(food_items)
+            
+            # Tree engines are slower than sklearn for large batches; use the engine only where it is faster
+            n_valid = int(valid.sum())
+            if n_valid and self.engine is not None and (
+                self.engine.faster_for_batch(n_valid) or not self._load_sklearn_model()
+            ):
+                for i, decoded in zip(np.flatnonzero(valid), self.engine.predict_encoded(encoded_data[valid])):
+                    results[i] = decoded
+            elif valid.any():
+                import pandas as pd
+                
+                # Scale and predict the whole batch at once
+                scaled_data = self.scaler.transform(
+                    pd.DataFrame(encoded_data[valid], columns=self.feature_columns)
+                )
+                predictions = self.model.predict(scaled_data)
+                
+                for i, decoded in zip(np.flatnonzero(valid), self._decode_batch(predictions)):
+                    results[i] = decoded
+            
+            # Rows that could not be encoded get the same fallback as predict()
+            for i in np.flatnonzero(~valid):
+                print(f"Error in prediction: invalid numeric attributes for item {i}")
+                results[i] = self._get_fallback_predictions(food_items[i])
+            
+            return results
+        except Exception as e:
+            print(f"Error in batch prediction: {str(e)}")
+            return [self._get_fallback_predictions(food_data) for food_data in food_items]
+
+
+if __name__ == "__main__":
+    publish_artifacts()
@@ -1,23 +1,29 @@
+"""
+Train the candidate models, save the best one and publish it
+
+Usage:
+    python models/train_models.py                       # train every model, one after another
+    python models/train_models.py --parallel            # train them in a process pool
+    python models/train_models.py --parallel --jobs 4 --models "Random Forest,SVM"
+    python models/train_models.py --search --latency-budget-ms 0.5   # hyperparameter search, see model_search.py
+"""
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.svm import SVC
 from sklearn.metrics import roc_curve, auc, accuracy_score, precision_score, recall_score, f1_score, classification_report
 from sklearn.multioutput import MultiOutputClassifier
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
 import joblib
 import os
-
-# Create directories if they don't exist
-os.makedirs("models/trained_models", exist_ok=True)
-os.makedirs("static/images", exist_ok=True)
-
-# Load the dataset
-print("Loading dataset...")
-df = pd.read_csv("menstruation_food_recommendations_noisy.csv")
+import sys
+import time
 
 # Define target variables
 target_columns = [
@@ -29,176 +35,302 @@ target_columns = [
     "impact_on_acne"
 ]
 
-# Print dataset info
-print(f"Dataset shape: {df.shape}")
-print(f"Target columns: {target_columns}")
-
-# Encode categorical features
-categorical_cols = df.select_dtypes(include=['object']).columns
-label_encoders = {}
-
-for col in categorical_cols:
-    if col not in target_columns:
-        le = LabelEncoder()
-        df[col] = le.fit_transform(df[col])
-        label_encoders[col] = le
-
-# Encode target variables
-target_encoders = {}
-for col in target_columns:
-    le = LabelEncoder()
-    df[col] = le.fit_transform(df[col])
-    target_encoders[col] = le
-
-# Save label encoders
-joblib.dump(label_encoders, "models/trained_models/label_encoders.pkl")
-joblib.dump(target_encoders, "models/trained_models/target_encoders.pkl")
-
-# Define features
-feature_columns = [col for col in df.columns if col not in target_columns and col not in ['user_id', 'name']]
-
-# Split data
-X = df[feature_columns]
-y = df[target_columns]
-
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# Scale features
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
-
-# Save scaler
-joblib.dump(scaler, "models/trained_models/scaler.pkl")
-
-# Define models to train
-models = {
-    "Logistic Regression": MultiOutputClassifier(LogisticRegression(max_iter=1000)),
-    "Random Forest": MultiOutputClassifier(RandomForestClassifier(n_estimators=100, random_state=42)),
-    "Gradient Boosting": MultiOutputClassifier(GradientBoostingClassifier(n_estimators=100, random_state=42)),
-    "SVM": MultiOutputClassifier(SVC(probability=True, random_state=42))
-}
-
-# Dictionary to store results
-results = {}
-best_model_name = None
-best_score = 0
-
-# Train and evaluate each model
-for name, model in models.items():
-    print(f"Training {name}...")
+# Candidate models, built by name so worker processes can construct them
+MODEL_NAMES = ["Logistic Regression", "Random Forest", "Gradient Boosting", "SVM"]
+
+def build_model(name, params=None):
+    """Build a candidate with its default hyperparameters, overridden by params"""
+    params = params or {}
+    if name == "Logistic Regression":
+        return MultiOutputClassifier(LogisticRegression(**{"max_iter": 1000, **params}))
+    if name == "Random Forest":
+        return MultiOutputClassifier(RandomForestClassifier(**{"n_estimators": 100, "random_state": 42, **params}))
+    if name == "Gradient Boosting":
+        return MultiOutputClassifier(GradientBoostingClassifier(**{"n_estimators": 100, "random_state": 42, **params}))
+    if name == "SVM":
+        return MultiOutputClassifier(SVC(**{"probability": True, "random_state": 42, **params}))
+    raise ValueError(f"Unknown model: {name}")
+
+def prepare_data(csv_path="menstruation_food_recommendations_noisy.csv", use_cache=True):
+    """Load the encoded dataset, save the encoders, fit and save the scaler, and return the split matrices"""
+    from models.data_cache import load_encoded_dataset
+
+    # Parsing and label encoding are skipped when the CSV matches a cached encoding
+    print("Loading dataset...")
+    dataset = load_encoded_dataset(csv_path, target_columns, use_cache=use_cache)
+    label_encoders = dataset.label_encoders
+    target_encoders = dataset.target_encoders
+    feature_columns = dataset.feature_columns
+
+    # Print dataset info
+    print(f"Dataset shape: {dataset.X.shape[0]} rows, {len(feature_columns)} features")
+    print(f"Target columns: {target_columns}")
+
+    # Save label encoders
+    joblib.dump(label_encoders, "models/trained_models/label_encoders.pkl")
+    joblib.dump(target_encoders, "models/trained_models/target_encoders.pkl")
+
+    # Split data
+    X = pd.DataFrame(dataset.X, columns=feature_columns)
+    y = pd.DataFrame(dataset.y, columns=target_columns)
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    # Scale features
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    # Save scaler
+    joblib.dump(scaler, "models/trained_models/scaler.pkl")
+
+    # Save feature columns
+    with open("models/trained_models/feature_columns.txt", "w") as f:
+        f.write(",".join(feature_columns))
+
+    encoders = {'scaler': scaler, 'label_encoders': label_encoders, 'target_encoders': target_encoders}
+    return X_train_scaled, X_test_scaled, y_train.to_numpy(), y_test.to_numpy(), feature_columns, encoders
+
+# Encoded, scaled matrices, set once per worker process by init_worker
+_data = None
+
+def init_worker(data):
+    global _data
+    _data = data
+
+def train_and_evaluate(name, params=None):
+    """Fit one candidate on the shared matrices and compute its test metrics and scores"""
+    X_train_scaled, X_test_scaled, y_train, y_test = _data[:4]
+    model = build_model(name, params)
+
+    started = time.perf_counter()
     model.fit(X_train_scaled, y_train)
-    
+    fit_seconds = time.perf_counter() - started
+
+    result = evaluate_model(model, X_test_scaled, y_test)
+    result['fit_seconds'] = fit_seconds
+    result['total_seconds'] = time.perf_counter() - started
+    return result
+
+def evaluate_model(model, X_test_scaled, y_test):
+    """Test-set metrics averaged over the targets, plus the predictions they came from"""
     # Predict on test set
     y_pred = model.predict(X_test_scaled)
-    
+
     # Calculate metrics for each target separately and average
     accuracies = []
     precisions = []
     recalls = []
     f1s = []
-    
+
     for i in range(y_test.shape[1]):
-        accuracies.append(accuracy_score(y_test.iloc[:, i], y_pred[:, i]))
-        precisions.append(precision_score(y_test.iloc[:, i], y_pred[:, i], 
+        accuracies.append(accuracy_score(y_test[:, i], y_pred[:, i]))
+        precisions.append(precision_score(y_test[:, i], y_pred[:, i],
                         average='weighted', zero_division=0))
-        recalls.append(recall_score(y_test.iloc[:, i], y_pred[:, i], 
+        recalls.append(recall_score(y_test[:, i], y_pred[:, i],
                       average='weighted', zero_division=0))
-        f1s.append(f1_score(y_test.iloc[:, i], y_pred[:, i], 
+        f1s.append(f1_score(y_test[:, i], y_pred[:, i],
                   average='weighted', zero_division=0))
-    
-    accuracy = np.mean(accuracies)
-    precision = np.mean(precisions)
-    recall = np.mean(recalls)
-    f1 = np.mean(f1s)
-    
-    print(f"{name} - Accuracy: {accuracy:.4f}, Precision: {precision:.4f}, Recall: {recall:.4f}, F1: {f1:.4f}")
-    
-    # Store results
-    results[name] = {
+
+    return {
         'model': model,
-        'accuracy': accuracy,
-        'precision': precision,
-        'recall': recall,
-        'f1': f1,
+        'accuracy': np.mean(accuracies),
+        'precision': np.mean(precisions),
+        'recall': np.mean(recalls),
+        'f1': np.mean(f1s),
+        # Kept so the report and ROC plots do not predict again
+        'y_pred': y_pred,
         'y_pred_proba': model.predict_proba(X_test_scaled)
     }
-    
-    # Update best model
-    if accuracy > best_score:
-        best_score = accuracy
-        best_model_name = name
-
-# Print classification report for best model
-best_model = results[best_model_name]['model']
-y_pred = best_model.predict(X_test_scaled)
-print(f"\nBest model: {best_model_name} with accuracy {best_score:.4f}")
-print("\nClassification Report for Best Model:")
-for i, target in enumerate(target_columns):
-    print(f"\nTarget: {target}")
-    print(classification_report(y_test.iloc[:, i], y_pred[:, i], zero_division=0))
-
-# Save best model
-joblib.dump(best_model, f"models/trained_models/best_model.pkl")
-print(f"Best model saved: {best_model_name}")
-
-# Save feature columns
-with open("models/trained_models/feature_columns.txt", "w") as f:
-    f.write(",".join(feature_columns))
-
-# Plot ROC curves for all models
-plt.figure(figsize=(15, 10))
-
-for target_idx, target in enumerate(target_columns):
-    plt.subplot(2, 3, target_idx + 1)
-    
-    for name in models.keys():
-        # Get binary predictions for this target
-        y_test_binary = y_test.iloc[:, target_idx]
-        y_score = results[name]['y_pred_proba'][target_idx]
-        
-        # Calculate ROC curve
-        fpr = {}
-        tpr = {}
-        roc_auc = {}
-        
-        for i in range(len(np.unique(y_test_binary))):
-            # Convert to one-vs-rest for ROC
-            y_binary = (y_test_binary == i).astype(int)
-            if y_score.shape[1] > i:  # Check if the model has predictions for this class
-                fpr[i], tpr[i], _ = roc_curve(y_binary, y_score[:, i])
-                roc_auc[i] = auc(fpr[i], tpr[i])
-        
-        # Plot ROC curve for each class
-        for i in range(len(np.unique(y_test_binary))):
-            if i in roc_auc:
-                plt.plot(fpr[i], tpr[i], lw=2, 
-                         label=f'{name} - Class {i} (AUC = {roc_auc[i]:.2f})')
-    
-    plt.plot([0, 1], [0, 1], 'k--', lw=2)
-    plt.xlim([0.0, 1.0])
-    plt.ylim([0.0, 1.05])
-    plt.xlabel('False Positive Rate')
-    plt.ylabel('True Positive Rate')
-    plt.title(f'ROC Curve - {target}')
-    plt.legend(loc="lower right", fontsize='small')
-
-plt.tight_layout()
-plt.savefig("static/images/roc_curves.png")
-print("ROC curves saved to static/images/roc_curves.png")
-
-# Create a summary of model performances
-summary_df = pd.DataFrame({
-    'Model': list(results.keys()),
-    'Accuracy': [results[model]['accuracy'] for model in results],
-    'Precision': [results[model]['precision'] for model in results],
-    'Recall': [results[model]['recall'] for model in results],
-    'F1 Score': [results[model]['f1'] for model in results]
-})
-
-summary_df.to_csv("models/trained_models/model_performance.csv", index=False)
-print("Model performance summary saved to models/trained_models/model_performance.csv")
-
-print("\nTraining complete!")
-print(f"Best model: {best_model_name}")
-print(f"Saved to: models/trained_models/best_model.pkl") 
\ No newline at end of file
+
+def train_models(names, data, parallel=False, jobs=None):
+    """Train the named models, sequentially or in a process pool; returns results in names order"""
+    results = {}
+    if not parallel:
+        init_worker(data)
+        for name in names:
+            print(f"Training {name}...")
+            results[name] = train_and_evaluate(name)
+            report_model(name, results[name])
+        return results
+
+    jobs = min(jobs or os.cpu_count() or 1, len(names))
+    print(f"Training {len(names)} models in {jobs} processes...")
+    # The matrices are sent to each worker once, not with every task
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(data,)) as executor:
+        futures = {executor.submit(train_and_evaluate, name): name for name in names}
+        for future in as_completed(futures):
+            name = futures[future]
+            results[name] = future.result()
+            report_model(name, results[name])
+    return {name: results[name] for name in names}
+
+def report_model(name, result):
+    print(f"{name} - Accuracy: {result['accuracy']:.4f}, Precision: {result['precision']:.4f}, "
+          f"Recall: {result['recall']:.4f}, F1: {result['f1']:.4f} "
+          f"(fit {result['fit_seconds']:.1f}s, total {result['total_seconds']:.1f}s)")
+
+def plot_roc_curves(results, y_test):
+    """Plot ROC curves for all models"""
+    plt.figure(figsize=(15, 10))
+
+    for target_idx, target in enumerate(target_columns):
+        plt.subplot(2, 3, target_idx + 1)
+
+        for name in results.keys():
+            # Get binary predictions for this target
+            y_test_binary = y_test[:, target_idx]
+            y_score = results[name]['y_pred_proba'][target_idx]
+
+            # Calculate ROC curve
+            fpr = {}
+            tpr = {}
+            roc_auc = {}
+
+            for i in range(len(np.unique(y_test_binary))):
+                # Convert to one-vs-rest for ROC
+                y_binary = (y_test_binary == i).astype(int)
+                if y_score.shape[1] > i:  # Check if the model has predictions for this class
+                    fpr[i], tpr[i], _ = roc_curve(y_binary, y_score[:, i])
+                    roc_auc[i] = auc(fpr[i], tpr[i])
+
+            # Plot ROC curve for each class
+            for i in range(len(np.unique(y_test_binary))):
+                if i in roc_auc:
+                    plt.plot(fpr[i], tpr[i], lw=2,
+                             label=f'{name} - Class {i} (AUC = {roc_auc[i]:.2f})')
+
+        plt.plot([0, 1], [0, 1], 'k--', lw=2)
+        plt.xlim([0.0, 1.0])
+        plt.ylim([0.0, 1.05])
+        plt.xlabel('False Positive Rate')
+        plt.ylabel('True Positive Rate')
+        plt.title(f'ROC Curve - {target}')
+        plt.legend(loc="lower right", fontsize='small')
+
+    plt.tight_layout()
+    plt.savefig("static/images/roc_curves.png")
+    print("ROC curves saved to static/images/roc_curves.png")
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the food impact models")
+    parser.add_argument("--parallel", action="store_true", help="Train the models in a process pool")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes for --parallel (default: all cores)")
+    parser.add_argument("--models", default=None,
+                        help=f"Comma-separated subset of models to train (default: {', '.join(MODEL_NAMES)})")
+    parser.add_argument("--search", action="store_true",
+                        help="Search hyperparameters with successive halving instead of using the defaults")
+    parser.add_argument("--cv", type=int, default=3, help="Cross-validation folds for --search")
+    parser.add_argument("--latency-budget-ms", type=float, default=None,
+                        help="With --search, prefer models whose per-row Predictor latency is within this budget")
+    parser.add_argument("--max-size-mb", type=float, default=None,
+                        help="With --search, prefer models whose pickled size is within this limit")
+    parser.add_argument("--no-data-cache", action="store_true",
+                        help="Parse and encode the CSV even if models/data_cache has it")
+    parser.add_argument("--no-distill", action="store_true",
+                        help="Serve the selected model itself instead of a distilled compact model")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.01,
+                        help="Largest test accuracy loss accepted for the compact model (default: 0.01)")
+    args = parser.parse_args()
+
+    # Add the project root to the path for the models.* imports below
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    names = MODEL_NAMES
+    if args.models:
+        names = [name.strip() for name in args.models.split(",") if name.strip()]
+        unknown = [name for name in names if name not in MODEL_NAMES]
+        if unknown:
+            parser.error(f"Unknown models: {', '.join(unknown)}. Choose from: {', '.join(MODEL_NAMES)}")
+
+    started = time.perf_counter()
+
+    # Create directories if they don't exist
+    os.makedirs("models/trained_models", exist_ok=True)
+    os.makedirs("static/images", exist_ok=True)
+
+    X_train_scaled, X_test_scaled, y_train, y_test, feature_columns, encoders = prepare_data(use_cache=not args.no_data_cache)
+    data = (X_train_scaled, X_test_scaled, y_train, y_test, feature_columns, encoders)
+    data_seconds = time.perf_counter() - started
+
+    training_started = time.perf_counter()
+    if args.search:
+        from models.model_search import search_models
+        results, best_model_name = search_models(
+            names, data,
+            jobs=args.jobs, cv=args.cv, latency_budget_ms=args.latency_budget_ms, max_size_mb=args.max_size_mb
+        )
+        best_score = results[best_model_name]['accuracy']
+    else:
+        results = train_models(names, (X_train_scaled, X_test_scaled, y_train, y_test), args.parallel, args.jobs)
+
+        # Pick the most accurate model; ties go to the first in names order
+        best_model_name = None
+        best_score = 0
+        for name, result in results.items():
+            if best_model_name is None or result['accuracy'] > best_score:
+                best_score = result['accuracy']
+                best_model_name = name
+    training_seconds = time.perf_counter() - training_started
+
+    # Print classification report for best model
+    best_model = results[best_model_name]['model']
+    y_pred = results[best_model_name]['y_pred']
+    print(f"\nBest model: {best_model_name} with accuracy {best_score:.4f}")
+    print("\nClassification Report for Best Model:")
+    for i, target in enumerate(target_columns):
+        print(f"\nTarget: {target}")
+        print(classification_report(y_test[:, i], y_pred[:, i], zero_division=0))
+
+    # Save best model
+    joblib.dump(best_model, f"models/trained_models/best_model.pkl")
+    print(f"Best model saved: {best_model_name}")
+
+    # Distil the best model into a compact serving model; a stale one from an earlier run must not be served
+    compact_path = "models/trained_models/compact_model.pkl"
+    if os.path.exists(compact_path):
+        os.remove(compact_path)
+    if not args.no_distill:
+        from models.distill import distill
+        compact_model, _ = distill(best_model, data, max_accuracy_drop=args.max_accuracy_drop)
+        if compact_model is not None:
+            joblib.dump(compact_model, compact_path)
+            print(f"Compact serving model saved to {compact_path}")
+
+    plot_roc_curves(results, y_test)
+
+    # Create a summary of model performances
+    summary_df = pd.DataFrame({
+        'Model': list(results.keys()),
+        'Accuracy': [results[model]['accuracy'] for model in results],
+        'Precision': [results[model]['precision'] for model in results],
+        'Recall': [results[model]['recall'] for model in results],
+        'F1 Score': [results[model]['f1'] for model in results],
+        'Fit Seconds': [results[model]['fit_seconds'] for model in results],
+        # Only measured by --search
+        'Latency ms': [results[model].get('latency_ms') for model in results],
+        'Size KB': [results[model]['size_bytes'] / 1024 if 'size_bytes' in results[model] else None for model in results]
+    })
+
+    summary_df.to_csv("models/trained_models/model_performance.csv", index=False)
+    print("Model performance summary saved to models/trained_models/model_performance.csv")
+
+    print("\nTraining complete!")
+    print(f"Best model: {best_model_name}")
+    print(f"Saved to: models/trained_models/best_model.pkl")
+
+    print("\nWall-clock time:")
+    width = max([20] + [len(name) for name in results])
+    for name, result in results.items():
+        print(f"  {name:<{width}} {result['total_seconds']:7.1f}s")
+    print(f"  {'Data preparation':<{width}} {data_seconds:7.1f}s")
+    mode = 'search' if args.search else 'parallel' if args.parallel else 'sequential'
+    print(f"  {'Training (' + mode + ')':<{width}} {training_seconds:7.1f}s")
+    print(f"  {'Overall':<{width}} {time.perf_counter() - started:7.1f}s")
+
+    # Publish the artifacts as a new model version; running apps pick it up without a restart
+    from models.predict import publish_artifacts
+    publish_artifacts()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
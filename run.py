@@ -53,6 +53,13 @@ def check_models():
     else:
         print("ML models already trained and ready.")
 
+def build_warm_cache(python_exe):
+    """Precompute predictions for the most requested foods."""
+    print("Building warm cache of popular foods...")
+    result = subprocess.run([python_exe, "api/warm_cache.py"])
+    if result.returncode != 0:
+        print("Warning: Could not build the warm cache, starting without it.")
+
 def run_application(python_exe, debug=False):
     """Run the Flask application."""
     env = os.environ.copy()
@@ -67,6 +74,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Garuda 4.0 Launcher")
     parser.add_argument("--debug", action="store_true", help="Run in debug mode")
     parser.add_argument("--skip-deps", action="store_true", help="Skip dependency installation")
+    parser.add_argument("--warm-cache", action="store_true", help="Precompute popular foods before starting")
     args = parser.parse_args()
     
     # Check Python version
@@ -82,5 +90,9 @@ if __name__ == "__main__":
     # Check models
     check_models()
     
+    # Build warm cache
+    if args.warm_cache:
+        build_warm_cache(python_exe)
+    
     # Run application
     run_application(python_exe, args.debug) 
\ No newline at end of file
@@ -0,0 +1,184 @@
+import base64
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Database:
+    """
+    Pool of long-lived SQLite connections
+
+    Opening a connection per query re-reads the schema and throws away the
+    prepared statement cache, and the default rollback journal makes readers
+    and writers block each other. Connections here are opened once in WAL
+    mode with synchronous=NORMAL and a memory map, then handed out to one
+    thread at a time. A thread that already holds a connection gets the same
+    one back, so helpers can be nested inside a transaction.
+    """
+
+    def __init__(self, path='food_predictions.db', pool_size=8, busy_timeout=5000,
+                 mmap_size=64 * 1024 * 1024, cache_size=-8000, cached_statements=256):
+        self.path = path
+        self.pool_size = pool_size
+        self.busy_timeout = busy_timeout  # milliseconds
+        self.mmap_size = mmap_size  # bytes
+        self.cache_size = cache_size  # negative values are KiB
+        self.cached_statements = cached_statements
+
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters = {
+            'checkouts': 0,
+            'connections_opened': 0,
+            'connections_reused': 0,
+            'connections_closed': 0,
+            'commits': 0,
+            'rollbacks': 0
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout / 1000,
+            cached_statements=self.cached_statements,
+            # Each connection is used by one thread at a time, but not always the same thread
+            check_same_thread=False
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute(f'PRAGMA cache_size={int(self.cache_size)}')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        self._count('connections_opened')
+        return conn
+
+    def _release(self, conn):
+        if self._idle.qsize() < self.pool_size:
+            self._idle.put(conn)
+        else:
+            conn.close()
+            self._count('connections_closed')
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the current thread
+
+        Commits when the outermost block exits normally and rolls back if it
+        raises, like `with sqlite3.connect(...) as conn`. Connections are
+        shared between requests, so set row_factory on cursors, not on the
+        connection.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            # Nested use on the same thread joins the outer transaction
+            yield conn
+            return
+
+        try:
+            conn = self._idle.get_nowait()
+            self._count('connections_reused')
+        except queue.Empty:
+            conn = self._open()
+        self._count('checkouts')
+        self._local.conn = conn
+
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+                self._count('commits')
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+                self._count('rollbacks')
+            raise
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    @contextmanager
+    def cursor(self, row_factory=None):
+        """Shortcut for a cursor on a checked-out connection"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            if row_factory is not None:
+                cursor.row_factory = row_factory
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    def migrate(self, migrations):
+        """
+        Apply pending schema migrations
+
+        migrations is a list of SQL scripts; script N (1-based) moves the schema
+        to version N. The current version is kept in PRAGMA user_version, so
+        each script runs once per database, in its own transaction. Returns
+        the number of scripts applied.
+        """
+        applied = 0
+        for number, script in enumerate(migrations, start=1):
+            with self.connection() as conn:
+                # executescript would commit first; run statements one by one inside a transaction.
+                # The write lock is taken before reading the version, so concurrent workers
+                # starting at the same time do not apply a migration twice.
+                conn.execute('BEGIN IMMEDIATE')
+                if conn.execute('PRAGMA user_version').fetchone()[0] >= number:
+                    continue
+                for statement in script.split(';'):
+                    if statement.strip():
+                        conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {number}')
+            applied += 1
+            print(f"Applied database migration {number}")
+        return applied
+
+    def close(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+                self._count('connections_closed')
+            except queue.Empty:
+                break
+
+    def stats(self):
+        """Return pool usage counters"""
+        with self._lock:
+            stats = dict(self._counters)
+        stats['pool_size'] = self.pool_size
+        stats['idle_connections'] = self._idle.qsize()
+        return stats
+
+
+def sql_timestamp(when=None):
+    """UTC time formatted like SQLite's CURRENT_TIMESTAMP ("2024-05-01 12:30:00")"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(when))
+
+
+def encode_cursor(*values):
+    """Encode the sort key of the last row on a page as an opaque pagination cursor"""
+    raw = "\x1f".join(str(value) for value in values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, count):
+    """Decode a cursor from encode_cursor into its values; raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    values = raw.split("\x1f")
+    if len(values) != count:
+        raise ValueError("Invalid cursor")
+    return values
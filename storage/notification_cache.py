@@ -0,0 +1,72 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+class NotificationCache:
+    """
+    Cached active notification with an ETag
+
+    The active notification only changes through /admin/set-notification,
+    which calls invalidate(), so polls are answered from memory. The ttl
+    bounds how long other worker processes, whose caches are not
+    invalidated, keep serving an outdated notification.
+    """
+
+    def __init__(self, database, ttl=10.0):
+        self.database = database
+        self.ttl = ttl
+
+        self._entry = None  # (expires_at, notification, etag)
+        # Bumped by invalidate() so a load that raced with an update is not cached
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            'hits': 0,
+            'loads': 0,
+            'invalidations': 0
+        }
+
+    def _load(self):
+        with self.database.connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute('SELECT * FROM notifications WHERE is_active = TRUE ORDER BY created_at DESC LIMIT 1')
+            row = cursor.fetchone()
+        notification = dict(row) if row else None
+        # The ETag is a digest of the content, so every process computes the same one
+        digest = hashlib.sha1(json.dumps(notification, sort_keys=True, default=str).encode()).hexdigest()
+        return notification, digest[:16]
+
+    def get(self):
+        """Return (notification or None, etag)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry
+            if entry is not None and entry[0] > now:
+                self._counters['hits'] += 1
+                return entry[1], entry[2]
+            generation = self._generation
+
+        notification, etag = self._load()
+        with self._lock:
+            if generation == self._generation:
+                self._entry = (now + self.ttl, notification, etag)
+            self._counters['loads'] += 1
+        return notification, etag
+
+    def invalidate(self):
+        """Drop the cached notification; the next get() reloads it"""
+        with self._lock:
+            self._entry = None
+            self._generation += 1
+            self._counters['invalidations'] += 1
+
+    def stats(self):
+        """Return hit/load/invalidation counters"""
+        with self._lock:
+            stats = dict(self._counters)
+        stats['ttl'] = self.ttl
+        return stats
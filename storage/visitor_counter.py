@@ -0,0 +1,104 @@
+import itertools
+import threading
+
+
+class VisitorCounter:
+    """
+    In-process visitor counter flushed to visitor_stats every few seconds
+
+    increment() is a single next() on an itertools.count, which is atomic
+    under the GIL, so page loads never take a lock or touch SQLite. A
+    background thread adds the increments since the last flush to the stored
+    count with one UPDATE. Because each process only adds its own delta,
+    several worker processes can share the table without losing visits; a
+    process sees the others' visits after its next flush.
+    """
+
+    def __init__(self, database, flush_interval=5.0):
+        self.database = database
+        self.flush_interval = flush_interval
+
+        # Every read also advances _ticks, so reads are counted and subtracted
+        self._ticks = itertools.count()
+        self._reads = 0
+        self._read_lock = threading.Lock()
+
+        # (visit_count stored in the database, local increments included in it)
+        self._snapshot = None
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._counters = {
+            'flushes': 0,
+            'flush_errors': 0
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='visitor-counter', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _local_total(self):
+        """Number of increments made in this process so far"""
+        with self._read_lock:
+            value = next(self._ticks) - self._reads
+            self._reads += 1
+        return value
+
+    def increment(self):
+        """Count one visit"""
+        self._ensure_started()
+        next(self._ticks)
+
+    def value(self):
+        """Current count: the stored count plus this process's unflushed visits"""
+        if self._snapshot is None:
+            self.flush()
+            if self._snapshot is None:
+                raise RuntimeError("Visitor count is not available")
+        stored, flushed = self._snapshot
+        return stored + self._local_total() - flushed
+
+    def flush(self):
+        """Add unflushed visits to the stored count and reload it"""
+        with self._flush_lock:
+            total = self._local_total()
+            flushed = self._snapshot[1] if self._snapshot is not None else 0
+            delta = total - flushed
+            try:
+                with self.database.connection() as conn:
+                    if delta:
+                        conn.execute('UPDATE visitor_stats SET visit_count = visit_count + ? WHERE id = 1', (delta,))
+                    stored = conn.execute('SELECT visit_count FROM visitor_stats WHERE id = 1').fetchone()[0]
+            except Exception as e:
+                # Keep the visits pending; the next flush retries them
+                print(f"Error flushing visitor count: {str(e)}")
+                self._counters['flush_errors'] += 1
+                return
+            self._snapshot = (stored, total)
+            self._counters['flushes'] += 1
+
+    def close(self):
+        """Stop the flush thread and write any pending visits"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def stats(self):
+        """Return flush counters and the number of visits not yet written"""
+        stats = dict(self._counters)
+        flushed = self._snapshot[1] if self._snapshot is not None else 0
+        stats['pending'] = self._local_total() - flushed
+        stats['flush_interval'] = self.flush_interval
+        return stats
@@ -0,0 +1,192 @@
+import queue
+import threading
+import time
+
+
+class WriteBehindQueue:
+    """
+    Background writer that batches INSERTs into group commits
+
+    Request handlers submit (sql, params) pairs and return immediately; a
+    single writer thread drains the queue and runs everything it finds in one
+    transaction, so many requests share one commit. The queue is bounded:
+    when it is full, submit() waits up to put_timeout seconds for room and
+    then writes the row itself, so rows are never dropped and a stalled
+    writer slows requests down instead of growing memory without limit.
+
+    Readers that must see their own writes pass the same key to submit()
+    and flush_key(), which waits only for the rows submitted under that key
+    (one user's history, say) instead of everything queued. flush() waits
+    for every row submitted before the call. Both return at once when
+    nothing they wait for is pending.
+    """
+
+    def __init__(self, database, max_queue=10000, batch_size=500, linger=0.01, put_timeout=1.0):
+        self.database = database
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.linger = linger  # seconds to wait for more rows before committing a small batch
+        self.put_timeout = put_timeout
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._stopping = False
+        self._start_lock = threading.Lock()
+        self._lock = threading.Lock()
+        # Sequence numbers of the last queued and the last committed row
+        self._committed = threading.Condition(self._lock)
+        self._submitted_seq = 0
+        self._committed_seq = 0
+        # key -> sequence number of the last row submitted under it, until that row is committed
+        self._pending_keys = {}
+        self._counters = {
+            'submitted': 0,
+            'written': 0,
+            'batches': 0,
+            'errors': 0,
+            'full_waits': 0,
+            'sync_writes': 0,
+            'max_depth': 0,
+            'last_batch_size': 0,
+            'last_commit_ms': None
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+
+    def submit(self, sql, params, key=None):
+        """Queue one statement; it is committed in the background shortly after"""
+        self._ensure_started()
+        params = tuple(params)
+        deadline = None
+        while True:
+            with self._lock:
+                # Sequence numbers follow queue order because both are assigned under the lock
+                try:
+                    self._queue.put_nowait((self._submitted_seq + 1, sql, params))
+                except queue.Full:
+                    if deadline is None:
+                        self._counters['full_waits'] += 1
+                else:
+                    self._submitted_seq += 1
+                    if key is not None:
+                        self._pending_keys[key] = self._submitted_seq
+                    self._counters['submitted'] += 1
+                    self._counters['max_depth'] = max(self._counters['max_depth'], self._queue.qsize())
+                    return
+
+            if deadline is None:
+                deadline = time.monotonic() + self.put_timeout
+            elif time.monotonic() >= deadline:
+                break
+            time.sleep(0.005)
+
+        # Backpressure: the writer cannot keep up, so write on the caller's thread
+        with self._lock:
+            self._counters['sync_writes'] += 1
+        self._write([(None, sql, params)])
+
+    def submit_many(self, sql, rows, key=None):
+        """Queue the same statement for several parameter tuples"""
+        for params in rows:
+            self.submit(sql, params, key)
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stopping:
+                    return
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._write(batch)
+
+    def _write(self, batch):
+        """Write a batch in one transaction, falling back to row by row if it fails"""
+        started = time.perf_counter()
+        try:
+            with self.database.connection() as conn:
+                # Consecutive rows for the same statement go through one executemany
+                start = 0
+                for i in range(1, len(batch) + 1):
+                    if i == len(batch) or batch[i][1] != batch[start][1]:
+                        conn.executemany(batch[start][1], [params for _, _, params in batch[start:i]])
+                        start = i
+            written = len(batch)
+        except Exception as e:
+            print(f"Error writing batch of {len(batch)} rows: {str(e)}")
+            written = 0
+            # Retry one by one so a single bad row does not lose the rest
+            for _, sql, params in batch:
+                try:
+                    with self.database.connection() as conn:
+                        conn.execute(sql, params)
+                    written += 1
+                except Exception as row_error:
+                    print(f"Error writing row: {str(row_error)}")
+                    with self._lock:
+                        self._counters['errors'] += 1
+
+        with self._lock:
+            self._counters['written'] += written
+            self._counters['batches'] += 1
+            self._counters['last_batch_size'] = len(batch)
+            self._counters['last_commit_ms'] = (time.perf_counter() - started) * 1000
+            seq = batch[-1][0]
+            if seq is not None:
+                self._committed_seq = max(self._committed_seq, seq)
+                self._pending_keys = {
+                    key: key_seq for key, key_seq in self._pending_keys.items() if key_seq > self._committed_seq
+                }
+                self._committed.notify_all()
+
+    def flush(self, timeout=None):
+        """Block until every row submitted before this call has been committed"""
+        with self._lock:
+            target = self._submitted_seq
+            if self._thread is None or not self._thread.is_alive():
+                return self._committed_seq >= target
+            return self._committed.wait_for(lambda: self._committed_seq >= target, timeout)
+
+    def flush_key(self, key, timeout=None):
+        """Block until every row submitted under key before this call has been committed"""
+        with self._lock:
+            target = self._pending_keys.get(key)
+            if target is None:
+                return True
+            if self._thread is None or not self._thread.is_alive():
+                return self._committed_seq >= target
+            return self._committed.wait_for(lambda: self._committed_seq >= target, timeout)
+
+    def close(self, timeout=30):
+        """Flush pending rows (waiting at most timeout seconds) and stop the writer thread"""
+        self.flush(timeout)
+        self._stopping = True
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self):
+        """Return queue depth, batching and backpressure counters"""
+        with self._lock:
+            stats = dict(self._counters)
+        stats['depth'] = self._queue.qsize()
+        stats['max_queue'] = self.max_queue
+        stats['avg_batch_size'] = stats['written'] / stats['batches'] if stats['batches'] else None
+        return stats
@@ -0,0 +1,80 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.add_noise import ColumnStats, add_noise_to_dataset
+
+LABELS = ["Beneficial", "Harmful", "Neutral"]
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """A small training-like CSV: numeric and categorical features and a label column"""
+    rng = np.random.default_rng(0)
+    n_rows = 5000
+    df = pd.DataFrame({
+        "age": rng.integers(18, 50, size=n_rows),
+        "glycemic_index": rng.normal(40, 15, size=n_rows).round(1),
+        "food_category": rng.choice(["Dairy", "Fruits", "Grains", "Vegetables"], size=n_rows),
+        "impact_on_cramps": rng.choice(LABELS, size=n_rows, p=[0.5, 0.2, 0.3])
+    })
+    path = str(tmp_path / "input.csv")
+    df.to_csv(path, index=False)
+    return path, df
+
+
+def test_chunked_stats_match_the_whole_column(dataset):
+    path, df = dataset
+    whole = ColumnStats()
+    whole.update(df)
+    chunked = ColumnStats()
+    for chunk in pd.read_csv(path, chunksize=700):
+        chunked.update(chunk)
+
+    whole_plan, chunked_plan = whole.noise_plan(), chunked.noise_plan()
+    assert list(chunked_plan) == list(whole_plan)
+    for col, params in whole_plan.items():
+        if params[0] == "numeric":
+            assert np.allclose(chunked_plan[col][1:], params[1:])
+        else:
+            assert list(chunked_plan[col][1]) == list(params[1])
+
+
+def test_chunked_output_keeps_rows_columns_and_labels(dataset, tmp_path):
+    path, df = dataset
+
+    # Without noise every chunk is written back unchanged
+    unchanged = str(tmp_path / "unchanged.csv")
+    add_noise_to_dataset(path, unchanged, noise_level=0.0, chunksize=700, rng=np.random.default_rng(1))
+    pd.testing.assert_frame_equal(pd.read_csv(unchanged), df, check_dtype=False)
+
+    # With noise: same rows and columns, and the labels shift just as they do with the whole frame loaded
+    chunked, whole = str(tmp_path / "chunked.csv"), str(tmp_path / "whole.csv")
+    add_noise_to_dataset(path, chunked, noise_level=0.1, chunksize=700, rng=np.random.default_rng(1))
+    add_noise_to_dataset(path, whole, noise_level=0.1, rng=np.random.default_rng(2))
+    out, expected = pd.read_csv(chunked), pd.read_csv(whole)
+    assert len(out) == len(df)
+    assert list(out.columns) == list(df.columns)
+    assert set(out["impact_on_cramps"]) == set(LABELS)
+    shares = out["impact_on_cramps"].value_counts(normalize=True)
+    expected_shares = expected["impact_on_cramps"].value_counts(normalize=True)
+    assert (shares - expected_shares).abs().max() < 0.02
+
+
+def test_output_is_deterministic_for_a_seed(dataset, tmp_path):
+    path, _ = dataset
+
+    def run(name, seed):
+        output = str(tmp_path / name)
+        add_noise_to_dataset(path, output, noise_level=0.1, chunksize=700, rng=np.random.default_rng(seed))
+        with open(output, "rb") as f:
+            return f.read()
+
+    assert run("first.csv", 42) == run("second.csv", 42)
+    assert run("third.csv", 43) != run("first.csv", 42)
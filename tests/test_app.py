@@ -0,0 +1,304 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add the project root to the path for imports
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.mock_llm_server import MockLLMServer
+
+
+@pytest.fixture(scope="module")
+def flask_app(tmp_path_factory):
+    """app.py on a throwaway database and warm cache, with no background model loading"""
+    work_dir = tmp_path_factory.mktemp("app")
+    os.environ["DATABASE_PATH"] = str(work_dir / "test.db")
+    os.environ["WARM_CACHE_PATH"] = str(work_dir / "warm_cache.json")
+    os.environ["PRELOAD_MODEL"] = "0"
+    os.environ["MODEL_WATCH_INTERVAL"] = "0"
+    os.chdir(ROOT)
+
+    import app as flask_app
+    return flask_app
+
+
+@pytest.fixture
+def llm(flask_app):
+    """Healthy and failing mock LLM servers; the app starts on the healthy one"""
+    healthy = MockLLMServer().start()
+    failing = MockLLMServer(error_rate=1.0).start()
+    flask_app.llm_api.base_url = healthy.base_url
+    flask_app.prediction_result_cache.clear()
+    yield healthy, failing
+    healthy.stop()
+    failing.stop()
+
+
+def test_fallback_predictions_are_not_cached(flask_app, llm):
+    healthy, failing = llm
+    client = flask_app.app.test_client()
+    request = {"food_name": "Banana", "quantity": "1 medium"}
+
+    # The LLM is down: /predict answers from the default attributes, twice, without caching them
+    flask_app.llm_api.base_url = failing.base_url
+    for _ in range(2):
+        calls = failing.stats()["requests"]
+        response = client.post("/predict", json=request)
+        assert response.status_code == 200
+        assert response.get_json()["food_data"]["food_category"] == "Unspecified"
+        assert failing.stats()["requests"] > calls
+    assert flask_app.prediction_result_cache.stats()["entries"] == 0
+
+    # Once the LLM is back the real attributes are used, and cached
+    flask_app.llm_api.base_url = healthy.base_url
+    response = client.post("/predict", json=request)
+    assert response.get_json()["food_data"]["food_category"] == "Fruits"
+    assert flask_app.prediction_result_cache.stats()["entries"] == 1
+
+    assert client.post("/predict", json=request).get_json() == response.get_json()
+    assert healthy.stats()["requests"] == 1
+
+
+def stream_events(response):
+    return [json.loads(event[len("data: "):]) for event in response.get_data(as_text=True).split("\n\n") if event]
+
+
+def chat_rows(flask_app, user_id):
+    flask_app.db_writer.flush()
+    with flask_app.db.connection() as conn:
+        return conn.execute('SELECT bot_response FROM chat_history WHERE user_id = ?', (user_id,)).fetchall()
+
+
+def test_interrupted_chat_stream_is_not_saved(flask_app, llm):
+    healthy, _ = llm
+    client = flask_app.app.test_client()
+    with client.session_transaction() as s:
+        s['user_id'] = 1001
+        s['username'] = 'stream-test'
+
+    # The reply breaks off after three words
+    with MockLLMServer(stream_fail_after=3) as broken:
+        flask_app.llm_api.base_url = broken.base_url
+        events = stream_events(client.post("/chat/stream", json={"message": "Is ginger good for cramps?"}))
+    assert [event["token"] for event in events[:3]] == ["Bananas", " are", " a"]
+    assert events[-1]["incomplete"] is True and "error" in events[-1]
+    assert not any(event.get("done") for event in events)
+    assert chat_rows(flask_app, 1001) == []
+
+    flask_app.llm_api.base_url = healthy.base_url
+    events = stream_events(client.post("/chat/stream", json={"message": "Is ginger good for cramps?"}))
+    assert events[-1] == {"done": True}
+    reply = "".join(event["token"] for event in events[:-1])
+    assert chat_rows(flask_app, 1001) == [(reply,)]
+
+
+def test_async_predict_shares_the_result_cache(flask_app, llm):
+    pytest.importorskip("asgiref")
+    healthy, failing = llm
+    client = flask_app.app.test_client()
+
+    # Fallback attributes are not cached by /async/predict either
+    flask_app.llm_api.base_url = failing.base_url
+    response = client.post("/async/predict", json={"food_name": "Mango"})
+    assert response.get_json()["food_data"]["food_category"] == "Unspecified"
+    assert flask_app.prediction_result_cache.stats()["entries"] == 0
+
+    flask_app.llm_api.base_url = healthy.base_url
+    response = client.post("/async/predict", json={"food_name": "Mango"})
+    assert response.get_json()["food_data"]["food_category"] == "Fruits"
+    # Either route answers from the entry the other stored
+    calls = healthy.stats()["requests"]
+    assert client.post("/predict", json={"food_name": "mango"}).get_json()["prediction_results"] == \
+        response.get_json()["prediction_results"]
+    client.post("/predict", json={"food_name": "Papaya"})
+    client.post("/async/predict", json={"food_name": "papaya"})
+    assert healthy.stats()["requests"] == calls + 1
+
+
+def test_batch_looks_up_uncached_foods_concurrently(flask_app, llm):
+    healthy, _ = llm
+    client = flask_app.app.test_client()
+    client.post("/predict", json={"food_name": "Apple"})
+
+    foods = ["Apple"] + [f"Batch food {i}" for i in range(6)]
+    with MockLLMServer(latency=0.3) as slow:
+        flask_app.llm_api.base_url = slow.base_url
+        started = time.perf_counter()
+        results = client.post("/predict/batch", json={"foods": foods}).get_json()["results"]
+        elapsed = time.perf_counter() - started
+        # Apple came from the attribute cache; the other six took one LLM call each, side by side
+        assert slow.stats()["requests"] == 6
+    assert elapsed < 6 * 0.3
+    assert [result["food_data"]["food_name"] for result in results] == foods
+
+
+def add_rows(flask_app, sql, rows):
+    with flask_app.db.connection() as conn:
+        conn.executemany(sql, rows)
+        conn.commit()
+
+
+def read_pages(client, path, limit):
+    """Every item of a paginated endpoint, following next_cursor; also returns the page count"""
+    items, pages, cursor = [], 0, None
+    while True:
+        query = f"?limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        body = client.get(path + query).get_json()
+        items += body["history"]
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+
+# Three rows per second, so most rows share their timestamp with others, some across page boundaries
+TIMESTAMPS = [f"2024-05-01 12:00:{i // 3:02d}" for i in range(20)]
+
+
+def test_history_pages_through_rows_with_equal_timestamps(flask_app):
+    add_rows(flask_app, 'INSERT INTO predictions (food_name, prediction_results, user_id, timestamp) VALUES (?, ?, ?, ?)',
+             [(f"Food {i}", json.dumps({"impact_on_cramps": "moderate"}), 2001, timestamp)
+              for i, timestamp in enumerate(TIMESTAMPS)] + [("Other user", "{}", 2002, TIMESTAMPS[0])])
+    client = flask_app.app.test_client()
+    with client.session_transaction() as s:
+        s['user_id'] = 2001
+
+    items, pages = read_pages(client, "/history", 4)
+    # Newest first; rows with the same timestamp by id, newest first
+    assert [item["food_name"] for item in items] == [f"Food {i}" for i in reversed(range(20))]
+    assert pages == 5
+
+
+def test_chat_history_pages_through_rows_with_equal_timestamps(flask_app):
+    add_rows(flask_app, 'INSERT INTO chat_history (session_id, user_message, bot_response, user_id, timestamp) '
+             'VALUES (?, ?, ?, ?, ?)',
+             [("s", f"Message {i}", "Reply", 2003, timestamp) for i, timestamp in enumerate(TIMESTAMPS)])
+    client = flask_app.app.test_client()
+    with client.session_transaction() as s:
+        s['user_id'] = 2003
+
+    items, pages = read_pages(client, "/chat-history", 3)
+    assert [item["user_message"] for item in items] == [f"Message {i}" for i in reversed(range(20))]
+    assert pages == 7
+
+
+@pytest.mark.parametrize("query", ["cursor=not-a-cursor", "cursor=Zm9v", "limit=0", "limit=-3", "limit=ten"])
+@pytest.mark.parametrize("path", ["/history", "/chat-history"])
+def test_bad_page_parameters_are_rejected(flask_app, path, query):
+    response = flask_app.app.test_client().get(f"{path}?{query}")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_migrations_upgrade_an_existing_database(flask_app, tmp_path, monkeypatch):
+    from storage.database import Database
+
+    database = Database(str(tmp_path / "old.db"), pool_size=1)
+    monkeypatch.setattr(flask_app, "db", database)
+
+    # A database from before the migrations: the original tables, with data, at user_version 0
+    monkeypatch.setattr(flask_app, "MIGRATIONS", [])
+    flask_app.init_db()
+    with database.connection() as conn:
+        conn.execute("INSERT INTO predictions (food_name, user_id) VALUES ('Banana', 1)")
+        conn.commit()
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == 0
+    monkeypatch.undo()
+    monkeypatch.setattr(flask_app, "db", database)
+
+    # Startup applies every migration, and a second startup none
+    flask_app.init_db()
+    flask_app.init_db()
+    assert database.migrate(flask_app.MIGRATIONS) == 0
+    with database.connection() as conn:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == len(flask_app.MIGRATIONS)
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert "idx_predictions_user_timestamp" in indexes
+        assert conn.execute('SELECT COUNT(*) FROM prediction_corrections').fetchone()[0] == 0
+        assert conn.execute('SELECT food_name FROM predictions').fetchall() == [("Banana",)]
+    database.close()
+
+
+def test_unchanged_notification_polls_get_304(flask_app):
+    client = flask_app.app.test_client()
+    first = client.get("/get-active-notification")
+    assert first.status_code == 200 and first.headers["ETag"]
+
+    # A poller sending the ETag back gets an empty 304 while the notification is unchanged
+    unchanged = client.get("/get-active-notification", headers={"If-None-Match": first.headers["ETag"]})
+    assert unchanged.status_code == 304 and unchanged.get_data() == b""
+    assert unchanged.headers["ETag"] == first.headers["ETag"]
+
+    # A new notification invalidates the cache, so the same poll gets the new body and ETag
+    with client.session_transaction() as s:
+        s['user_id'] = 1
+        s['username'] = 'Garuda'
+    assert client.post("/admin/set-notification", json={"message": "Maintenance at noon"}).status_code == 200
+    changed = client.get("/get-active-notification", headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.get_json()["notification"]["message"] == "Maintenance at noon"
+    assert changed.headers["ETag"] != first.headers["ETag"]
+
+
+def test_ready_reports_a_single_background_load(flask_app, monkeypatch):
+    release = threading.Event()
+    loads = []
+
+    class SlowPredictor:
+        def __init__(self, mmap=True):
+            loads.append(mmap)
+            release.wait(5)
+            self.model_version = "slow-model"
+            self.using_fallback = False
+
+    monkeypatch.setattr(flask_app, "Predictor", SlowPredictor)
+    monkeypatch.setattr(flask_app, "predictor", None)
+    monkeypatch.setattr(flask_app, "predictor_status", {'state': 'not_loaded', 'error': None, 'load_seconds': None})
+    client = flask_app.app.test_client()
+    assert client.get("/ready").status_code == 503
+
+    # The preload and requests arriving while it runs share one load
+    threads = [threading.Thread(target=flask_app.get_predictor) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while not loads:
+        time.sleep(0.01)
+    response = client.get("/ready")
+    assert response.status_code == 503 and response.get_json()["state"] == "loading"
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.get_json()["ready"] is True and response.get_json()["model_version"] == "slow-model"
+
+
+def test_result_cache_follows_a_model_swap(flask_app, llm, tmp_path, monkeypatch):
+    from tests.test_predict import write_artifacts
+
+    healthy, _ = llm
+    client = flask_app.app.test_client()
+    monkeypatch.setattr(flask_app, "predictor", flask_app.get_predictor())
+    old_version = flask_app.predictor.model_version
+    client.post("/predict", json={"food_name": "Kiwi"})
+    assert flask_app.prediction_result_cache.stats()['model_version'] == old_version
+
+    # A new model is published: the app swaps it in and stops serving the old model's results
+    write_artifacts(str(tmp_path))
+    monkeypatch.setattr(flask_app, "current_artifact_dir", lambda: str(tmp_path))
+    new_version = flask_app.reload_predictor()
+    assert new_version is not None and new_version != old_version
+    resets = flask_app.prediction_result_cache.stats()['version_resets']
+    response = client.post("/predict", json={"food_name": "Kiwi"})
+    assert response.status_code == 200
+    stats = flask_app.prediction_result_cache.stats()
+    assert stats['version_resets'] == resets + 1 and stats['model_version'] == new_version
+    # Only the prediction was redone; the food's attributes came from the attribute cache
+    assert healthy.stats()["requests"] == 1
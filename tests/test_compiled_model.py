@@ -0,0 +1,92 @@
+"""
+The compiled engine must predict exactly what sklearn predicts
+
+Features are mostly small integers (like label-encoded categories), so many
+split thresholds sit exactly on a training value.
+"""
+
+import os
+import sys
+import warnings
+
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.svm import SVC
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.compiled_model import CompiledModel
+
+FEATURES = ["food_category", "processing_level", "glycemic_index", "calories_kcal", "inflammatory_index"]
+TARGETS = ["impact_on_cramps", "impact_on_bloating"]
+
+ESTIMATORS = {
+    "logistic": lambda: LogisticRegression(max_iter=1000),
+    "sgd": lambda: SGDClassifier(loss="log_loss", random_state=0),
+    "random_forest": lambda: RandomForestClassifier(n_estimators=30, random_state=0),
+    "extra_trees": lambda: ExtraTreesClassifier(n_estimators=30, random_state=0),
+    "gradient_boosting": lambda: GradientBoostingClassifier(n_estimators=30, random_state=0),
+    "svc": lambda: SVC(random_state=0)
+}
+
+
+def make_rows(rng, n_rows):
+    return np.column_stack([
+        rng.integers(0, 12, size=n_rows),
+        rng.integers(0, 4, size=n_rows),
+        rng.integers(10, 100, size=n_rows),
+        rng.normal(150, 60, size=n_rows).round(1),
+        rng.integers(-3, 4, size=n_rows)
+    ]).astype(np.float64)
+
+
+def make_labels(rng, X):
+    # A three-class and a two-class target, both learnable but noisy
+    three = np.where(X[:, 2] + 5 * X[:, 4] > 55, "Harmful", np.where(X[:, 0] % 3 == 0, "Beneficial", "moderate"))
+    two = np.where(X[:, 3] + 20 * X[:, 1] > 180, "Harmful", "Beneficial")
+    flip = rng.random(len(X)) < 0.1
+    three = np.where(flip, "moderate", three)
+    return np.column_stack([three, two])
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X_train = make_rows(rng, 1500)
+    labels = make_labels(rng, X_train)
+    target_encoders = {col: LabelEncoder().fit(labels[:, j]) for j, col in enumerate(TARGETS)}
+    y_train = np.column_stack([target_encoders[col].transform(labels[:, j]) for j, col in enumerate(TARGETS)])
+    scaler = StandardScaler().fit(X_train)
+    # Test rows reuse training values, which is where threshold rounding goes wrong
+    X_test = np.vstack([X_train[:500], make_rows(rng, 1500)])
+    return X_train, y_train, X_test, scaler, target_encoders
+
+
+@pytest.mark.parametrize("name", sorted(ESTIMATORS))
+def test_engine_matches_sklearn(name, data, tmp_path):
+    X_train, y_train, X_test, scaler, target_encoders = data
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model = MultiOutputClassifier(ESTIMATORS[name]()).fit(scaler.transform(X_train), y_train)
+
+    engine = CompiledModel.from_artifacts(model, scaler, {}, target_encoders, FEATURES, TARGETS)
+    assert "sklearn" not in engine.kinds
+
+    predicted = model.predict(scaler.transform(X_test))
+    expected = [
+        dict(zip(TARGETS, (target_encoders[col].classes_[predicted[i, j]] for j, col in enumerate(TARGETS))))
+        for i in range(len(X_test))
+    ]
+    assert engine.predict_encoded(X_test) == expected
+    # One row at a time takes the same code path as Predictor.predict
+    assert [engine.predict_encoded(X_test[i:i + 1])[0] for i in range(0, len(X_test), 50)] == expected[::50]
+
+    # The memory-mapped format predicts the same
+    engine.save(str(tmp_path / "mmap"))
+    loaded, _ = CompiledModel.load(str(tmp_path / "mmap"))
+    assert loaded.predict_encoded(X_test) == expected
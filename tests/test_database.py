@@ -0,0 +1,78 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.database import Database
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = Database(str(tmp_path / "test.db"), pool_size=2)
+    with database.connection() as conn:
+        conn.execute('CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, value INTEGER)')
+    yield database
+    database.close()
+
+
+def count(database):
+    with database.connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM events').fetchone()[0]
+
+
+def test_connections_are_reused_in_wal_mode(database):
+    for i in range(5):
+        with database.connection() as conn:
+            conn.execute('INSERT INTO events (value) VALUES (?)', (i,))
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    stats = database.stats()
+    assert stats['connections_opened'] == 1 and stats['connections_reused'] >= 5
+    assert stats['idle_connections'] == 1
+
+
+def test_block_commits_or_rolls_back(database):
+    with database.connection() as conn:
+        conn.execute('INSERT INTO events (value) VALUES (1)')
+    with pytest.raises(RuntimeError):
+        with database.connection() as conn:
+            conn.execute('INSERT INTO events (value) VALUES (2)')
+            raise RuntimeError("request failed")
+    assert count(database) == 1
+    assert database.stats()['rollbacks'] == 1
+
+
+def test_nested_blocks_share_the_outer_transaction(database):
+    with pytest.raises(RuntimeError):
+        with database.connection() as outer:
+            outer.execute('INSERT INTO events (value) VALUES (1)')
+            with database.connection() as inner:
+                assert inner is outer
+                inner.execute('INSERT INTO events (value) VALUES (2)')
+            raise RuntimeError("request failed")
+    # The inner block did not commit on its own
+    assert count(database) == 0
+
+
+def test_threads_get_their_own_connections(database):
+    barrier = threading.Barrier(4)
+    seen = []
+
+    def write(value):
+        with database.connection() as conn:
+            seen.append(id(conn))
+            barrier.wait(timeout=5)
+            conn.execute('INSERT INTO events (value) VALUES (?)', (value,))
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(seen)) == 4 and count(database) == 4
+    # Only pool_size connections are kept once the threads are done
+    assert database.stats()['idle_connections'] == 2
+
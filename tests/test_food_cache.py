@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.food_cache import FoodAttributeCache
+from storage.database import Database
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = Database(str(tmp_path / "test.db"), pool_size=2)
+    yield database
+    database.close()
+
+
+def test_least_recently_used_foods_are_evicted_from_memory(database):
+    cache = FoodAttributeCache(database, max_entries=2)
+    cache.set("Banana", {"food_category": "Fruits"})
+    cache.set("Kale", {"food_category": "Vegetables"})
+    # Reading Banana makes Kale the least recently used
+    assert cache.get("  banana ") == {"food_category": "Fruits"}
+    cache.set("Salmon", {"food_category": "Proteins"})
+
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['memory_entries'] == 2
+    assert cache.get("Banana") is not None and cache.get("Salmon") is not None
+    assert cache.stats()['disk_hits'] == 0
+
+    # Evicted from memory only: the next lookup comes from SQLite and is kept in memory again
+    assert cache.get("Kale") == {"food_category": "Vegetables"}
+    assert cache.get("Kale") == {"food_category": "Vegetables"}
+    stats = cache.stats()
+    assert stats['disk_hits'] == 1 and stats['memory_hits'] == 4 and stats['misses'] == 0
+
+
+def test_attributes_survive_a_restart_until_their_ttl(database):
+    FoodAttributeCache(database).set("Banana", {"food_category": "Fruits"})
+
+    restarted = FoodAttributeCache(database)
+    assert restarted.get("BANANA") == {"food_category": "Fruits"}
+    assert restarted.stats()['disk_hits'] == 1
+
+    expired = FoodAttributeCache(database, ttl=0)
+    assert expired.get("Banana") is None
+    assert expired.stats()['expirations'] == 1
+    # The expired row was deleted
+    assert FoodAttributeCache(database).get("Banana") is None
+
+
+def test_returned_attributes_are_copies(database):
+    cache = FoodAttributeCache(database)
+    cache.set("Banana", {"food_category": "Fruits"})
+    cache.get("Banana")["food_category"] = "Changed by a caller"
+    assert cache.get("Banana") == {"food_category": "Fruits"}
@@ -0,0 +1,71 @@
+import os
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.http_pool import SessionPool
+from benchmarks.mock_llm_server import MockLLMServer
+
+
+def post(pool, server):
+    return pool.post(f"{server.base_url}/chat/completions", json={"messages": []})
+
+
+def test_sequential_requests_reuse_one_session():
+    pool = SessionPool(pool_size=4)
+    with MockLLMServer() as server:
+        for _ in range(5):
+            assert post(pool, server).status_code == 200
+    stats = pool.stats()
+    assert stats['requests'] == 5
+    assert stats['sessions_created'] == 1 and stats['sessions_reused'] == 4
+    assert stats['idle_sessions'] == 1
+    pool.close()
+
+
+def test_pool_size_bounds_concurrent_requests():
+    pool = SessionPool(pool_size=2, pool_timeout=0.1)
+    with MockLLMServer(latency=0.5) as server:
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(post, pool, server) for _ in range(3)]
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result().status_code)
+            except requests.exceptions.ConnectTimeout:
+                outcomes.append("timeout")
+    # Two requests got a session; the third gave up after pool_timeout instead of opening a third connection
+    assert sorted(outcomes, key=str) == [200, 200, "timeout"]
+    stats = pool.stats()
+    assert stats['sessions_created'] == 2
+    assert stats['pool_waits'] == 1 and stats['pool_timeouts'] == 1
+    pool.close()
+
+
+def closed_port_url():
+    """URL of a local port nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/openai/v1/chat/completions"
+
+
+def test_failed_sessions_are_not_returned_to_the_pool():
+    pool = SessionPool(pool_size=2, connect_timeout=1)
+    with MockLLMServer() as server:
+        assert post(pool, server).status_code == 200
+
+        # The request fails and its session is closed instead of reused
+        with pytest.raises(requests.exceptions.ConnectionError):
+            pool.post(closed_port_url(), json={"messages": []})
+        assert pool.stats()['idle_sessions'] == 0
+
+        assert post(pool, server).status_code == 200
+    assert pool.stats()['sessions_created'] == 2
+    pool.close()
@@ -0,0 +1,173 @@
+import json
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.dummy import DummyClassifier
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.incremental import HOLDOUT_FRACTION, UpdateRejected, update_model
+from models.predict import CURRENT_FILE, ONLINE_STATE_FILE, TARGET_COLUMNS, artifact_version, current_artifact_dir
+from storage.database import Database
+
+CATEGORIES = ["Dairy", "Fruits", "Grains", "Meat", "Sweets", "Vegetables"]
+FEATURE_COLUMNS = ["food_category", "glycemic_index", "calories_kcal"]
+
+
+def make_foods(rng, n_rows):
+    return pd.DataFrame({
+        "food_category": rng.choice(CATEGORIES, size=n_rows),
+        "glycemic_index": rng.integers(10, 100, size=n_rows),
+        "calories_kcal": rng.integers(20, 400, size=n_rows)
+    })
+
+
+def true_labels(foods):
+    # Higher glycemic index and calories are worse, shifted a little per target
+    score = foods["glycemic_index"].to_numpy() + foods["calories_kcal"].to_numpy() / 8
+    return pd.DataFrame({
+        col: np.where(score > 90 + 5 * j, "Harmful", np.where(score < 60 + 5 * j, "Beneficial", "moderate"))
+        for j, col in enumerate(TARGET_COLUMNS)
+    })
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Training CSV, live model artifacts, and corrections and predictions tables in tmp_path"""
+    # The encoded data cache goes to a relative directory
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(0)
+    foods = make_foods(rng, 1500)
+    pd.concat([foods, true_labels(foods)], axis=1).to_csv("training.csv", index=False)
+
+    database = Database(str(tmp_path / "test.db"), pool_size=1)
+    with database.connection() as conn:
+        conn.execute(
+            'CREATE TABLE prediction_corrections (id INTEGER PRIMARY KEY AUTOINCREMENT, prediction_id INTEGER NULL, '
+            'food_name TEXT, food_data TEXT, corrected_results TEXT)'
+        )
+        conn.execute(
+            'CREATE TABLE predictions (id INTEGER PRIMARY KEY AUTOINCREMENT, food_name TEXT, food_data TEXT, '
+            'prediction_results TEXT, is_default INTEGER NOT NULL DEFAULT 0)'
+        )
+    yield tmp_path, foods, database
+    database.close()
+
+
+def write_live_model(root, foods, estimator):
+    category_encoder = LabelEncoder().fit(CATEGORIES)
+    X = foods[FEATURE_COLUMNS].copy()
+    X["food_category"] = category_encoder.transform(X["food_category"])
+    X = X.to_numpy(dtype=np.float64)
+    labels = true_labels(foods)
+    target_encoders = {col: LabelEncoder().fit(labels[col]) for col in TARGET_COLUMNS}
+    y = np.column_stack([target_encoders[col].transform(labels[col]) for col in TARGET_COLUMNS])
+    scaler = StandardScaler().fit(X)
+    model = MultiOutputClassifier(estimator).fit(scaler.transform(X), y)
+
+    os.makedirs(root)
+    joblib.dump(model, os.path.join(root, "best_model.pkl"))
+    joblib.dump(scaler, os.path.join(root, "scaler.pkl"))
+    joblib.dump({"food_category": category_encoder}, os.path.join(root, "label_encoders.pkl"))
+    joblib.dump(target_encoders, os.path.join(root, "target_encoders.pkl"))
+    with open(os.path.join(root, "feature_columns.txt"), "w") as f:
+        f.write(",".join(FEATURE_COLUMNS))
+
+
+def add_corrections(database, foods, labels, prediction_ids=None):
+    if prediction_ids is None:
+        prediction_ids = [None] * len(foods)
+    with database.connection() as conn:
+        conn.executemany(
+            'INSERT INTO prediction_corrections (prediction_id, food_name, food_data, corrected_results) '
+            'VALUES (?, ?, ?, ?)',
+            [
+                (prediction_id, f"Food {i}", json.dumps(food), json.dumps(row_labels))
+                for i, (prediction_id, food, row_labels) in enumerate(
+                    zip(prediction_ids, foods.to_dict("records"), labels.to_dict("records"))
+                )
+            ]
+        )
+        conn.commit()
+
+
+def add_predictions(database, foods, labels, is_default=False):
+    """Log predictions as the app does; returns their ids"""
+    with database.connection() as conn:
+        ids = []
+        for i, (food, row_labels) in enumerate(zip(foods.to_dict("records"), labels.to_dict("records"))):
+            cursor = conn.execute(
+                'INSERT INTO predictions (food_name, food_data, prediction_results, is_default) VALUES (?, ?, ?, ?)',
+                (f"Food {i}", json.dumps(food), json.dumps(row_labels), int(is_default))
+            )
+            ids.append(cursor.lastrowid)
+        conn.commit()
+    return ids
+
+
+def all_harmful(foods):
+    return pd.DataFrame({col: ["Harmful"] * len(foods) for col in TARGET_COLUMNS})
+
+
+def test_update_worse_than_live_model_is_not_published(workspace):
+    tmp_path, foods, database = workspace
+    root = str(tmp_path / "trained_models")
+    write_live_model(root, foods, RandomForestClassifier(n_estimators=30, random_state=0))
+    live_version = artifact_version(root)
+
+    # Wrong corrections: every food labeled Harmful for every symptom
+    corrected = make_foods(np.random.default_rng(1), 400)
+    add_corrections(database, corrected, all_harmful(corrected))
+
+    with pytest.raises(UpdateRejected) as rejected:
+        update_model(database, root=root, csv_path="training.csv", epochs=5)
+    assert rejected.value.candidate_accuracy < rejected.value.live_accuracy
+    assert not os.path.exists(os.path.join(root, CURRENT_FILE))
+    assert artifact_version(current_artifact_dir(root)) == live_version
+
+
+def test_update_better_than_live_model_is_published(workspace):
+    tmp_path, foods, database = workspace
+    root = str(tmp_path / "trained_models")
+    write_live_model(root, foods, DummyClassifier(strategy="most_frequent"))
+
+    corrected = make_foods(np.random.default_rng(1), 200)
+    add_corrections(database, corrected, true_labels(corrected))
+
+    version = update_model(database, root=root, csv_path="training.csv")
+    assert version is not None
+    assert current_artifact_dir(root) == os.path.join(root, "versions", version)
+
+    # The next update continues from the published online model and reads only new rows
+    assert update_model(database, root=root, csv_path="training.csv") is None
+
+
+def test_update_skips_fallback_and_corrected_predictions(workspace):
+    tmp_path, foods, database = workspace
+    root = str(tmp_path / "trained_models")
+    write_live_model(root, foods, DummyClassifier(strategy="most_frequent"))
+
+    # Served from real attributes, and served from the defaults after failed lookups, with wrong labels
+    served = make_foods(np.random.default_rng(1), 200)
+    add_predictions(database, served, true_labels(served))
+    add_predictions(database, make_foods(np.random.default_rng(2), 300), all_harmful(served), is_default=True)
+    # Wrong predictions an admin corrected: learned once, from the correction
+    corrected = make_foods(np.random.default_rng(3), 50)
+    prediction_ids = add_predictions(database, corrected, all_harmful(corrected))
+    add_corrections(database, corrected, true_labels(corrected), prediction_ids)
+
+    version = update_model(database, root=root, csv_path="training.csv", include_predictions=True)
+    assert version is not None
+    with open(os.path.join(root, "versions", version, ONLINE_STATE_FILE)) as f:
+        state = json.load(f)
+    # The bootstrap rows of the CSV, then the 200 served predictions and the 50 corrections only
+    bootstrap_rows = len(foods) - round(len(foods) * HOLDOUT_FRACTION)
+    assert state["rows_seen"] == bootstrap_rows + len(served) + len(corrected)
@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pytest
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.database import Database
+from storage.notification_cache import NotificationCache
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = Database(str(tmp_path / "test.db"), pool_size=2)
+    with database.connection() as conn:
+        conn.execute(
+            'CREATE TABLE notifications (id INTEGER PRIMARY KEY AUTOINCREMENT, message TEXT NOT NULL, '
+            'is_active BOOLEAN DEFAULT TRUE, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)'
+        )
+    yield database
+    database.close()
+
+
+def set_notification(database, message):
+    with database.connection() as conn:
+        conn.execute('UPDATE notifications SET is_active = FALSE')
+        conn.execute('INSERT INTO notifications (message) VALUES (?)', (message,))
+
+
+def test_polls_are_answered_from_memory_until_invalidated(database):
+    cache = NotificationCache(database, ttl=60)
+    assert cache.get()[0] is None
+    set_notification(database, "Maintenance at noon")
+
+    # Still the cached answer: only invalidate() or the ttl makes it reload
+    assert cache.get()[0] is None
+    cache.invalidate()
+    notification, etag = cache.get()
+    assert notification["message"] == "Maintenance at noon"
+    assert cache.get() == (notification, etag)
+    stats = cache.stats()
+    assert stats['loads'] == 2 and stats['hits'] == 2 and stats['invalidations'] == 1
+
+
+def test_etag_follows_the_content(database):
+    set_notification(database, "Maintenance at noon")
+    etag = NotificationCache(database).get()[1]
+    # Every process computes the same ETag for the same notification
+    assert NotificationCache(database).get()[1] == etag
+
+    set_notification(database, "Maintenance moved to 2pm")
+    assert NotificationCache(database).get()[1] != etag
+
+
+def test_expired_entries_are_reloaded(database):
+    cache = NotificationCache(database, ttl=0)
+    cache.get()
+    set_notification(database, "Maintenance at noon")
+    assert cache.get()[0]["message"] == "Maintenance at noon"
+    assert cache.stats()['loads'] == 2
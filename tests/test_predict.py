@@ -0,0 +1,104 @@
+import os
+import sys
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models.predict
+from models.predict import COMPACT_MODEL_FILE, TARGET_COLUMNS, Predictor, artifact_version, export_mmap_engine, \
+    publish_artifacts
+
+CATEGORIES = ["Dairy", "Fruits", "Grains", "Meat", "Sweets", "Vegetables"]
+FEATURE_COLUMNS = ["food_category", "glycemic_index", "calories_kcal"]
+LABELS = ["Beneficial", "Harmful", "moderate"]
+
+
+def write_artifacts(artifact_dir, seed=0):
+    """A small random forest artifact set like train_models.py writes"""
+    rng = np.random.default_rng(seed)
+    n_rows = 600
+    category_encoder = LabelEncoder().fit(CATEGORIES)
+    X = np.column_stack([
+        rng.integers(0, len(CATEGORIES), size=n_rows),
+        rng.integers(10, 100, size=n_rows),
+        rng.integers(20, 400, size=n_rows)
+    ]).astype(np.float64)
+    target_encoders = {col: LabelEncoder().fit(LABELS) for col in TARGET_COLUMNS}
+    y = np.column_stack([
+        (X[:, 0] + X[:, 1] // (10 + j) + rng.integers(0, 2, size=n_rows)).astype(int) % len(LABELS)
+        for j in range(len(TARGET_COLUMNS))
+    ])
+    scaler = StandardScaler().fit(X)
+    model = MultiOutputClassifier(RandomForestClassifier(n_estimators=20, random_state=0)).fit(scaler.transform(X), y)
+
+    joblib.dump(model, os.path.join(artifact_dir, "best_model.pkl"))
+    joblib.dump(scaler, os.path.join(artifact_dir, "scaler.pkl"))
+    joblib.dump({"food_category": category_encoder}, os.path.join(artifact_dir, "label_encoders.pkl"))
+    joblib.dump(target_encoders, os.path.join(artifact_dir, "target_encoders.pkl"))
+    with open(os.path.join(artifact_dir, "feature_columns.txt"), "w") as f:
+        f.write(",".join(FEATURE_COLUMNS))
+
+
+def make_foods(n_items, seed=1):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "food_category": CATEGORIES[rng.integers(0, len(CATEGORIES))],
+            "glycemic_index": int(rng.integers(10, 100)),
+            "calories_kcal": int(rng.integers(20, 400))
+        }
+        for _ in range(n_items)
+    ]
+
+
+def test_batch_paths_match_single_predictions(tmp_path):
+    write_artifacts(str(tmp_path))
+    export_mmap_engine(str(tmp_path))
+    foods = make_foods(200)
+
+    sklearn_predictor = Predictor(compiled=False, artifact_dir=str(tmp_path), mmap=False)
+    expected = [sklearn_predictor.predict(food) for food in foods]
+
+    predictor = Predictor(artifact_dir=str(tmp_path))
+    assert predictor.engine is not None and not hasattr(predictor, "model")
+    assert [predictor.predict(food) for food in foods] == expected
+
+    # Small batches run on the tree engine
+    assert predictor.predict_batch(foods[:10]) == expected[:10]
+    assert not hasattr(predictor, "model")
+
+    # Large ones load the pickled model behind the memory-mapped engine and let sklearn predict
+    assert predictor.predict_batch(foods) == expected
+    assert hasattr(predictor, "model")
+
+
+def test_compact_and_full_predictors_have_their_own_versions(tmp_path, monkeypatch):
+    source = str(tmp_path / "trained")
+    os.makedirs(source)
+    write_artifacts(source)
+    # A compact model that predicts differently from best_model.pkl
+    write_artifacts(str(tmp_path), seed=1)
+    os.replace(str(tmp_path / "best_model.pkl"), os.path.join(source, COMPACT_MODEL_FILE))
+
+    unpublished = Predictor(artifact_dir=source, mmap=False).model_version
+    assert unpublished != Predictor(artifact_dir=source, mmap=False, compact=False).model_version
+
+    root = str(tmp_path / "root")
+    version = publish_artifacts(source, root)
+    version_dir = os.path.join(root, "versions", version)
+
+    # Published versions are read from version.json, not hashed again
+    def no_hashing(*args):
+        raise AssertionError("hashed the artifacts")
+    monkeypatch.setattr(models.predict, "hash_artifacts", no_hashing)
+    compact = Predictor(artifact_dir=version_dir)
+    full = Predictor(artifact_dir=version_dir, mmap=False, compact=False)
+    assert compact.engine is not None and not hasattr(compact, "model")
+    assert compact.model_version == artifact_version(version_dir) == unpublished
+    assert full.model_version == artifact_version(version_dir, compact=False) != compact.model_version
@@ -0,0 +1,56 @@
+import os
+import sys
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.result_cache import PredictionResultCache, result_cache_key
+
+
+def entry(size):
+    return {'body': b"x" * size, 'food_data': None}
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = PredictionResultCache(max_bytes=1000)
+    cache.set("banana", "v1", entry(400))
+    cache.set("kale", "v1", entry(400))
+    # Reading banana makes kale the least recently used
+    assert cache.get("banana", "v1") is not None
+    cache.set("salmon", "v1", entry(400))
+
+    assert cache.get("kale", "v1") is None
+    assert cache.get("banana", "v1") is not None and cache.get("salmon", "v1") is not None
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['entries'] == 2 and stats['bytes'] == 800
+
+    # Replacing an entry counts only its new size, and entries over the limit are not cached
+    cache.set("banana", "v1", entry(100))
+    assert cache.stats()['bytes'] == 500
+    cache.set("huge", "v1", entry(1001))
+    assert cache.get("huge", "v1") is None and cache.stats()['bytes'] == 500
+
+
+def test_a_new_model_version_empties_the_cache():
+    cache = PredictionResultCache()
+    cache.set("banana", "v1", entry(10))
+    assert cache.get("banana", "v1") is not None
+
+    # Results of the old model are never served for the new one, or after switching back
+    assert cache.get("banana", "v2") is None
+    assert cache.get("banana", "v1") is None
+    stats = cache.stats()
+    assert stats['version_resets'] == 2 and stats['entries'] == 0 and stats['model_version'] == "v1"
+
+
+def test_expired_entries_are_misses():
+    cache = PredictionResultCache(ttl=0)
+    cache.set("banana", "v1", entry(10))
+    assert cache.get("banana", "v1") is None
+    stats = cache.stats()
+    assert stats['expirations'] == 1 and stats['bytes'] == 0
+
+
+def test_keys_ignore_case_and_spacing():
+    assert result_cache_key("  Green  Apple ", "1 Medium") == result_cache_key("green apple", "1 medium")
+    assert result_cache_key("Apple", "1 medium") != result_cache_key("Apple", "2 medium")
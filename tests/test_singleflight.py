@@ -0,0 +1,68 @@
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.singleflight import SingleFlight
+
+
+def run_concurrently(flight, key, fn, callers, release):
+    """Call flight.do(key, fn) from several threads at once; fn waits on release, set once all have arrived"""
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        futures = [executor.submit(flight.do, key, fn) for _ in range(callers)]
+        # Every caller but the leader is waiting on the leader's call
+        deadline = time.monotonic() + 5
+        while flight.stats()['coalesced'] < callers - 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        return futures
+
+
+def test_concurrent_identical_calls_run_once():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def lookup():
+        calls.append(1)
+        release.wait(5)
+        return {"food_category": "Fruits"}
+
+    futures = run_concurrently(flight, "banana", lookup, 8, release)
+    results = [future.result() for future in futures]
+    assert len(calls) == 1
+    assert all(result == {"food_category": "Fruits"} for result, _ in results)
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+
+    stats = flight.stats()
+    assert stats['executions'] == 1 and stats['coalesced'] == 7 and stats['max_waiters'] == 7
+    assert stats['in_flight'] == 0
+
+
+def test_waiters_get_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing_lookup():
+        release.wait(5)
+        raise TimeoutError("LLM timed out")
+
+    futures = run_concurrently(flight, "banana", failing_lookup, 4, release)
+    for future in futures:
+        with pytest.raises(TimeoutError):
+            future.result()
+    assert flight.stats()['errors'] == 1
+
+
+def test_later_and_different_calls_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do("banana", lambda: 1) == (1, False)
+    assert flight.do("banana", lambda: 2) == (2, False)
+    assert flight.do("kiwi", lambda: 3) == (3, False)
+    assert flight.stats()['executions'] == 3 and flight.stats()['coalesced'] == 0
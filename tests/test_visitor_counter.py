@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.database import Database
+from storage.visitor_counter import VisitorCounter
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = Database(str(tmp_path / "test.db"), pool_size=2)
+    with database.connection() as conn:
+        conn.execute('CREATE TABLE visitor_stats (id INTEGER PRIMARY KEY AUTOINCREMENT, visit_count INTEGER DEFAULT 0)')
+        conn.execute('INSERT INTO visitor_stats (visit_count) VALUES (100)')
+    yield database
+    database.close()
+
+
+def stored_count(database):
+    with database.connection() as conn:
+        return conn.execute('SELECT visit_count FROM visitor_stats WHERE id = 1').fetchone()[0]
+
+
+def test_visits_are_written_on_flush_and_close(database):
+    counter = VisitorCounter(database, flush_interval=60)
+    for _ in range(3):
+        counter.increment()
+    # Counted in memory only; reading the value does not count as a visit
+    assert counter.value() == 103 and counter.value() == 103
+    assert stored_count(database) == 103
+    assert counter.stats()['pending'] == 0
+
+    counter.increment()
+    counter.increment()
+    assert counter.stats()['pending'] == 2 and stored_count(database) == 103
+    counter.close()
+    assert stored_count(database) == 105
+
+    # A restarted process continues from the stored count
+    restarted = VisitorCounter(database)
+    assert restarted.value() == 105
+    restarted.close()
+
+
+def test_background_thread_flushes_periodically(database):
+    counter = VisitorCounter(database, flush_interval=0.05)
+    for _ in range(10):
+        counter.increment()
+    deadline = time.monotonic() + 5
+    while stored_count(database) < 110 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert stored_count(database) == 110
+    counter.close()
+
+
+def test_processes_sharing_the_table_add_their_own_visits(database):
+    first, second = VisitorCounter(database, flush_interval=60), VisitorCounter(database, flush_interval=60)
+    for _ in range(4):
+        first.increment()
+    for _ in range(6):
+        second.increment()
+    first.flush()
+    second.flush()
+    first.flush()
+    assert stored_count(database) == 110
+    assert first.value() == second.value() == 110
+    first.close()
+    second.close()
+    assert stored_count(database) == 110
@@ -0,0 +1,42 @@
+import json
+import os
+import sys
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.food_cache import FoodAttributeCache
+from api.llm_service import GroqAPI
+from api.warm_cache import WarmCache, build_snapshot
+from benchmarks.mock_llm_server import FOOD_ATTRIBUTES, MockLLMServer
+from models.predict import Predictor
+from storage.database import Database
+
+
+def test_failed_lookups_are_left_out(tmp_path):
+    database = Database(str(tmp_path / "test.db"), pool_size=1)
+    with database.connection() as conn:
+        conn.execute('CREATE TABLE predictions (id INTEGER PRIMARY KEY AUTOINCREMENT, food_name TEXT)')
+        conn.executemany('INSERT INTO predictions (food_name) VALUES (?)', [("Banana",), ("Banana",), ("Kiwi",)])
+        conn.commit()
+
+    # Banana is in the attribute cache; the LLM is down, so the Kiwi lookup falls back to the defaults
+    attribute_cache = FoodAttributeCache(database)
+    attribute_cache.set("Banana", dict(FOOD_ATTRIBUTES))
+    llm_api = GroqAPI(attribute_cache=attribute_cache)
+    predictor = Predictor(artifact_dir=str(tmp_path / "no_model"))
+    path = str(tmp_path / "warm_cache.json")
+    with MockLLMServer(error_rate=1.0) as server:
+        llm_api.base_url = server.base_url
+        assert build_snapshot(database, llm_api, predictor, path=path) == 1
+
+    with open(path) as f:
+        snapshot = json.load(f)
+    assert list(snapshot["foods"]) == ["banana"]
+    assert snapshot["failed_lookups"] == 1
+
+    warm_cache = WarmCache(path)
+    warm_cache.load(predictor.model_version)
+    assert warm_cache.get("Kiwi") is None
+    assert warm_cache.stats()["failed_lookups"] == 1
+    database.close()
@@ -0,0 +1,104 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add the project root to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.database import Database
+from storage.write_behind import WriteBehindQueue
+
+INSERT = 'INSERT INTO events (value) VALUES (?)'
+
+
+class StalledQueue(WriteBehindQueue):
+    """Writer thread that waits for release before committing anything"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = threading.Event()
+
+    def _write(self, batch):
+        if threading.current_thread() is self._thread:
+            self.release.wait()
+        super()._write(batch)
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = Database(str(tmp_path / "test.db"), pool_size=2)
+    with database.connection() as conn:
+        conn.execute('CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, value INTEGER)')
+    yield database
+    database.close()
+
+
+def values(database):
+    with database.connection() as conn:
+        return [row[0] for row in conn.execute('SELECT value FROM events ORDER BY id')]
+
+
+def test_rows_are_batched_into_group_commits(database):
+    writer = WriteBehindQueue(database, linger=0.05)
+    writer.submit_many(INSERT, [(i,) for i in range(200)])
+    assert writer.flush(timeout=5)
+    assert values(database) == list(range(200))
+    stats = writer.stats()
+    assert stats['written'] == 200 and stats['sync_writes'] == 0
+    assert stats['batches'] < 20
+    writer.close()
+
+
+def test_flush_waits_for_rows_submitted_before_it(database):
+    writer = WriteBehindQueue(database, linger=0.02)
+    for i in range(50):
+        writer.submit(INSERT, (i,))
+        if i % 10 == 9:
+            # Everything submitted so far is committed, in submission order
+            assert writer.flush(timeout=5)
+            assert values(database) == list(range(i + 1))
+    writer.close()
+
+
+def test_full_queue_falls_back_to_writing_on_the_caller_thread(database):
+    writer = StalledQueue(database, max_queue=2, put_timeout=0.01)
+    writer.submit_many(INSERT, [(i,) for i in range(10)])
+
+    # The stalled writer holds a batch and the queue two rows; the rest were written synchronously
+    stats = writer.stats()
+    assert 0 < stats['sync_writes'] <= stats['full_waits']
+    assert len(values(database)) == stats['sync_writes']
+    assert stats['submitted'] + stats['sync_writes'] == 10
+    assert not writer.flush(timeout=0.05)
+
+    writer.release.set()
+    assert writer.flush(timeout=5)
+    assert sorted(values(database)) == list(range(10))
+    writer.close()
+
+
+def test_flush_key_waits_only_for_its_own_rows(database):
+    writer = StalledQueue(database)
+    writer.submit(INSERT, (1,), key="user:1")
+    writer.submit(INSERT, (2,), key="user:1")
+
+    assert writer.flush_key("user:2", timeout=0.05)
+    assert not writer.flush_key("user:1", timeout=0.05)
+
+    writer.release.set()
+    assert writer.flush_key("user:1", timeout=5)
+    assert values(database) == [1, 2]
+    writer.close()
+
+
+def test_close_commits_pending_rows(database):
+    writer = WriteBehindQueue(database, linger=0.2)
+    writer.submit_many(INSERT, [(i,) for i in range(100)])
+    started = time.perf_counter()
+    writer.close()
+    assert values(database) == list(range(100))
+    assert writer.stats()['depth'] == 0
+    assert time.perf_counter() - started < 5